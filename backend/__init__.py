@@ -1,6 +1,5 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_limiter import Limiter
@@ -11,9 +10,11 @@ import os
 # Load environment variables
 load_dotenv()
 
+from services.db_routing import RoutingSession
+
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = None  # Flask-Migrate (Alembic) is loaded in create_app only when FAST_BOOT is off
 jwt = JWTManager()
 cors = CORS()
 limiter = Limiter(key_func=get_remote_address)
@@ -34,8 +35,24 @@ def create_app():
     ]
     
     # Initialize extensions
+    from services.db_routing import configure_engine_options, init_read_routing
+    from services.db_writer import configure_sqlite_engine_options, install_sqlite_pragmas, init_write_queue
+    configure_engine_options(app)
+    configure_sqlite_engine_options(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    install_sqlite_pragmas(app)
+    init_write_queue(app)
+    init_read_routing(app)
+    from services.metrics import metrics
+    from services.query_budget import install_query_budget
+    metrics.init_app(app)
+    install_query_budget(app)
+    from services.request_profiler import request_profiler
+    request_profiler.init_app(app)
+    if not app.config.get('FAST_BOOT'):
+        global migrate
+        from flask_migrate import Migrate
+        migrate = Migrate(app, db)
     jwt.init_app(app)
     cors.init_app(
         app,
@@ -44,6 +61,40 @@ def create_app():
     )
     limiter.init_app(app)
     
+    from services.response_cache import response_cache, register_invalidation_hooks
+    response_cache.init_app(app)
+    register_invalidation_hooks(db.session)
+    
+    from services.ranking_service import register_ranking_hooks
+    register_ranking_hooks(db.session)
+    
+    from services.event_bus import event_bus, register_event_hooks
+    event_bus.init_app(app)
+    register_event_hooks(db.session)
+    
+    from services.job_requirements import register_requirement_hooks
+    register_requirement_hooks(db.session)
+    
+    from services.prompt_builder import prompt_builder
+    prompt_builder.init_app(app)
+    
+    from services.queue_eta import queue_eta
+    queue_eta.init_app(app)
+    
+    from services.analysis_scheduler import analysis_scheduler
+    analysis_scheduler.init_app(app)
+    
+    from services.admission import admission
+    admission.init_app(app)
+    
+    from services.backfill import backfill_runner
+    backfill_runner.init_app(app)
+    
+    from services.circuit_breaker import gemini_breaker
+    from services.analysis_pipeline import init_rescore_on_close
+    gemini_breaker.init_app(app, 'GEMINI_BREAKER')
+    init_rescore_on_close(app)
+    
     # Create upload directory
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
@@ -56,15 +107,23 @@ def create_app():
     from routes.resumes import resumes_bp
     from routes.admin import admin_bp
     from routes.applications import applications_bp
+    from routes.events import events_bp
+    from routes.metrics import metrics_bp
+    from routes.health import health_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
     app.register_blueprint(resumes_bp, url_prefix='/api/resumes')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(applications_bp, url_prefix='/api/applications')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp, url_prefix='/api/health')
     
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # Schema creation lives in the init/migrate scripts; only opt-in here (e.g. local development)
+    if app.config.get('AUTO_MIGRATE'):
+        from db_migrations import run_migrations
+        with app.app_context():
+            run_migrations()
     
     return app
@@ -1,7 +1,13 @@
 from __init__ import create_app
 import os
+import sys
 
 if __name__ == '__main__':
+    if '--profile-startup' in sys.argv:
+        from startup_profile import main as profile_startup
+        profile_startup()
+        sys.exit(0)
+    
     app = create_app()
     
     # Get port from environment variable (Render sets this)
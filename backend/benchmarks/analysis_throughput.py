@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Analysis throughput benchmark
+Pushes generated (resume, job) pairs through the real analysis pipeline (upsert, claim, prompt
+build, AIAnalyzer, result write, ranking update) from parallel workers, with the AI call served
+by the replay or synthetic backend, so queue, worker and ranking throughput can be measured
+offline and reproducibly. Reports analyses per second and end-to-end latency percentiles.
+
+Usage:
+    python -m benchmarks.analysis_throughput --workers 8 --analyses 200 --latency uniform:200,800
+    python -m benchmarks.analysis_throughput --backend replay --cassette ai_cassette.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SKILLS = ['python', 'sql', 'aws', 'docker', 'kubernetes', 'machine learning', 'pandas', 'spark', 'react',
+          'java', 'tableau', 'excel', 'statistics', 'git', 'linux', 'communication']
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else None
+
+def seed_database(args):
+    """Jobs with requirement text and resumes with parsed data, generated from args.seed"""
+    from __init__ import db
+    from models import User, JobDescription, Resume
+
+    rng = random.Random(args.seed)
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    jobs = []
+    for i in range(args.jobs):
+        required = rng.sample(SKILLS, 5)
+        jobs.append(JobDescription(title=f'Job {i}', description=f'Role {i} building data products.',
+                                   requirements=f"- {rng.randint(1, 6)}+ years of experience with {', '.join(required)}",
+                                   created_by=user.id))
+    db.session.add_all(jobs)
+    db.session.flush()
+
+    resumes = []
+    for i in range(args.resumes):
+        skills = rng.sample(SKILLS, rng.randint(3, 9))
+        resume = Resume(user_id=user.id, filename=f'r{i}.pdf', original_filename=f'r{i}.pdf',
+                        file_path='/dev/null', file_type='PDF')
+        resume.set_parsed_data({
+            'cleaned_text': f"Candidate {i}. {rng.randint(0, 10)} years of experience. Skills: {', '.join(skills)}",
+            'skills': skills,
+            'experience': [{'title': 'Engineer', 'company': f'Company {i}', 'description': f"Used {', '.join(skills[:3])}"}],
+            'projects': [f'Project with {skills[0]}']
+        })
+        resumes.append(resume)
+    db.session.add_all(resumes)
+    db.session.commit()
+
+    pairs = [(resumes[i % len(resumes)].id, jobs[i % len(jobs)].id) for i in range(args.analyses)]
+    rng.shuffle(pairs)
+    return list(dict.fromkeys(pairs))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--backend', choices=['synthetic', 'replay'], default='synthetic')
+    arg_parser.add_argument('--cassette', default='ai_cassette.jsonl', help='Cassette for --backend replay')
+    arg_parser.add_argument('--latency', default='fixed:50', help='AI_LATENCY spec for the AI call')
+    arg_parser.add_argument('--workers', type=int, default=8)
+    arg_parser.add_argument('--analyses', type=int, default=200)
+    arg_parser.add_argument('--jobs', type=int, default=4)
+    arg_parser.add_argument('--resumes', type=int, default=200)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='throughput_'), 'bench.db')}",
+        'AUTO_MIGRATE': 'true',
+        'AI_BACKEND': args.backend,
+        'AI_CASSETTE': os.path.abspath(args.cassette),
+        'AI_LATENCY': args.latency,
+        'AI_SEED': str(args.seed)
+    })
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+
+    from __init__ import create_app, db
+    from models import ResumeAnalysis
+    from services.analysis_pipeline import analyze
+    from services.ai_backends import get_stats
+
+    app = create_app()
+    with app.app_context():
+        pairs = seed_database(args)
+
+    pending = list(reversed(pairs))
+    pending_lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def worker():
+        with app.app_context():
+            while True:
+                with pending_lock:
+                    if not pending:
+                        break
+                    resume_id, job_id = pending.pop()
+                started = time.perf_counter()
+                outcome, _ = analyze(resume_id, job_id)
+                with pending_lock:
+                    latencies.append(time.perf_counter() - started)
+                    if outcome['error']:
+                        errors.append(outcome['error'])
+                db.session.remove()
+
+    # The pipeline narrates every step with print; keep the report readable
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    with app.app_context():
+        completed = ResumeAnalysis.query.filter_by(analysis_status='completed').count()
+        ranked = ResumeAnalysis.query.filter(ResumeAnalysis.rank > 0).count()
+        scores = [row.relevance_score for row in ResumeAnalysis.query.order_by(ResumeAnalysis.id).all()]
+
+    print(json.dumps({
+        'backend': get_stats(),
+        'workers': args.workers,
+        'analyses': len(pairs),
+        'seconds': round(elapsed, 2),
+        'analyses_per_second': round(len(pairs) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99': round(percentile(latencies, 0.99) * 1000, 1)
+        },
+        'completed': completed,
+        'ranked': ranked,
+        'errors': len(errors),
+        'sample_error': errors[0] if errors else None,
+        # Same seed and backend give the same scores; a changed checksum means changed results
+        'score_checksum': round(sum((i + 1) * (score or 0) for i, score in enumerate(scores)), 1)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
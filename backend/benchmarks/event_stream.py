@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Event stream load test
+Holds thousands of idle subscribers on the event bus, each parked in its own thread the way a
+threaded server parks one per open SSE connection, and measures memory, targeted publish latency
+and broadcast fan-out time.
+
+Usage: python -m benchmarks.event_stream --subscribers 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.event_bus import EventBus, user_topic, job_topic
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--subscribers', type=int, default=5000)
+    arg_parser.add_argument('--publishes', type=int, default=2000, help='Targeted single-user publishes')
+    arg_parser.add_argument('--broadcasts', type=int, default=5, help='Job-wide events delivered to everyone')
+    arg_parser.add_argument('--heartbeat', type=float, default=1.0)
+    args = arg_parser.parse_args()
+
+    bus = EventBus(max_queue_size=100, max_subscribers=args.subscribers + 1)
+    stop = threading.Event()
+    received = {}
+    received_lock = threading.Lock()
+    heartbeats = [0]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    subscriptions = [bus.subscribe([user_topic(i), job_topic(1)]) for i in range(args.subscribers)]
+    subscribe_seconds = time.perf_counter() - start
+    bus_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def idle_client(subscription):
+        while not stop.is_set():
+            event = subscription.get(timeout=args.heartbeat)
+            if event is None:
+                heartbeats[0] += 1
+                continue
+            arrived = time.perf_counter()
+            with received_lock:
+                received.setdefault(event['id'], []).append(arrived - event['data']['sent_at'])
+
+    threads = [threading.Thread(target=idle_client, args=(subscription,), daemon=True)
+               for subscription in subscriptions]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.heartbeat * 2)
+
+    # Targeted events: one subscriber each, as for analysis status changes
+    publish_costs = []
+    for i in range(args.publishes):
+        sent_at = time.perf_counter()
+        bus.publish([user_topic(i % args.subscribers)], 'analysis_status', {'sent_at': sent_at})
+        publish_costs.append(time.perf_counter() - sent_at)
+    time.sleep(0.5)
+    targeted = [latency for latencies in received.values() for latency in latencies]
+    received.clear()
+
+    # Broadcast events: every subscriber, as for ranking updates on a job everyone watches
+    fanout = []
+    for _ in range(args.broadcasts):
+        sent_at = time.perf_counter()
+        bus.publish([job_topic(1)], 'ranking_updated', {'sent_at': sent_at})
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            with received_lock:
+                deliveries = sum(len(latencies) for latencies in received.values())
+            if deliveries >= args.subscribers:
+                break
+            time.sleep(0.005)
+        with received_lock:
+            fanout.append(max(latency for latencies in received.values() for latency in latencies))
+            received.clear()
+
+    stop.set()
+    for subscription in subscriptions:
+        bus.unsubscribe(subscription)
+
+    print(json.dumps({
+        'subscribers': args.subscribers,
+        'subscribe_seconds': round(subscribe_seconds, 4),
+        'bus_memory_bytes_per_subscriber': bus_memory // args.subscribers,
+        'publish_call_us': {
+            'p50': round(percentile(publish_costs, 0.50) * 1e6, 1),
+            'p99': round(percentile(publish_costs, 0.99) * 1e6, 1)
+        },
+        'targeted_delivery_ms': {
+            'delivered': len(targeted),
+            'p50': round(percentile(targeted, 0.50) * 1000, 3),
+            'p99': round(percentile(targeted, 0.99) * 1000, 3)
+        },
+        'broadcast_fanout_ms': {
+            'mean': round(statistics.mean(fanout) * 1000, 2),
+            'max': round(max(fanout) * 1000, 2)
+        },
+        'idle_heartbeats': heartbeats[0],
+        'bus_stats_after': bus.stats()
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Queue ETA accuracy benchmark
+Replays a workload through the real analysis pipeline: analyses arrive as a Poisson process (plus
+an optional initial burst) spread over several jobs, and a fixed pool of workers serves them in
+arrival order with the AI call answered by the replay or synthetic backend. The ETA each analysis
+gets at arrival is compared with when it actually completed, next to a baseline that ignores
+concurrency (analyses ahead x measured service time). Predictions made before the service time
+average has --warmup samples are not scored.
+
+Usage:
+    python -m benchmarks.queue_eta --workers 4 --analyses 300 --latency lognormal:80,0.4
+    python -m benchmarks.queue_eta --backend replay --cassette ai_cassette.jsonl --latency recorded
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.analysis_throughput import percentile, seed_database
+
+def error_summary(predicted, actual):
+    """Absolute (seconds) and relative errors of predicted against actual completion times"""
+    errors = [p - a for p, a in zip(predicted, actual)]
+    relative = [abs(p - a) / a for p, a in zip(predicted, actual) if a > 0]
+    return {
+        'mae_seconds': round(sum(abs(e) for e in errors) / len(errors), 3),
+        'bias_seconds': round(sum(errors) / len(errors), 3),
+        'p50_abs_pct': round(percentile(relative, 0.50) * 100, 1),
+        'p90_abs_pct': round(percentile(relative, 0.90) * 100, 1),
+        'within_25_pct': round(sum(1 for r in relative if r <= 0.25) / len(relative) * 100, 1)
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--backend', choices=['synthetic', 'replay'], default='synthetic')
+    arg_parser.add_argument('--cassette', default='ai_cassette.jsonl', help='Cassette for --backend replay')
+    arg_parser.add_argument('--latency', default='lognormal:80,0.4', help='AI_LATENCY spec for the AI call')
+    arg_parser.add_argument('--workers', type=int, default=4)
+    arg_parser.add_argument('--analyses', type=int, default=300)
+    arg_parser.add_argument('--jobs', type=int, default=4)
+    arg_parser.add_argument('--resumes', type=int, default=300)
+    arg_parser.add_argument('--burst', type=int, default=40, help='Analyses queued at once before the arrivals')
+    arg_parser.add_argument('--load', type=float, default=1.1,
+                            help='Arrival rate as a multiple of the measured service capacity')
+    arg_parser.add_argument('--warmup', type=int, default=10)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', help='Also write the JSON report here')
+    args = arg_parser.parse_args()
+
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='queue_eta_'), 'bench.db')}",
+        'AUTO_MIGRATE': 'true',
+        'AI_BACKEND': args.backend,
+        'AI_CASSETTE': os.path.abspath(args.cassette),
+        'AI_LATENCY': args.latency,
+        'AI_SEED': str(args.seed)
+    })
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+
+    from __init__ import create_app, db
+    from models import ResumeAnalysis
+    from services.analysis_pipeline import ensure_analysis, run_analysis
+    from services.queue_eta import queue_eta
+
+    app = create_app()
+    with app.app_context():
+        pairs = seed_database(args)
+
+    rng = random.Random(args.seed)
+    lock = threading.Lock()
+    arrived_at, predictions, completed_at = {}, {}, {}
+    taken = set()
+    arrivals_done = threading.Event()
+
+    def arrive(resume_id, job_id):
+        analysis_id = ensure_analysis(resume_id, job_id)
+        now = time.perf_counter()
+        estimates = queue_eta.estimates()
+        analysis = db.session.get(ResumeAnalysis, analysis_id)
+        eta = queue_eta.analysis_etas([analysis]).get(analysis_id)
+        ahead = ResumeAnalysis.query.filter(ResumeAnalysis.analysis_status.in_(('pending', 'processing')))\
+            .filter(ResumeAnalysis.id < analysis_id).count()
+        db.session.rollback()
+        with lock:
+            arrived_at[analysis_id] = now
+            if eta is not None and estimates['samples'] >= args.warmup:
+                predictions[analysis_id] = {
+                    'eta': eta['estimated_completion_seconds'],
+                    'baseline': (ahead + 1) * estimates['service_seconds']
+                }
+
+    def feeder():
+        with app.app_context():
+            for resume_id, job_id in pairs[:args.burst]:
+                arrive(resume_id, job_id)
+            for resume_id, job_id in pairs[args.burst:]:
+                # Open-loop arrivals at --load times what the workers are currently measured to serve
+                estimates = queue_eta.estimates()
+                rate = args.load * args.workers / estimates['service_seconds'] if estimates['samples'] else args.workers
+                time.sleep(rng.expovariate(rate))
+                arrive(resume_id, job_id)
+            db.session.remove()
+        arrivals_done.set()
+
+    def next_analysis():
+        with lock:
+            query = ResumeAnalysis.query.filter(ResumeAnalysis.analysis_status == 'pending')
+            if taken:
+                query = query.filter(ResumeAnalysis.id.notin_(taken))
+            row = query.order_by(ResumeAnalysis.id.asc()).first()
+            if row is not None:
+                taken.add(row.id)
+                return row.id, row.resume_id, row.job_id
+        return None
+
+    def worker():
+        with app.app_context():
+            while True:
+                picked = next_analysis()
+                db.session.rollback()
+                if picked is None:
+                    if arrivals_done.is_set():
+                        break
+                    time.sleep(0.005)
+                    continue
+                analysis_id, resume_id, job_id = picked
+                run_analysis(resume_id, job_id)
+                with lock:
+                    completed_at[analysis_id] = time.perf_counter()
+                db.session.remove()
+
+    # The pipeline narrates every step with print; keep the report readable
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=feeder)] + [threading.Thread(target=worker) for _ in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    scored = [analysis_id for analysis_id in predictions if analysis_id in completed_at]
+    actual = [completed_at[analysis_id] - arrived_at[analysis_id] for analysis_id in scored]
+    report = {
+        'backend': args.backend,
+        'latency': args.latency,
+        'workers': args.workers,
+        'analyses': len(arrived_at),
+        'scored': len(scored),
+        'seconds': round(elapsed, 2),
+        'estimates': queue_eta.estimates(),
+        'actual_completion_seconds': {
+            'p50': round(percentile(actual, 0.50), 3),
+            'p90': round(percentile(actual, 0.90), 3),
+            'max': round(max(actual), 3)
+        } if actual else None,
+        'eta': error_summary([predictions[i]['eta'] for i in scored], actual) if scored else None,
+        'baseline_ahead_x_service': error_summary([predictions[i]['baseline'] for i in scored], actual) if scored else None
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Resume text storage benchmark
+Builds a synthetic resume table in the legacy layout (text stored three times, loaded eagerly),
+migrates it to compact storage and reports database size and row-fetch time for both.
+
+Usage: python -m benchmarks.resume_storage --count 100000
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RESUMES_DIR = os.path.join(BACKEND_DIR, '..', 'Theme 2 - Sample Data', 'Resumes')
+sys.path.insert(0, BACKEND_DIR)
+
+def load_sample_texts():
+    """Extract raw text from the bundled sample resumes to use as a corpus"""
+    from services.resume_parser import ResumeParser
+
+    parser = ResumeParser()
+    texts = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_RESUMES_DIR, '*.pdf'))):
+        try:
+            texts.append(parser.extract_text(path, 'pdf'))
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+    return texts
+
+def synthetic_text(rng, corpus):
+    """Shuffle lines from a sample resume so rows are not byte-identical"""
+    lines = rng.choice(corpus).split('\n')
+    rng.shuffle(lines)
+    return f"Candidate {rng.randint(1, 10 ** 9)}\n" + '\n'.join(lines)
+
+def populate_legacy(count, corpus, seed):
+    """Insert resumes the way the pre-compact schema stored them"""
+    from __init__ import db
+    from models import Resume, User
+    from services.resume_parser import ResumeParser
+
+    parser = ResumeParser()
+    rng = random.Random(seed)
+    user = User(username='bench', email='bench@example.com')
+    db.session.add(user)
+    db.session.commit()
+
+    parsed_templates = []
+    for raw_text in corpus:
+        cleaned_text = parser.clean_text(raw_text)
+        parsed_templates.append({
+            'skills': parser.extract_skills(cleaned_text),
+            'education': parser.extract_education(cleaned_text),
+            'experience': parser.extract_experience(cleaned_text),
+            'projects': parser.extract_projects(cleaned_text),
+        })
+
+    rows = []
+    for i in range(count):
+        raw_text = synthetic_text(rng, corpus)
+        cleaned_text = parser.clean_text(raw_text)
+        parsed_data = dict(rng.choice(parsed_templates), raw_text=raw_text, cleaned_text=cleaned_text,
+                           word_count=len(cleaned_text.split()), char_count=len(cleaned_text))
+        rows.append({
+            'filename': f'{i}.pdf',
+            'original_filename': f'resume-{i}.pdf',
+            'file_path': f'uploads/{i}.pdf',
+            'file_type': 'PDF',
+            'extracted_text': cleaned_text,
+            'parsed_data': json.dumps(parsed_data),
+            'uploaded_at': datetime.utcnow(),
+            'user_id': user.id,
+        })
+        if len(rows) >= 5000:
+            db.session.execute(Resume.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Resume.__table__.insert(), rows)
+    db.session.commit()
+
+def database_size(db_path):
+    from __init__ import db
+
+    db.session.remove()
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('VACUUM')
+    return os.path.getsize(db_path)
+
+def measure_fetch(legacy, pages, per_page):
+    """Time a full ORM scan and a series of list pages serialized with to_dict"""
+    from __init__ import db
+    from models import Resume
+
+    # The legacy model loaded every text column eagerly and serialized parsed_data in listings
+    options = [db.undefer(Resume.extracted_text), db.undefer(Resume.parsed_data)] if legacy else []
+
+    # Best of three so statement compilation and a cold page cache do not dominate
+    full_scan = None
+    for _ in range(3):
+        db.session.remove()
+        start = time.perf_counter()
+        row_count = len(Resume.query.options(*options).all())
+        elapsed = time.perf_counter() - start
+        full_scan = elapsed if full_scan is None else min(full_scan, elapsed)
+    db.session.remove()
+
+    start = time.perf_counter()
+    for page in range(pages):
+        resumes = Resume.query.options(*options)\
+            .order_by(Resume.id.desc())\
+            .offset(page * per_page)\
+            .limit(per_page)\
+            .all()
+        [resume.to_dict(include_parsed_data=legacy) for resume in resumes]
+        db.session.remove()
+    list_page = (time.perf_counter() - start) / pages
+
+    return {
+        'rows': row_count,
+        'full_scan_seconds': round(full_scan, 4),
+        'list_page_ms': round(list_page * 1000, 3)
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--count', type=int, default=100000, help='Number of synthetic resumes')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--pages', type=int, default=50, help='List pages to time')
+    arg_parser.add_argument('--per-page', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='resume_storage_bench_')
+    db_path = os.path.join(workdir, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from __init__ import create_app
+    from db_migrations import migrate_compact_resume_text, run_migrations
+
+    corpus = load_sample_texts()
+    if not corpus:
+        print("No sample resumes found; cannot build corpus")
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        run_migrations()
+        print(f"Populating {args.count} legacy resumes in {db_path}...")
+        populate_legacy(args.count, corpus, args.seed)
+
+        legacy = {'db_size_bytes': database_size(db_path)}
+        legacy.update(measure_fetch(True, args.pages, args.per_page))
+
+        print("Migrating to compact storage...")
+        start = time.perf_counter()
+        migrate_compact_resume_text()
+        migration_seconds = time.perf_counter() - start
+
+        compact = {'db_size_bytes': database_size(db_path)}
+        compact.update(measure_fetch(False, args.pages, args.per_page))
+
+    print(json.dumps({
+        'count': args.count,
+        'legacy': legacy,
+        'compact': compact,
+        'migration_seconds': round(migration_seconds, 2),
+        'size_ratio': round(compact['db_size_bytes'] / legacy['db_size_bytes'], 3)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
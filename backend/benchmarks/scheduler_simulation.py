@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Analysis scheduler simulation
+Discrete-event simulation of the analysis workers serving two workloads, comparing the analysis
+scheduler (services/analysis_scheduler.SchedulingPolicy, the code the dispatcher runs) with the
+oldest-first order the dispatcher used before:
+
+  flood  a bulk reprocess of --bulk analyses lands at once while interactive applications keep
+         arriving at --interactive-load times the workers' capacity
+  viral  one job receives --viral-burst applications at once while the other jobs get the same
+         interactive arrivals as in the flood scenario
+
+Service times are drawn from a lognormal distribution, and time is simulated, so an hour of
+traffic takes a second. Reports wait and response-time percentiles per priority class (and, for
+the viral scenario, for the other jobs), plus how much bulk work finished during the arrivals.
+
+Usage:
+    python -m benchmarks.scheduler_simulation --workers 8 --service 20 --bulk 10000
+    python -m benchmarks.scheduler_simulation --scenarios viral --viral-burst 5000 --weights interactive:8,bulk:2,backfill:1
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import sys
+from collections import defaultdict, deque
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.analysis_throughput import percentile
+from services.analysis_scheduler import DEFAULT_WEIGHTS, SchedulingPolicy, parse_weights
+
+SCENARIOS = ['flood', 'viral']
+POLICIES = ['oldest_first', 'scheduler']
+
+def interactive_arrivals(args, rng, jobs):
+    """Poisson arrivals at --interactive-load of the worker capacity, spread evenly over `jobs`"""
+    rate = args.interactive_load * args.workers / args.service
+    arrivals, now = [], 0.0
+    while True:
+        now += rng.expovariate(rate)
+        if now >= args.duration:
+            return arrivals
+        arrivals.append((now, 'interactive', rng.choice(jobs)))
+
+def workload(scenario, args):
+    """(arrival time, priority class, job id) for every analysis, in arrival order"""
+    rng = random.Random(args.seed)
+    if scenario == 'flood':
+        # The bulk reprocess is queued a moment before the interactive traffic starts
+        arrivals = [(0.0, 'bulk', 1 + i % args.bulk_jobs) for i in range(args.bulk)]
+        arrivals += interactive_arrivals(args, rng, list(range(1, args.jobs + 1)))
+    else:
+        arrivals = [(0.0, 'interactive', 0) for _ in range(args.viral_burst)]
+        arrivals += interactive_arrivals(args, rng, list(range(1, args.jobs + 1)))
+    return sorted(arrivals, key=lambda arrival: arrival[0])
+
+class OldestFirst:
+    """The order before the scheduler: every pending analysis in arrival (id) order"""
+
+    def __init__(self):
+        self.queue = deque()
+
+    def push(self, item):
+        self.queue.append(item)
+
+    def pop(self, now):
+        return self.queue.popleft() if self.queue else None
+
+class Scheduled:
+    """Pending analyses kept per (priority, job) flow, served by the real SchedulingPolicy"""
+
+    def __init__(self, weights, aging_seconds):
+        self.policy = SchedulingPolicy(weights, aging_seconds)
+        self.flows = defaultdict(deque)
+
+    def push(self, item):
+        self.flows[(item['priority'], item['job_id'])].append(item)
+
+    def pop(self, now):
+        flow = self.policy.choose({flow: items[0]['arrived'] for flow, items in self.flows.items()}, now)
+        if flow is None:
+            return None
+        item = self.flows[flow].popleft()
+        if not self.flows[flow]:
+            del self.flows[flow]
+        return item
+
+def simulate(arrivals, queue, args):
+    """Run every arrival to completion on --workers workers; returns the finished items"""
+    rng = random.Random(args.seed + 1)
+    # Lognormal service times with mean --service
+    mu = math.log(args.service) - args.service_sigma ** 2 / 2
+    events = []  # (time, sequence, kind, item)
+    for sequence, (arrived, priority, job_id) in enumerate(arrivals):
+        item = {'arrived': arrived, 'priority': priority, 'job_id': job_id,
+                'service': rng.lognormvariate(mu, args.service_sigma)}
+        heapq.heappush(events, (arrived, sequence, 'arrive', item))
+    sequence = len(arrivals)
+
+    idle, finished = args.workers, []
+    while events:
+        now, _, kind, item = heapq.heappop(events)
+        if kind == 'arrive':
+            queue.push(item)
+        else:
+            idle += 1
+            finished.append(item)
+        # Several events can share a timestamp; dispatch once they are all in
+        if events and events[0][0] == now:
+            continue
+        while idle:
+            next_item = queue.pop(now)
+            if next_item is None:
+                break
+            idle -= 1
+            next_item['started'] = now
+            next_item['completed'] = now + next_item['service']
+            sequence += 1
+            heapq.heappush(events, (next_item['completed'], sequence, 'complete', next_item))
+    return finished
+
+def latency_summary(items):
+    if not items:
+        return None
+    waits = [item['started'] - item['arrived'] for item in items]
+    responses = [item['completed'] - item['arrived'] for item in items]
+    return {
+        'analyses': len(items),
+        'wait_p50_seconds': round(percentile(waits, 0.50), 1),
+        'wait_p95_seconds': round(percentile(waits, 0.95), 1),
+        'wait_p99_seconds': round(percentile(waits, 0.99), 1),
+        'response_p50_seconds': round(percentile(responses, 0.50), 1),
+        'response_p99_seconds': round(percentile(responses, 0.99), 1),
+        'response_max_seconds': round(max(responses), 1)
+    }
+
+def report(scenario, finished, queue, args):
+    by_class = defaultdict(list)
+    for item in finished:
+        by_class[item['priority']].append(item)
+    result = {priority: latency_summary(items) for priority, items in sorted(by_class.items())}
+
+    if scenario == 'flood':
+        # Bulk progress while the interactive traffic was arriving: aging and weights keep it moving
+        done = sum(1 for item in by_class['bulk'] if item['completed'] <= args.duration)
+        result['bulk_completed_during_arrivals'] = done
+    else:
+        result['viral_job'] = latency_summary([item for item in finished if item['job_id'] == 0])
+        result['other_jobs'] = latency_summary([item for item in finished if item['job_id'] != 0])
+
+    if isinstance(queue, Scheduled):
+        result['scheduler'] = {'served': dict(queue.policy.served), 'aged': dict(queue.policy.aged)}
+    return result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    arg_parser.add_argument('--workers', type=int, default=8)
+    arg_parser.add_argument('--service', type=float, default=20.0, help='Mean analysis time in seconds')
+    arg_parser.add_argument('--service-sigma', type=float, default=0.5, help='Lognormal sigma of analysis times')
+    arg_parser.add_argument('--duration', type=float, default=3600.0, help='Seconds of interactive arrivals')
+    arg_parser.add_argument('--interactive-load', type=float, default=0.6,
+                            help='Interactive arrival rate as a share of the worker capacity')
+    arg_parser.add_argument('--jobs', type=int, default=50, help='Jobs the interactive applications go to')
+    arg_parser.add_argument('--bulk', type=int, default=10000, help='Analyses in the bulk reprocess (flood)')
+    arg_parser.add_argument('--bulk-jobs', type=int, default=20, help='Jobs the bulk reprocess spans (flood)')
+    arg_parser.add_argument('--viral-burst', type=int, default=3000, help='Applications to the viral job (viral)')
+    arg_parser.add_argument('--weights', default=DEFAULT_WEIGHTS, help='SCHEDULER_WEIGHTS for the scheduler')
+    arg_parser.add_argument('--aging', type=float, default=300.0, help='SCHEDULER_AGING_SECONDS for the scheduler')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', help='Also write the JSON report here')
+    args = arg_parser.parse_args()
+
+    weights = parse_weights(args.weights)
+    results = {
+        'workers': args.workers,
+        'service_seconds': args.service,
+        'interactive_load': args.interactive_load,
+        'weights': weights,
+        'aging_seconds': args.aging,
+        'scenarios': {}
+    }
+    for scenario in args.scenarios.split(','):
+        if scenario not in SCENARIOS:
+            arg_parser.error(f'unknown scenario {scenario!r}')
+        arrivals = workload(scenario, args)
+        results['scenarios'][scenario] = {}
+        for policy in POLICIES:
+            queue = OldestFirst() if policy == 'oldest_first' else Scheduled(weights, args.aging)
+            finished = simulate(arrivals, queue, args)
+            results['scenarios'][scenario][policy] = report(scenario, finished, queue, args)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
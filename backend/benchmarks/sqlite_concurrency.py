@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+SQLite concurrency benchmark
+Runs the background-analysis write path (pending -> processing -> simulated AI call -> store
+result -> ranking update) from parallel worker threads against a file-backed SQLite database,
+once per mode, and reports sustained analyses per second and "database is locked" failures.
+
+Modes:
+  baseline  rollback journal, no write queue (the behaviour before SQLITE_WAL/SQLITE_WRITE_QUEUE)
+  wal       WAL journal and busy timeout, every thread still commits for itself
+  queue     WAL journal plus the single-writer commit queue (the default)
+
+Usage: python -m benchmarks.sqlite_concurrency --workers 16 --analyses 400
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MODES = {
+    'baseline': {'SQLITE_WAL': 'false', 'SQLITE_WRITE_QUEUE': 'false'},
+    'wal': {'SQLITE_WAL': 'true', 'SQLITE_WRITE_QUEUE': 'false'},
+    'queue': {'SQLITE_WAL': 'true', 'SQLITE_WRITE_QUEUE': 'true'},
+}
+
+class _LockCounter(io.TextIOBase):
+    """Swallows service print output, counting lock errors that the services catch themselves"""
+
+    def __init__(self):
+        self.locked = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        if 'database is locked' in text:
+            with self._lock:
+                self.locked += 1
+        return len(text)
+
+def run_mode(args):
+    """Run one mode in this process; config is read from the environment at import time"""
+    os.environ['AUTO_MIGRATE'] = 'true'
+    from __init__ import create_app, db
+    from models import User, JobDescription, Resume, ResumeAnalysis
+    from services.db_writer import run_write
+    from services.ranking_service import ranking_service
+
+    app = create_app()
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        jobs = [JobDescription(title=f'Job {i}', description='Python SQL', created_by=user.id) for i in range(args.jobs)]
+        db.session.add_all(jobs)
+        db.session.flush()
+
+        analysis_ids = []
+        for i in range(args.analyses):
+            resume = Resume(user_id=user.id, filename=f'r{i}.pdf', original_filename=f'r{i}.pdf', file_path='/dev/null', file_type='PDF')
+            resume.text = 'Python SQL machine learning ' * 50
+            db.session.add(resume)
+            db.session.flush()
+            analysis = ResumeAnalysis(resume_id=resume.id, job_id=jobs[i % args.jobs].id, analysis_status='pending')
+            db.session.add(analysis)
+            db.session.flush()
+            analysis_ids.append(analysis.id)
+        db.session.commit()
+
+    pending = list(reversed(analysis_ids))
+    pending_lock = threading.Lock()
+    failures = {'locked': 0, 'other': 0, 'sample': None}
+    failures_lock = threading.Lock()
+    completed = [0]
+
+    def process(analysis_id):
+        def mark_processing():
+            ResumeAnalysis.query.get(analysis_id).analysis_status = 'processing'
+        run_write(mark_processing)
+
+        analysis = ResumeAnalysis.query.get(analysis_id)
+        job_id = analysis.job_id
+        len(analysis.resume.text)
+        db.session.rollback()
+        time.sleep(args.ai_latency_ms / 1000)
+
+        score = float(analysis_id * 37 % 100)
+        def store_result():
+            ResumeAnalysis.query.get(analysis_id).apply_result({
+                'relevance_score': score,
+                'verdict': 'High' if score >= 75 else 'Medium',
+                'missing_skills': ['aws'],
+                'improvement_suggestions': ['Add metrics']
+            })
+        run_write(store_result)
+
+        def update_ranking():
+            ranking_service.add_to_ranking(ResumeAnalysis.query.get(analysis_id))
+            ranking_service.promote_high_score_resume(job_id, min_score=80.0)
+        run_write(update_ranking, exclusive=True)
+
+    def worker():
+        with app.app_context():
+            while True:
+                with pending_lock:
+                    if not pending:
+                        break
+                    analysis_id = pending.pop()
+                try:
+                    process(analysis_id)
+                    with failures_lock:
+                        completed[0] += 1
+                except Exception as e:
+                    db.session.rollback()
+                    with failures_lock:
+                        failures['locked' if 'database is locked' in str(e) else 'other'] += 1
+                        failures['sample'] = failures['sample'] or f'{type(e).__name__}: {str(e)[:160]}'
+                finally:
+                    db.session.remove()
+
+    output = _LockCounter()
+    real_stdout, sys.stdout = sys.stdout, output
+    try:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout = real_stdout
+
+    with app.app_context():
+        stored = ResumeAnalysis.query.filter_by(analysis_status='completed').count()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    write_queue = app.extensions.get('sqlite_write_queue')
+    print(json.dumps({
+        'journal_mode': journal_mode,
+        'seconds': round(elapsed, 2),
+        'completed': completed[0],
+        'stored_completed': stored,
+        'analyses_per_second': round(completed[0] / elapsed, 1),
+        'failed_locked': failures['locked'],
+        'failed_other': failures['other'],
+        'swallowed_lock_errors': output.locked,
+        'sample_error': failures['sample'],
+        'write_queue': write_queue.stats() if write_queue else None
+    }))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--workers', type=int, default=16)
+    arg_parser.add_argument('--analyses', type=int, default=400)
+    arg_parser.add_argument('--jobs', type=int, default=4)
+    arg_parser.add_argument('--ai-latency-ms', type=float, default=50, help='Simulated Gemini call duration')
+    arg_parser.add_argument('--busy-timeout-ms', type=int, default=5000)
+    arg_parser.add_argument('--modes', default=','.join(MODES))
+    arg_parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args)
+        return
+
+    results = {}
+    for mode in args.modes.split(','):
+        workdir = tempfile.mkdtemp(prefix=f'sqlite_{mode}_')
+        env = dict(os.environ, **MODES[mode],
+                   DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                   SQLITE_BUSY_TIMEOUT_MS=str(args.busy_timeout_ms))
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--run-mode', mode] + sys.argv[1:],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            raise SystemExit(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+        results[mode] = json.loads(lines[-1])
+        print(f"{mode:9s} {json.dumps(results[mode])}", file=sys.stderr)
+
+    print(json.dumps({
+        'workers': args.workers,
+        'analyses': args.analyses,
+        'ai_latency_ms': args.ai_latency_ms,
+        'results': results
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
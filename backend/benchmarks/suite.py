@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite
+Measures, on the bundled Theme 2 sample data and generated rows:
+
+  parser   ResumeParser.parse_resume per file type (the sample PDFs, and DOCX copies of them)
+  jd       JDPDFParser.extract_text on the sample JD PDFs
+  ranking  RankingService re-rank, snapshot, queue-status and change-log latency for one job
+           with 1k, 10k and 100k completed analyses
+  http     p50/p95/p99 of the main GET endpoints through the Flask test client
+
+Every metric goes into one flat JSON document (metric -> value, unit, which direction is
+better) tagged with the git commit. With --baseline the run is compared to an earlier document
+and the exit status is 1 if any metric got worse by more than --threshold.
+
+Usage:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --quick --baseline bench.json --threshold 0.25
+    python -m benchmarks.suite --sections ranking --ranking-sizes 1000,10000,100000
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(BACKEND_DIR, '..', 'Theme 2 - Sample Data')
+sys.path.insert(0, BACKEND_DIR)
+
+SECTIONS = ['parser', 'jd', 'ranking', 'http']
+INSERT_CHUNK = 5000
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def timed(fn, repeat, warmup=0):
+    """Call fn warmup + repeat times; returns the timed durations in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    # As timeit does, keep collector pauses out of the numbers
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            durations.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+    return durations
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit='ms', better='lower'):
+        self.metrics[name] = {'value': round(value, 3), 'unit': unit, 'better': better}
+
+    def add_latencies(self, name, durations, levels=('p50', 'p95', 'p99')):
+        fractions = {'p50': 0.50, 'p95': 0.95, 'p99': 0.99}
+        for level in levels:
+            self.add(f'{name}.{level}_ms', percentile(durations, fractions[level]))
+
+class quiet:
+    """Silence the services' progress prints while timing them"""
+
+    def __enter__(self):
+        self._stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+
+    def __exit__(self, *exc):
+        sys.stdout.close()
+        sys.stdout = self._stdout
+
+def bench_parser(results, args):
+    from services.resume_parser import ResumeParser
+    import docx
+
+    parser = ResumeParser()
+    pdfs = sorted(glob.glob(os.path.join(SAMPLE_DIR, 'Resumes', '*.pdf')))
+
+    # DOCX copies of the same resumes so both file types parse comparable content
+    docx_dir = tempfile.mkdtemp(prefix='bench_docx_')
+    docx_files = []
+    for index, path in enumerate(pdfs):
+        document = docx.Document()
+        for line in parser.extract_text(path, 'pdf').split('\n'):
+            document.add_paragraph(line)
+        docx_path = os.path.join(docx_dir, f'resume_{index}.docx')
+        document.save(docx_path)
+        docx_files.append(docx_path)
+
+    for file_type, files in (('pdf', pdfs), ('docx', docx_files)):
+        durations = []
+        for path in files:
+            durations += timed(lambda: parser.parse_resume(path, file_type), args.repeat, warmup=1)
+        results.add_latencies(f'parser.{file_type}', durations, levels=('p50', 'p95'))
+        results.add(f'parser.{file_type}.files_per_second', 1000 * len(durations) / sum(durations),
+                    unit='files/s', better='higher')
+
+def bench_jd(results, args):
+    from services.jd_pdf_parser import JDPDFParser
+
+    durations = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, 'JD', '*.pdf'))):
+        durations += timed(lambda: JDPDFParser.extract_text(path), args.repeat * 3, warmup=1)
+    results.add_latencies('jd.extract_text', durations, levels=('p50', 'p95'))
+
+def seed_job(user_id, analyses, rng, title):
+    """Bulk-insert a job with `analyses` resumes and completed analyses; returns the job id"""
+    from __init__ import db
+    from models import JobDescription, Resume, ResumeAnalysis, compress_text, make_text_preview
+
+    job = JobDescription(title=title, description='Python SQL machine learning',
+                         requirements='3+ years of experience with Python and SQL', created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+
+    text = 'Python SQL pandas machine learning. 4 years of experience.'
+    first_resume_id = (db.session.query(db.func.max(Resume.id)).scalar() or 0) + 1
+    for start in range(0, analyses, INSERT_CHUNK):
+        count = min(INSERT_CHUNK, analyses - start)
+        db.session.execute(Resume.__table__.insert(), [{
+            'filename': f'r{start + i}.pdf', 'original_filename': f'r{start + i}.pdf', 'file_path': '/dev/null',
+            'file_type': 'PDF', 'text_data': compress_text(text), 'text_preview': make_text_preview(text),
+            'user_id': user_id
+        } for i in range(count)])
+        db.session.execute(ResumeAnalysis.__table__.insert(), [{
+            'resume_id': first_resume_id + start + i, 'job_id': job.id, 'analysis_status': 'completed',
+            'relevance_score': round(rng.uniform(20, 99), 1), 'verdict': 'Medium', 'is_in_queue': False
+        } for i in range(count)])
+        db.session.commit()
+    return job.id
+
+def bench_ranking(results, args, user_id):
+    from __init__ import db
+    from models import JobDescription, ResumeAnalysis
+    from services.ranking_service import ranking_service
+
+    rng = random.Random(args.seed)
+    for size in args.ranking_sizes:
+        with quiet():
+            job_id = seed_job(user_id, size, rng, f'Ranking {size}')
+        label = f'ranking.{size // 1000}k'
+        repeat = 3 if size >= 100000 else max(args.repeat, 5)
+
+        with quiet():
+            results.add(f'{label}.rank_all_ms', timed(lambda: ranking_service.update_ranking(job_id), 1)[0])
+
+        # One analysis changes score, as when a new result lands
+        target_ids = [row.id for row in ResumeAnalysis.query.with_entities(ResumeAnalysis.id)
+                      .filter(ResumeAnalysis.job_id == job_id).limit(repeat * 2)]
+
+        def rerank():
+            analysis_id = target_ids.pop()
+            db.session.execute(ResumeAnalysis.__table__.update()
+                               .where(ResumeAnalysis.__table__.c.id == analysis_id)
+                               .values(relevance_score=99.9))
+            ranking_service.update_ranking(job_id)
+        with quiet():
+            results.add(f'{label}.rerank_ms', percentile(timed(rerank, repeat, warmup=repeat), 0.5))
+
+        def snapshot_cold():
+            ranking_service.bump_ranking_version(job_id)
+            ranking_service.get_rankings_snapshot(job_id, 50)
+        with quiet():
+            results.add(f'{label}.snapshot_cold_ms', percentile(timed(snapshot_cold, repeat), 0.5))
+            results.add(f'{label}.snapshot_warm_ms',
+                        percentile(timed(lambda: ranking_service.get_rankings_snapshot(job_id, 50), 20), 0.5))
+            results.add(f'{label}.queue_status_ms',
+                        percentile(timed(lambda: ranking_service.get_queue_status(job_id), repeat), 0.5))
+            since = max(db.session.query(JobDescription.ranking_version).filter_by(id=job_id).scalar() - 1, 0)
+            results.add(f'{label}.changes_ms',
+                        percentile(timed(lambda: ranking_service.get_ranking_changes(job_id, since), repeat), 0.5))
+        db.session.remove()
+
+def bench_http(results, args, client, user_id):
+    from __init__ import db
+    from models import Application, ResumeAnalysis
+
+    with quiet():
+        job_id = seed_job(user_id, args.http_analyses, random.Random(args.seed), 'HTTP')
+    analyses = ResumeAnalysis.query.filter_by(job_id=job_id).limit(100).all()
+    db.session.add_all([Application(user_id=user_id, job_id=job_id, resume_id=analysis.resume_id)
+                        for analysis in analyses])
+    db.session.commit()
+    db.session.remove()
+
+    endpoints = {
+        'jobs_list': '/api/jobs/',
+        'job_detail': f'/api/jobs/{job_id}',
+        'rankings': f'/api/admin/jobs/{job_id}/rankings',
+        'queue_status': f'/api/admin/jobs/{job_id}/queue-status',
+        'admin_analyses': '/api/admin/analyses',
+        'admin_stats': '/api/admin/stats',
+        'admin_dashboard': '/api/admin/dashboard',
+        'resumes_list': '/api/resumes/',
+        'applications_list': '/api/applications/',
+        'health': '/api/admin/health',
+    }
+    for name, url in endpoints.items():
+        def request():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise SystemExit(f"GET {url} returned {response.status_code}")
+        with quiet():
+            durations = timed(request, args.http_requests, warmup=3)
+        results.add_latencies(f'http.{name}', durations)
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Metrics present in both runs that got worse by more than threshold"""
+    regressions = []
+    for name, metric in current.items():
+        previous = baseline.get(name)
+        if not previous or not previous['value']:
+            continue
+        change = (metric['value'] - previous['value']) / previous['value']
+        worse = change > threshold if metric['better'] == 'lower' else change < -threshold
+        # Sub-millisecond timings swing by large ratios on noise alone
+        if worse and metric['unit'] == 'ms' and abs(metric['value'] - previous['value']) < min_delta_ms:
+            worse = False
+        if worse:
+            regressions.append((name, previous['value'], metric['value'], change))
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sections', default=','.join(SECTIONS), help='Comma-separated subset of ' + ','.join(SECTIONS))
+    arg_parser.add_argument('--ranking-sizes', default='1000,10000,100000')
+    arg_parser.add_argument('--quick', action='store_true', help='Ranking sizes 1k and 10k only, fewer repeats')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--http-requests', type=int, default=50)
+    arg_parser.add_argument('--http-analyses', type=int, default=1000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', help='Write the JSON results here (default: stdout)')
+    arg_parser.add_argument('--baseline', help='Earlier results to compare against')
+    arg_parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative slowdown (0.25 = 25%%)')
+    arg_parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore smaller absolute slowdowns')
+    args = arg_parser.parse_args()
+
+    sections = [section for section in args.sections.split(',') if section]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        arg_parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+    args.ranking_sizes = [int(size) for size in args.ranking_sizes.split(',')]
+    if args.quick:
+        args.ranking_sizes = [size for size in args.ranking_sizes if size <= 10000]
+        args.repeat = min(args.repeat, 3)
+        args.http_requests = min(args.http_requests, 20)
+
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'AUTO_MIGRATE': 'true',
+        'AI_BACKEND': 'synthetic',
+        'SQLITE_WRITE_QUEUE': 'false'
+    })
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    os.chdir(workdir)
+
+    results = Results()
+    started = time.perf_counter()
+    if 'parser' in sections:
+        bench_parser(results, args)
+    if 'jd' in sections:
+        bench_jd(results, args)
+
+    if 'ranking' in sections or 'http' in sections:
+        with quiet():
+            from __init__ import create_app
+            from models import User
+            app = create_app()
+        client = app.test_client()
+        client.post('/api/auth/register', json={'username': 'bench', 'email': 'bench@example.com',
+                                                'password': 'bench', 'is_admin': True})
+        with app.app_context():
+            user_id = User.query.filter_by(username='bench').first().id
+            if 'ranking' in sections:
+                bench_ranking(results, args, user_id)
+            if 'http' in sections:
+                bench_http(results, args, client, user_id)
+
+    document = {
+        'commit': git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sections': sections,
+        'seconds': round(time.perf_counter() - started, 1),
+        'metrics': results.metrics
+    }
+    output = json.dumps(document, indent=2, sort_keys=True)
+    if args.output:
+        with open(os.path.join(BACKEND_DIR, args.output) if not os.path.isabs(args.output) else args.output, 'w') as out:
+            out.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        baseline_path = args.baseline if os.path.isabs(args.baseline) else os.path.join(BACKEND_DIR, args.baseline)
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results.metrics, baseline['metrics'], args.threshold, args.min_delta_ms)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before} -> {after} ({change:+.0%})", file=sys.stderr)
+        print(f"Compared {len(results.metrics)} metrics with {baseline.get('commit')}: "
+              f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Query plan check - exercises the hot read paths (ranking service and GET routes) against a
+scratch database, captures every SELECT they issue, EXPLAINs each one and exits with status 1
+if any of them falls back to a full table scan. tests/test_query_plans.py runs the same check on
+SQLite under pytest; this script also runs it against PostgreSQL.
+
+Usage:
+    python check_query_plans.py             # scratch SQLite database
+    DATABASE_URL=postgresql://... python check_query_plans.py --keep-database
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+# Whole-table aggregates with no filter have to read every row; they are not access-path bugs
+UNFILTERED_AGGREGATE = re.compile(r'^SELECT count\(\*\) AS count_1\s+FROM \(SELECT .+? FROM \w+\) AS anon_1$', re.S)
+
+def plan_scans(connection, dialect, statement, parameters):
+    """Return the full table scans in a statement's plan"""
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        # "SCAN table" without an index; SEARCH and "SCAN ... USING INDEX" are index access
+        return [row[3] for row in rows if re.match(r'^SCAN \w+( AS \w+)?$', row[3])]
+
+    rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).fetchall()
+    return [row[0].strip() for row in rows if 'Seq Scan on' in row[0]]
+
+def exercise_hot_paths(app, client):
+    """Seed a few jobs/resumes/analyses, then drive the read paths whose queries we care about"""
+    from __init__ import db
+    from models import User, JobDescription, Resume, ResumeAnalysis, Application
+    from services.ranking_service import ranking_service
+
+    client.post('/api/auth/register', json={'username': 'planner', 'email': 'planner@example.com',
+                                            'password': 'pw', 'is_admin': True})
+    with app.app_context():
+        user = User.query.filter_by(username='planner').first()
+        jobs = [JobDescription(title=f'Job {i}', description='Python SQL', created_by=user.id) for i in range(3)]
+        db.session.add_all(jobs)
+        db.session.flush()
+        for i in range(30):
+            resume = Resume(user_id=user.id, filename=f'r{i}.pdf', original_filename=f'r{i}.pdf',
+                            file_path='/dev/null', file_type='PDF')
+            resume.text = 'Python SQL'
+            db.session.add(resume)
+            db.session.flush()
+            job = jobs[i % 3]
+            status = ('completed', 'pending', 'processing', 'failed')[i % 4]
+            db.session.add(ResumeAnalysis(resume_id=resume.id, job_id=job.id, analysis_status=status,
+                                          relevance_score=float(i * 7 % 100), verdict='Medium'))
+            db.session.add(Application(user_id=user.id, job_id=job.id, resume_id=resume.id))
+        db.session.commit()
+        user_id, job_id = user.id, jobs[0].id
+        analysis = ResumeAnalysis.query.filter_by(job_id=job_id, analysis_status='pending').first()
+        analysis_id, resume_id = analysis.id, analysis.resume_id
+
+    # Ranking service
+    with app.app_context():
+        ranking_service.add_to_queue(analysis_id, job_id)
+        ranking_service.update_ranking(job_id)
+        ranking_service.promote_high_score_resume(job_id, min_score=50.0)
+        ranking_service.get_next_in_queue(job_id)
+        ranking_service.get_queue_status(job_id)
+        ranking_service.get_ranking_changes(job_id, 0)
+        # Existence check shared by apply_for_job, analyze_resume and test_analysis
+        ResumeAnalysis.query.filter(ResumeAnalysis.resume_id == resume_id,
+                                    ResumeAnalysis.job_id == job_id).first()
+        Application.query.filter(Application.user_id == user_id, Application.job_id == job_id).first()
+        Application.query.filter_by(application_status='pending').all()
+
+    # Routes
+    for url in ['/api/jobs/', '/api/jobs/?is_active=false', f'/api/jobs/{job_id}',
+                '/api/admin/dashboard', f'/api/admin/jobs/{job_id}/rankings',
+                f'/api/admin/jobs/{job_id}/rankings/changes?since=0', f'/api/admin/jobs/{job_id}/queue-status',
+                '/api/admin/analyses', '/api/admin/analyses?status=completed',
+                f'/api/admin/analyses?job_id={job_id}', '/api/admin/analyses?verdict=Medium',
+                '/api/admin/users', '/api/admin/stats', '/api/admin/debug/system-status',
+                '/api/applications/', '/api/applications/?status=pending',
+                '/api/resumes/', '/api/resumes/analyses', f'/api/resumes/analyses?job_id={job_id}']:
+        response = client.get(url)
+        if response.status_code != 200:
+            raise SystemExit(f"GET {url} returned {response.status_code}")
+
+def capture_hot_path_queries(app) -> Dict[str, object]:
+    """Every distinct SELECT the hot paths issue, with the parameters of its first run"""
+    from sqlalchemy import event
+    from __init__ import db
+
+    with app.app_context():
+        engine = db.engine
+    captured = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            captured.setdefault(statement, parameters)
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        exercise_hot_paths(app, app.test_client())
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return captured
+
+def full_table_scans(app, captured: Dict[str, object], verbose: bool = False) -> List[Tuple[str, List[str]]]:
+    """(statement, scans) for each captured statement whose plan reads a whole table"""
+    from __init__ import db
+
+    with app.app_context():
+        engine = db.engine
+    dialect = engine.dialect.name
+    failures = []
+    with engine.connect() as connection:
+        if dialect == 'postgresql':
+            # Tiny tables make seq scans look cheapest; ask whether an index path exists at all
+            connection.exec_driver_sql('SET enable_seqscan = off')
+        for statement, parameters in captured.items():
+            scans = plan_scans(connection, dialect, statement, parameters)
+            if scans and UNFILTERED_AGGREGATE.match(' '.join(statement.split())):
+                continue
+            if scans:
+                failures.append((statement, scans))
+            elif verbose:
+                print(f"OK   {' '.join(statement.split())[:160]}")
+    return failures
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--keep-database', action='store_true', help='Use DATABASE_URL as is (must be disposable)')
+    arg_parser.add_argument('--verbose', action='store_true', help='Print every plan, not only failures')
+    args = arg_parser.parse_args()
+
+    if not args.keep_database:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+    os.environ['SQLITE_WRITE_QUEUE'] = 'false'
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+
+    from __init__ import create_app
+    from db_migrations import run_migrations
+
+    app = create_app()
+    with app.app_context():
+        run_migrations()
+
+    captured = capture_hot_path_queries(app)
+    failures = full_table_scans(app, captured, args.verbose)
+
+    for statement, scans in failures:
+        print(f"FULL SCAN {', '.join(scans)}\n    {' '.join(statement.split())[:400]}")
+
+    print(f"{len(captured)} distinct queries checked, {len(failures)} full table scan(s)")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,125 @@ class Config:
     JWT_COOKIE_NAME = 'access_token_cookie'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = 'uploads'
+    
+    # Fast boot skips loading Flask-Migrate/Alembic (only needed for the `flask db` CLI)
+    FAST_BOOT = os.getenv('FAST_BOOT', 'true').lower() == 'true'
+    
+    # Run pending schema migrations inside create_app (off by default: run migrate_*.py / init_db.py instead)
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'false').lower() == 'true'
+    
+    # Response caching: 'memory' (per process) or 'redis' (shared across workers)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))  # seconds
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_COALESCE_SECONDS = float(os.getenv('RESPONSE_CACHE_COALESCE_SECONDS', 10))  # Job listing bumps for application counts
+    
+    # Server-Sent Events: 'memory' (per process) or 'redis' (fan-out across workers)
+    EVENT_BACKEND = os.getenv('EVENT_BACKEND', 'memory')
+    EVENT_REDIS_URL = os.getenv('EVENT_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 100))  # Per subscriber, before a resync
+    EVENT_MAX_SUBSCRIBERS = int(os.getenv('EVENT_MAX_SUBSCRIBERS', 10000))
+    EVENT_HEARTBEAT_SECONDS = int(os.getenv('EVENT_HEARTBEAT_SECONDS', 15))
+    EVENT_STREAM_MAX_AGE = int(os.getenv('EVENT_STREAM_MAX_AGE', 300))  # Clients reconnect after this
+    
+    # Prometheus metrics at /metrics: 'memory' (per process) or 'redis' (summed across workers)
+    METRICS_BACKEND = os.getenv('METRICS_BACKEND', 'memory')
+    METRICS_REDIS_URL = os.getenv('METRICS_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    METRICS_FLUSH_SECONDS = int(os.getenv('METRICS_FLUSH_SECONDS', 5))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Optional bearer token required to scrape
+    
+    # Per-request SQL accounting: slow-query log, X-DB-* headers (always on in debug), @query_budget
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 200))
+    QUERY_DEBUG_HEADERS = os.getenv('QUERY_DEBUG_HEADERS', 'false').lower() == 'true'
+    QUERY_REPEAT_WARN = int(os.getenv('QUERY_REPEAT_WARN', 20))  # Same statement this often = likely N+1
+    # Over-budget requests fail (instead of logging) when this is set or the app is in testing mode
+    QUERY_BUDGET_ENFORCE = os.getenv('QUERY_BUDGET_ENFORCE', 'false').lower() == 'true'
+    
+    # Request profiling: admins send "X-Profile: cprofile|sampling"; a sampled share of requests is profiled too
+    PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')  # cprofile (deterministic) or sampling
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # 0.01 = 1% of requests
+    PROFILE_SAMPLE_INTERVAL_MS = int(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_RETENTION = int(os.getenv('PROFILE_RETENTION', 200))  # Newest captures kept
+    
+    # Readiness (/api/health/ready): each check is degraded at the first threshold and down at the second
+    READINESS_CACHE_SECONDS = float(os.getenv('READINESS_CACHE_SECONDS', 2))
+    READY_DB_DEGRADED_MS = float(os.getenv('READY_DB_DEGRADED_MS', 200))
+    READY_DB_DOWN_MS = float(os.getenv('READY_DB_DOWN_MS', 2000))
+    READY_POOL_DEGRADED = float(os.getenv('READY_POOL_DEGRADED', 0.8))  # Share of pool_size + max_overflow in use
+    READY_POOL_DOWN = float(os.getenv('READY_POOL_DOWN', 1.0))
+    READY_QUEUE_AGE_DEGRADED_SECONDS = float(os.getenv('READY_QUEUE_AGE_DEGRADED_SECONDS', 600))  # Oldest pending
+    # Queue age and worker saturation are load every instance shares, so they only mark one down when set
+    READY_QUEUE_AGE_DOWN_SECONDS = float(os.getenv('READY_QUEUE_AGE_DOWN_SECONDS')) if os.getenv('READY_QUEUE_AGE_DOWN_SECONDS') else None
+    # Analyses one process is sized to run at once; saturation is running / capacity
+    ANALYSIS_WORKER_CAPACITY = int(os.getenv('ANALYSIS_WORKER_CAPACITY', 8))
+    READY_WORKERS_DEGRADED = float(os.getenv('READY_WORKERS_DEGRADED', 0.8))
+    READY_WORKERS_DOWN = float(os.getenv('READY_WORKERS_DOWN')) if os.getenv('READY_WORKERS_DOWN') else None
+    
+    # Queue ETAs: moving averages of analysis run time and worker concurrency (weight of each new sample)
+    QUEUE_ETA_ALPHA = float(os.getenv('QUEUE_ETA_ALPHA', 0.2))
+    QUEUE_ETA_DEFAULT_SERVICE_SECONDS = float(os.getenv('QUEUE_ETA_DEFAULT_SERVICE_SECONDS', 120))  # Until measured
+    QUEUE_ETA_WARM_SAMPLES = int(os.getenv('QUEUE_ETA_WARM_SAMPLES', 50))  # Recent runs a new process starts from
+    
+    # Admission control on analysis submission: queued with 202 at worker capacity and with 503 past the
+    # soft limit, refused with 429 past a user's in-flight cap; 503s and 429s carry Retry-After
+    ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+    ADMISSION_QUEUE_SOFT_LIMIT = int(os.getenv('ADMISSION_QUEUE_SOFT_LIMIT', 200))  # Pending analyses; 503 past it
+    ADMISSION_USER_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_USER_MAX_IN_FLIGHT', 10))  # Pending + processing, 0 = no cap
+    ADMISSION_RETRY_AFTER_MAX = int(os.getenv('ADMISSION_RETRY_AFTER_MAX', 600))  # seconds
+    # Background sweep: drains pending analyses and re-queues ones processing for too long (0 = no sweep)
+    ANALYSIS_SWEEP_SECONDS = float(os.getenv('ANALYSIS_SWEEP_SECONDS', 60))
+    ANALYSIS_STALE_PROCESSING_SECONDS = int(os.getenv('ANALYSIS_STALE_PROCESSING_SECONDS', 900))
+    
+    # Analysis scheduling: priority classes share the workers by weight and each class' jobs share it equally
+    SCHEDULER_WEIGHTS = os.getenv('SCHEDULER_WEIGHTS', 'interactive:16,bulk:4,backfill:1')
+    SCHEDULER_AGING_SECONDS = float(os.getenv('SCHEDULER_AGING_SECONDS', 300))  # A class unserved this long goes next
+    
+    # Backfill jobs: pending applications analyzed in checkpointed chunks, resumable by any process once the lease lapses
+    BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', 50))
+    BACKFILL_LEASE_SECONDS = int(os.getenv('BACKFILL_LEASE_SECONDS', 120))  # Heartbeat age after which a running job counts as interrupted
+    BACKFILL_POLL_SECONDS = float(os.getenv('BACKFILL_POLL_SECONDS', 2))
+    
+    # SQLite concurrency: WAL journal, lock wait instead of "database is locked", one writer thread
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_WRITE_QUEUE = os.getenv('SQLITE_WRITE_QUEUE', 'true').lower() == 'true'
+    SQLITE_WRITE_BATCH_SIZE = int(os.getenv('SQLITE_WRITE_BATCH_SIZE', 50))  # Writes per commit
+    SQLITE_WRITE_BATCH_WINDOW_MS = int(os.getenv('SQLITE_WRITE_BATCH_WINDOW_MS', 5))
+    
+    # Connection pool profile for this process: 'web' (many short requests) or 'worker' (long analyses)
+    DB_ROLE = os.getenv('DB_ROLE', 'web')
+    DB_POOL_PROFILES = {
+        'web': {'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 10, 'pool_recycle': 1800, 'statement_timeout_ms': 15000},
+        'worker': {'pool_size': 4, 'max_overflow': 4, 'pool_timeout': 60, 'pool_recycle': 1800, 'statement_timeout_ms': 120000}
+    }
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # Optional per-setting overrides of the selected profile
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE')) if os.getenv('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW')) if os.getenv('DB_MAX_OVERFLOW') else None
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT')) if os.getenv('DB_POOL_TIMEOUT') else None
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE')) if os.getenv('DB_POOL_RECYCLE') else None
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS')) if os.getenv('DB_STATEMENT_TIMEOUT_MS') else None
+    
+    # Read replica for heavy GET endpoints; clients stay on the primary this long after a write
+    SQLALCHEMY_REPLICA_URI = os.getenv('DATABASE_REPLICA_URL')
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+    
+    # Analysis prompt size; the job section gets its own share, the resume fills the rest
+    PROMPT_MAX_TOKENS = int(os.getenv('PROMPT_MAX_TOKENS', 6000))
+    PROMPT_JOB_MAX_TOKENS = int(os.getenv('PROMPT_JOB_MAX_TOKENS', 2000))
+    
+    # Gemini circuit breaker: opens when either rate over the rolling window crosses its threshold
+    GEMINI_BREAKER_WINDOW_SECONDS = float(os.getenv('GEMINI_BREAKER_WINDOW_SECONDS', 60))
+    GEMINI_BREAKER_MIN_CALLS = int(os.getenv('GEMINI_BREAKER_MIN_CALLS', 10))
+    GEMINI_BREAKER_FAILURE_RATE = float(os.getenv('GEMINI_BREAKER_FAILURE_RATE', 0.5))
+    GEMINI_BREAKER_SLOW_CALL_SECONDS = float(os.getenv('GEMINI_BREAKER_SLOW_CALL_SECONDS', 15))
+    GEMINI_BREAKER_SLOW_RATE = float(os.getenv('GEMINI_BREAKER_SLOW_RATE', 0.5))
+    GEMINI_BREAKER_OPEN_SECONDS = float(os.getenv('GEMINI_BREAKER_OPEN_SECONDS', 30))
+    GEMINI_BREAKER_HALF_OPEN_CALLS = int(os.getenv('GEMINI_BREAKER_HALF_OPEN_CALLS', 2))
+    GEMINI_RESCORE_BATCH_SIZE = int(os.getenv('GEMINI_RESCORE_BATCH_SIZE', 20))
+    GEMINI_RESCORE_MAX_ATTEMPTS = int(os.getenv('GEMINI_RESCORE_MAX_ATTEMPTS', 3))  # Per analysis, per process
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -0,0 +1,236 @@
+"""
+Lightweight schema migrations for Resume Analyzer
+Each migration runs once per database and is recorded in the schema_migrations table.
+"""
+from __init__ import db
+from datetime import datetime
+from sqlalchemy import inspect, text
+import json
+
+BACKFILL_BATCH_SIZE = 500
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+
+    id = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def _column_names(table_name):
+    return {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+
+def _add_column(table_name, column_name, column_type, default=None):
+    """Add a column if it is missing (create_all never alters existing tables)"""
+    if column_name in _column_names(table_name):
+        return False
+
+    ddl = f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type.compile(dialect=db.engine.dialect)}'
+    if default is not None:
+        ddl += f' DEFAULT {default} NOT NULL'
+    with db.engine.begin() as connection:
+        connection.execute(text(ddl))
+    return True
+
+def migrate_compact_resume_text():
+    """Move resume text into a single compressed column and strip it from parsed_data"""
+    from models import Resume, TEXT_PREVIEW_LENGTH
+
+    _add_column('resumes', 'text_data', db.LargeBinary())
+    _add_column('resumes', 'text_preview', db.String(TEXT_PREVIEW_LENGTH + 3))
+    _add_column('resumes', 'parsed_data_blob', db.LargeBinary())
+
+    last_id = 0
+    while True:
+        resumes = Resume.query\
+            .options(db.undefer(Resume.extracted_text), db.undefer(Resume.text_data), db.undefer(Resume.parsed_data))\
+            .filter(Resume.id > last_id)\
+            .filter(Resume.text_preview.is_(None))\
+            .order_by(Resume.id.asc())\
+            .limit(BACKFILL_BATCH_SIZE)\
+            .all()
+
+        if not resumes:
+            break
+
+        for resume in resumes:
+            parsed_data = json.loads(resume.parsed_data) if resume.parsed_data else {}
+            resume_text = resume.extracted_text or parsed_data.get('cleaned_text') or ''
+            if resume.text_data is not None:
+                resume_text = resume.text
+
+            resume.set_parsed_data(dict(parsed_data, cleaned_text=resume_text))
+            if not parsed_data:
+                resume.parsed_data_blob = None
+
+        last_id = resumes[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+
+def migrate_ranking_change_log():
+    """Add the per-job ranking version used by the ranking_changes log"""
+    _add_column('job_descriptions', 'ranking_version', db.Integer(), default=0)
+
+# Frozen copies of the columns the migrations index. Migrations build their indexes from these,
+# never from models.py, so each one creates exactly what existed when it was written
+_frozen = db.MetaData()
+_analyses = db.Table(
+    'resume_analyses', _frozen,
+    db.Column('id', db.Integer), db.Column('resume_id', db.Integer), db.Column('job_id', db.Integer),
+    db.Column('relevance_score', db.Float), db.Column('verdict', db.String(20)),
+    db.Column('is_in_queue', db.Boolean), db.Column('queue_position', db.Integer),
+    db.Column('analysis_status', db.String(20)), db.Column('created_at', db.DateTime),
+    db.Column('analysis_completed_at', db.DateTime), db.Column('priority', db.String(20))
+)
+_applications = db.Table(
+    'applications', _frozen,
+    db.Column('user_id', db.Integer), db.Column('application_status', db.String(20)),
+    db.Column('applied_at', db.DateTime)
+)
+_resumes = db.Table('resumes', _frozen, db.Column('user_id', db.Integer), db.Column('uploaded_at', db.DateTime))
+_jobs = db.Table('job_descriptions', _frozen, db.Column('is_active', db.Boolean), db.Column('created_at', db.DateTime))
+_users = db.Table('users', _frozen, db.Column('is_admin', db.Boolean), db.Column('created_at', db.DateTime))
+
+# 0003_hot_path_indexes
+INDEXES_0003 = [
+    db.Index('uq_resume_analysis_resume_job', _analyses.c.resume_id, _analyses.c.job_id, unique=True),
+    db.Index('idx_resume_analysis_job_status_score', _analyses.c.job_id, _analyses.c.analysis_status,
+             _analyses.c.relevance_score.desc()),
+    db.Index('idx_resume_analysis_queued', _analyses.c.job_id, _analyses.c.analysis_status,
+             _analyses.c.queue_position,
+             sqlite_where=_analyses.c.is_in_queue == True,
+             postgresql_where=_analyses.c.is_in_queue == True),
+    db.Index('idx_resume_analysis_status_created', _analyses.c.analysis_status, _analyses.c.created_at),
+    db.Index('idx_resume_analysis_created', _analyses.c.created_at),
+    db.Index('idx_resume_analysis_verdict', _analyses.c.verdict),
+    db.Index('idx_applications_status', _applications.c.application_status),
+    db.Index('idx_applications_user_applied', _applications.c.user_id, _applications.c.applied_at),
+    db.Index('idx_applications_applied', _applications.c.applied_at),
+    db.Index('idx_resumes_user_uploaded', _resumes.c.user_id, _resumes.c.uploaded_at),
+    db.Index('idx_job_descriptions_active_created', _jobs.c.is_active, _jobs.c.created_at),
+    db.Index('idx_users_admin', _users.c.is_admin),
+    db.Index('idx_users_created', _users.c.created_at),
+]
+
+# 0006_analysis_stage_timings
+INDEXES_0006 = [
+    db.Index('idx_resume_analysis_completed', _analyses.c.analysis_completed_at),
+]
+
+# 0007_analysis_priority (needs the priority column the migration adds first)
+INDEXES_0007 = [
+    db.Index('idx_resume_analysis_status_priority_job', _analyses.c.analysis_status, _analyses.c.priority,
+             _analyses.c.job_id, _analyses.c.queue_position),
+]
+
+def _create_indexes(indexes):
+    for index in indexes:
+        index.create(db.engine, checkfirst=True)
+
+def _dedupe_resume_analyses():
+    """Keep one analysis per (resume, job) so the unique index can be built; returns affected job ids"""
+    # Plain SQL over baseline columns: the current model selects columns later migrations add
+    duplicates = db.session.execute(text(
+        'SELECT resume_id, job_id FROM resume_analyses GROUP BY resume_id, job_id HAVING COUNT(id) > 1'
+    )).all()
+    
+    affected_jobs = set()
+    for resume_id, job_id in duplicates:
+        pair = {'resume_id': resume_id, 'job_id': job_id}
+        analyses = db.session.execute(text(
+            'SELECT id, analysis_status FROM resume_analyses WHERE resume_id = :resume_id AND job_id = :job_id'
+        ), pair).all()
+        # Prefer a completed analysis, then the most recent one
+        keep = max(analyses, key=lambda analysis: (analysis.analysis_status == 'completed', analysis.id))
+        db.session.execute(text(
+            'DELETE FROM resume_analyses WHERE resume_id = :resume_id AND job_id = :job_id AND id != :keep'
+        ), dict(pair, keep=keep.id))
+        affected_jobs.add(job_id)
+    
+    db.session.commit()
+    return affected_jobs
+
+def migrate_hot_path_indexes():
+    """Build the composite/partial indexes, including the unique (resume_id, job_id)"""
+    affected_jobs = _dedupe_resume_analyses()
+    if affected_jobs:
+        print(f"Removed duplicate analyses for {len(affected_jobs)} job(s); they are re-ranked after the migrations")
+    
+    _create_indexes(INDEXES_0003)
+    return affected_jobs
+
+def migrate_prompt_stats():
+    """Add the per-analysis prompt token sizes"""
+    _add_column('resume_analyses', 'prompt_stats', db.Text())
+
+def migrate_job_requirement_profiles():
+    """Add the structured requirement set and extract it for existing jobs"""
+    from models import JobDescription
+    from services.job_requirements import extract_requirements
+
+    _add_column('job_descriptions', 'requirement_profile', db.Text())
+
+    last_id = 0
+    while True:
+        jobs = JobDescription.query\
+            .filter(JobDescription.id > last_id)\
+            .filter(JobDescription.requirement_profile.is_(None))\
+            .order_by(JobDescription.id.asc())\
+            .limit(BACKFILL_BATCH_SIZE)\
+            .all()
+
+        if not jobs:
+            break
+
+        for job in jobs:
+            job.set_requirement_profile(extract_requirements(job))
+
+        last_id = jobs[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+
+def migrate_analysis_stage_timings():
+    """Add the per-stage timing columns and the completion-time index the timing report filters on"""
+    for stage in ('resume_parse', 'jd', 'prompt', 'llm', 'response_parse', 'ranking', 'total'):
+        _add_column('resume_analyses', f'{stage}_ms', db.Integer())
+    _create_indexes(INDEXES_0006)
+
+def migrate_analysis_priority():
+    """Add the scheduling class (existing analyses are interactive) and the scheduler's index"""
+    _add_column('resume_analyses', 'priority', db.String(20), default="'interactive'")
+    _create_indexes(INDEXES_0007)
+
+# Ordered list of (migration id, function); append new migrations at the end. A migration may
+# return job ids whose rankings need rebuilding once the schema is current
+MIGRATIONS = [
+    ('0001_compact_resume_text', migrate_compact_resume_text),
+    ('0002_ranking_change_log', migrate_ranking_change_log),
+    ('0003_hot_path_indexes', migrate_hot_path_indexes),
+    ('0004_prompt_stats', migrate_prompt_stats),
+    ('0005_job_requirement_profiles', migrate_job_requirement_profiles),
+    ('0006_analysis_stage_timings', migrate_analysis_stage_timings),
+    ('0007_analysis_priority', migrate_analysis_priority),
+]
+
+def run_migrations():
+    """Create missing tables and apply pending migrations in order"""
+    db.create_all()
+
+    applied = {migration.id for migration in SchemaMigration.query.all()}
+    newly_applied = []
+    rerank_jobs = set()
+
+    for migration_id, migration in MIGRATIONS:
+        if migration_id in applied:
+            continue
+
+        rerank_jobs |= migration() or set()
+        db.session.add(SchemaMigration(id=migration_id))
+        db.session.commit()
+        newly_applied.append(migration_id)
+
+    # Ranking goes through the current models, so it waits until every migration has run
+    if rerank_jobs:
+        from services.ranking_service import ranking_service
+        for job_id in sorted(rerank_jobs):
+            ranking_service.update_ranking(job_id)
+
+    return newly_applied
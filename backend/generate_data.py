@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator - bulk-loads users, jobs, resumes, analyses and applications into the
+real schema so the database can be tried at production scale (N+1 queries, re-ranking cost,
+COUNT-heavy dashboards). Rows are written with batched Core inserts, not the ORM.
+
+Jobs and resumes are drawn from a handful of role families with realistic skill sets; analysis
+scores follow from the skill overlap between the resume and the job, so rankings, verdicts and
+missing skills are consistent. Resume and JD text lengths follow the sample PDFs. The same
+--seed and --as-of always produce the same dataset.
+
+Every generated user's password is --password. Run against an empty database (or one the
+generator has not loaded with the same seed).
+
+Example:
+    DATABASE_URL=sqlite:///scale.db python generate_data.py \\
+        --users 100000 --jobs 5000 --resumes 200000 --analyses 1000000
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from __init__ import create_app, db
+from models import User, JobDescription, Resume, ResumeAnalysis, Application, TIMING_STAGES, compress_text, make_text_preview
+from db_migrations import run_migrations
+from services.job_requirements import extract_requirements
+from services.ai_analyzer import LOCAL_SCORE_NOTE
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Theme 2 - Sample Data')
+
+# Used when the sample PDFs are not available (lengths of the bundled samples, in characters)
+DEFAULT_RESUME_LENGTHS = [3669, 2399, 2180, 5082, 3271, 2616, 2705, 3421, 2164, 2405]
+DEFAULT_JD_LENGTHS = [2344, 1950]
+
+PASSWORD_HASH_ITERATIONS = 600000
+
+# Canonical skill names from services.job_requirements, grouped into the roles jobs and resumes belong to
+ROLE_FAMILIES = {
+    'Data Analyst': (['sql', 'excel', 'python', 'data analysis', 'data visualization', 'power bi', 'tableau',
+                      'statistics'], ['pandas', 'numpy', 'r', 'etl', 'snowflake', 'communication']),
+    'Data Scientist': (['python', 'machine learning', 'statistics', 'pandas', 'scikit-learn', 'sql', 'numpy'],
+                       ['deep learning', 'tensorflow', 'pytorch', 'nlp', 'spark', 'aws', 'generative ai']),
+    'Data Engineer': (['python', 'sql', 'spark', 'airflow', 'etl', 'kafka', 'aws'],
+                      ['snowflake', 'databricks', 'hadoop', 'docker', 'scala', 'postgresql']),
+    'Backend Developer': (['python', 'java', 'rest', 'postgresql', 'docker', 'git', 'django'],
+                          ['flask', 'fastapi', 'spring', 'redis', 'kubernetes', 'aws', 'go']),
+    'Frontend Developer': (['javascript', 'typescript', 'react', 'html', 'css', 'git'],
+                           ['angular', 'vue', 'graphql', 'node.js', 'ci/cd', 'agile']),
+    'DevOps Engineer': (['linux', 'docker', 'kubernetes', 'terraform', 'aws', 'ci/cd', 'jenkins'],
+                        ['azure', 'gcp', 'python', 'git', 'devops', 'kafka']),
+    'Machine Learning Engineer': (['python', 'pytorch', 'tensorflow', 'machine learning', 'docker', 'aws'],
+                                  ['kubernetes', 'nlp', 'computer vision', 'generative ai', 'spark', 'airflow']),
+}
+# Relative share of jobs (and of candidates) per family
+FAMILY_WEIGHTS = [25, 20, 15, 15, 10, 8, 7]
+# Share of a job's applicants from the job's own family; the rest apply from anywhere
+SAME_FAMILY_SHARE = 0.6
+
+DISPLAY_NAMES = {
+    'sql': 'SQL', 'r': 'R', 'go': 'Go', 'aws': 'AWS', 'gcp': 'GCP', 'etl': 'ETL', 'nlp': 'NLP', 'css': 'CSS',
+    'html': 'HTML', 'rest': 'REST APIs', 'ci/cd': 'CI/CD', 'node.js': 'Node.js', 'power bi': 'Power BI',
+    'postgresql': 'PostgreSQL', 'javascript': 'JavaScript', 'typescript': 'TypeScript', 'pytorch': 'PyTorch',
+    'tensorflow': 'TensorFlow', 'scikit-learn': 'scikit-learn', 'numpy': 'NumPy', 'graphql': 'GraphQL',
+    'devops': 'DevOps', 'generative ai': 'Generative AI',
+}
+
+LEVELS = [('Junior', 0, 1), ('', 2, 4), ('Senior', 5, 7), ('Lead', 8, 10)]
+LEVEL_WEIGHTS = [30, 40, 22, 8]
+COMPANIES = ['Innomatics Research Labs', 'Axion Analytics', 'Northwind Data', 'BluePeak Systems', 'Kestrel Labs',
+             'Orbital Retail', 'Sapphire Fintech', 'Tidewater Health', 'Quanta Logistics', 'Meridian Media']
+LOCATIONS = ['Hyderabad', 'Bangalore', 'Pune', 'Delhi NCR', 'Chennai', 'Mumbai', 'Remote']
+EMPLOYMENT_TYPES = ['Full-time', 'Full-time', 'Full-time', 'Internship', 'Contract']
+EDUCATION = [('Bachelor of Technology in Computer Science', 55), ('Master of Science in Data Science', 20),
+             ('Bachelor of Science in Statistics', 12), ('Diploma in Information Technology', 8),
+             ('PhD in Computer Science', 5)]
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Ananya', 'Kabir', 'Meera', 'Rohan', 'Sara', 'Vikram', 'Priya',
+               'Arjun', 'Nisha', 'Karan', 'Tara', 'Dev', 'Leela', 'Omar', 'Zoya', 'Neel', 'Asha']
+LAST_NAMES = ['Sharma', 'Iyer', 'Reddy', 'Khan', 'Patel', 'Nair', 'Gupta', 'Das', 'Rao', 'Menon']
+
+# Neutral sentences (no skill names) used to bring text up to the sampled length
+FILLER = [
+    'Worked closely with stakeholders to turn loosely defined questions into clear deliverables.',
+    'Documented processes so that new team members could ramp up quickly.',
+    'Presented findings to leadership in weekly reviews and acted on their feedback.',
+    'Improved turnaround time on recurring requests by standardising the workflow.',
+    'Mentored interns and reviewed their work for correctness and clarity.',
+    'Owned the end-to-end delivery of the project from requirements to launch.',
+    'Reduced manual effort for the operations team by automating routine reports.',
+    'Coordinated with vendors and internal teams to meet tight deadlines.',
+    'Took part in hackathons and community meetups to keep skills current.',
+    'Maintained high quality standards through peer reviews and checklists.',
+]
+JD_FILLER = [
+    'You will join a small, fast-moving team that ships to customers every week.',
+    'The role involves working with product managers, designers and other engineers.',
+    'We value ownership, curiosity and clear writing.',
+    'You will help shape the roadmap and mentor junior members of the team.',
+    'Our customers range from early-stage startups to large enterprises.',
+    'We offer flexible working hours, learning budgets and health insurance.',
+    'Interviews consist of a short screening call, a take-home task and a panel discussion.',
+]
+
+def weighted_choice(rng, items, weights):
+    return rng.choices(items, weights=weights)[0]
+
+def display(skill):
+    return DISPLAY_NAMES.get(skill, skill.title())
+
+def pad_text(rng, text, target_length, filler):
+    """Append filler sentences until text reaches about target_length characters"""
+    parts = [text]
+    length = len(text)
+    while length < target_length:
+        sentence = rng.choice(filler)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return '\n'.join(parts)
+
+def password_hash(password, seed):
+    """A werkzeug-compatible pbkdf2 hash with a salt derived from the seed, so reruns match"""
+    salt = hashlib.sha256(f'generate_data:{seed}'.encode('utf-8')).hexdigest()[:16]
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), PASSWORD_HASH_ITERATIONS)
+    return f'pbkdf2:sha256:{PASSWORD_HASH_ITERATIONS}${salt}${digest.hex()}'
+
+def sample_text_lengths():
+    """Character counts of the sample resume and JD PDFs (the built-in defaults if they are missing)"""
+    from services.jd_pdf_parser import JDPDFParser
+
+    def lengths(pattern, default):
+        found = [len(JDPDFParser.extract_text(path)) for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, pattern)))]
+        found = [length for length in found if length]
+        return found or default
+
+    return lengths(os.path.join('Resumes', '*.pdf'), DEFAULT_RESUME_LENGTHS), \
+        lengths(os.path.join('JD', '*.pdf'), DEFAULT_JD_LENGTHS)
+
+def skewed_counts(rng, total, buckets, cap, exponent=0.8):
+    """Split total across buckets with a Zipf-like skew (a few popular jobs), none above cap"""
+    weights = [1 / (index + 1) ** exponent for index in range(buckets)]
+    rng.shuffle(weights)
+    scale = total / sum(weights)
+    counts = [min(int(weight * scale), cap) for weight in weights]
+    remainder = total - sum(counts)
+    # Spread what rounding and the cap left over across the buckets that still have room
+    while remainder > 0:
+        open_buckets = [bucket for bucket in range(buckets) if counts[bucket] < cap]
+        share = max(remainder // len(open_buckets), 1)
+        for bucket in open_buckets:
+            added = min(share, cap - counts[bucket], remainder)
+            counts[bucket] += added
+            remainder -= added
+            if not remainder:
+                break
+    return counts
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.as_of = datetime.strptime(args.as_of, '%Y-%m-%d')
+        self.batch_size = args.batch_size
+        self.families = list(ROLE_FAMILIES)
+        self.resume_lengths, self.jd_lengths = sample_text_lengths()
+        self.totals = {}
+
+    def rng(self, stream):
+        # One independent stream per table, so changing one volume does not reshuffle the others
+        return random.Random(f'{self.args.seed}:{stream}')
+
+    def timestamp(self, rng, days_back):
+        return self.as_of - timedelta(seconds=rng.randint(0, days_back * 86400))
+
+    def next_id(self, model):
+        return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+    def insert(self, model, rows, final=False):
+        """Write the buffered rows once a batch is full (or when final)"""
+        if rows and (final or len(rows) >= self.batch_size):
+            db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+            self.totals[model.__tablename__] = self.totals.get(model.__tablename__, 0) + len(rows)
+            rows.clear()
+
+    def users(self):
+        rng = self.rng('users')
+        prefix = f'gen{self.args.seed}'
+        if User.query.filter(User.username.like(f'{prefix}\\_%', escape='\\')).first():
+            raise SystemExit(f"❌ This database already has users generated with seed {self.args.seed}")
+
+        # One hash for everyone: hashing 100k passwords would dominate the run
+        hashed_password = password_hash(self.args.password, self.args.seed)
+        first_id = self.next_id(User)
+        self.admin_ids = list(range(first_id, first_id + self.args.admins))
+        self.user_ids = list(range(first_id + self.args.admins, first_id + self.args.users))
+
+        rows = []
+        for offset in range(self.args.users):
+            user_id = first_id + offset
+            is_admin = offset < self.args.admins
+            name = 'admin' if is_admin else f'{rng.choice(FIRST_NAMES).lower()}.{rng.choice(LAST_NAMES).lower()}'
+            rows.append({
+                'id': user_id,
+                'username': f'{prefix}_{name}{offset}',
+                'email': f'{prefix}.{name}{offset}@example.com',
+                'password_hash': hashed_password,
+                'is_admin': is_admin,
+                'created_at': self.timestamp(rng, self.args.days + 30)
+            })
+            self.insert(User, rows)
+        self.insert(User, rows, final=True)
+
+    def jobs(self):
+        rng = self.rng('jobs')
+        first_id = self.next_id(JobDescription)
+        self.job_profiles = []  # (job_id, family, required, preferred, min_years, created_at)
+
+        rows = []
+        for offset in range(self.args.jobs):
+            family = weighted_choice(rng, self.families, FAMILY_WEIGHTS)
+            core, extra = ROLE_FAMILIES[family]
+            level, min_years, max_years = weighted_choice(rng, LEVELS, LEVEL_WEIGHTS)
+            years = rng.randint(min_years, max_years)
+            required = rng.sample(core, rng.randint(4, min(6, len(core))))
+            preferred = rng.sample(extra, rng.randint(2, 3))
+
+            lines = ['Requirements:']
+            lines.append(f'- {years}+ years of experience' if years else '- Freshers with no experience are welcome')
+            lines += [f'- Proficiency in {display(skill)}' for skill in required]
+            lines.append(f"- Bachelor's degree in Computer Science, Statistics or a related field")
+            lines.append('Preferred Qualifications:')
+            lines += [f'- Experience with {display(skill)}' for skill in preferred]
+            requirements = '\n'.join(lines)
+
+            title = f'{level} {family}'.strip()
+            target = rng.choice(self.jd_lengths) * rng.uniform(0.8, 1.2) - len(requirements)
+            description = pad_text(rng, f'We are hiring a {title} to join our team.', target, JD_FILLER)
+            created_at = self.timestamp(rng, self.args.days)
+            job = JobDescription(
+                id=first_id + offset, title=title, company=rng.choice(COMPANIES), description=description,
+                requirements=requirements, location=rng.choice(LOCATIONS),
+                experience_level=level or 'Mid', employment_type=rng.choice(EMPLOYMENT_TYPES),
+                created_by=rng.choice(self.admin_ids), is_active=rng.random() < 0.85
+            )
+            row = {column.name: getattr(job, column.name) for column in JobDescription.__table__.columns}
+            # Stored the way the before_flush hook would have, so the pipeline sees a current profile
+            row.update(created_at=created_at, ranking_version=0,
+                       requirement_profile=json.dumps(extract_requirements(job)))
+            rows.append(row)
+            self.job_profiles.append((job.id, family, required, preferred, years, created_at))
+            self.insert(JobDescription, rows)
+        self.insert(JobDescription, rows, final=True)
+
+    def resumes(self):
+        rng = self.rng('resumes')
+        first_id = self.next_id(Resume)
+        self.resume_profiles = []  # (resume_id, user_id, skills, years)
+        self.resumes_by_family = {family: [] for family in self.families}
+
+        rows = []
+        for offset in range(self.args.resumes):
+            # Most candidates stay within one family; some carry skills from another
+            family = weighted_choice(rng, self.families, FAMILY_WEIGHTS)
+            core, extra = ROLE_FAMILIES[family]
+            skills = rng.sample(core, rng.randint(2, len(core))) + rng.sample(extra, rng.randint(0, 3))
+            if rng.random() < 0.2:
+                other_core = ROLE_FAMILIES[rng.choice(self.families)][0]
+                skills += rng.sample(other_core, 2)
+            skills = list(dict.fromkeys(skills))
+            years = min(int(rng.expovariate(1 / 3.5)), 15)
+            education = weighted_choice(rng, [name for name, _ in EDUCATION], [weight for _, weight in EDUCATION])
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+            start_year = self.as_of.year - years
+            header = '\n'.join([
+                name.upper(),
+                f'{family} with {years} years of experience' if years else f'Aspiring {family}',
+                'SKILLS',
+                ', '.join(display(skill) for skill in skills),
+                'EXPERIENCE',
+                f'{family}, {rng.choice(COMPANIES)} {start_year} - Present' if years else 'Intern, college projects',
+                'EDUCATION',
+                f'{education} {start_year - 4} - {start_year}',
+                'PROJECTS',
+                f'Built a {display(skills[0])} project using {display(skills[-1])}',
+            ])
+            text = pad_text(rng, header, rng.choice(self.resume_lengths) * rng.uniform(0.8, 1.25), FILLER)
+
+            user_id = rng.choice(self.user_ids)
+            parsed = {'skills': skills, 'education': [{'institution': education, 'details': ''}],
+                      'experience': [{'position': family, 'details': f'{years} years'}], 'projects': [],
+                      'word_count': len(text.split()), 'char_count': len(text)}
+            rows.append({
+                'id': first_id + offset,
+                'filename': f'{first_id + offset}_resume.pdf',
+                'original_filename': f"{name.replace(' ', '_')}_Resume.pdf",
+                'file_path': os.path.join('uploads', f'{first_id + offset}_resume.pdf'),
+                'file_type': 'PDF' if rng.random() < 0.8 else 'DOCX',
+                'text_data': compress_text(text),
+                'text_preview': make_text_preview(text),
+                'parsed_data_blob': compress_text(json.dumps(parsed)),
+                'uploaded_at': self.timestamp(rng, self.args.days),
+                'user_id': user_id
+            })
+            self.resume_profiles.append((first_id + offset, user_id, set(skills), years))
+            self.resumes_by_family[family].append(self.resume_profiles[-1])
+            self.insert(Resume, rows)
+        self.insert(Resume, rows, final=True)
+
+    def analyses(self):
+        rng = self.rng('analyses')
+        first_id = self.next_id(ResumeAnalysis)
+        next_id = first_id
+        counts = skewed_counts(rng, self.args.analyses, len(self.job_profiles), len(self.resume_profiles))
+        application_rate = self.args.applications / self.args.analyses if self.args.analyses else 0
+
+        rows, applications = [], []
+        for (job_id, family, required, preferred, min_years, created_at), count in zip(self.job_profiles, counts):
+            candidates = self.candidates(rng, family, count)
+            job_rows = []
+            for queue_position, (resume_id, user_id, skills, years) in enumerate(candidates, start=1):
+                status = weighted_choice(rng, ['completed', 'pending', 'processing', 'failed'], [88, 6, 1, 5])
+                analysed_at = created_at + timedelta(seconds=rng.randint(60, max(int((self.as_of - created_at).total_seconds()), 61)))
+                row = {
+                    'id': next_id, 'resume_id': resume_id, 'job_id': job_id, 'relevance_score': 0.0,
+                    'verdict': 'Low', 'missing_skills': None, 'missing_certifications': None,
+                    'missing_projects': None, 'improvement_suggestions': None, 'rank': 0,
+                    'is_in_queue': status in ('pending', 'processing'), 'queue_position': queue_position,
+                    'analysis_status': status, 'analysis_started_at': None, 'analysis_completed_at': None,
+                    'analysis_notes': None, 'prompt_stats': None, 'created_at': analysed_at,
+                    **{f'{stage}_ms': None for stage in TIMING_STAGES}
+                }
+                if status == 'completed':
+                    missing = [skill for skill in required + preferred if skill not in skills]
+                    required_match = sum(skill in skills for skill in required) / len(required)
+                    preferred_match = sum(skill in skills for skill in preferred) / len(preferred)
+                    experience = min(years / min_years, 1.0) if min_years else 1.0
+                    score = 15 + 55 * required_match + 10 * preferred_match + 15 * experience + rng.gauss(0, 6)
+                    score = round(min(max(score, 0.0), 100.0), 1)
+                    # Stage timings in ms; the Gemini call dominates with a median around 10s
+                    timings = {'resume_parse': int(rng.lognormvariate(1.0, 0.8)), 'jd': int(rng.lognormvariate(0.5, 1.5)),
+                               'prompt': int(rng.lognormvariate(0.7, 0.5)), 'llm': int(rng.lognormvariate(9.2, 0.5)),
+                               'response_parse': int(rng.lognormvariate(0.0, 0.5)),
+                               'ranking': int(rng.lognormvariate(2.5, 0.7) * (1 + count / 1000))}
+                    timings['total'] = sum(timings.values()) + rng.randint(5, 40)
+                    duration = timings['total'] / 1000
+                    row.update({f'{stage}_ms': ms for stage, ms in timings.items()})
+                    row.update(
+                        relevance_score=score,
+                        verdict='High' if score >= 80 else 'Medium' if score >= 60 else 'Low',
+                        missing_skills=json.dumps(missing) if missing else None,
+                        improvement_suggestions='\n'.join(f'Add evidence of {display(skill)}' for skill in missing[:3]),
+                        analysis_started_at=analysed_at,
+                        analysis_completed_at=analysed_at + timedelta(seconds=duration),
+                        analysis_notes=f'{LOCAL_SCORE_NOTE} Gemini unavailable' if rng.random() < 0.02 else None
+                    )
+                elif status == 'processing':
+                    row['analysis_started_at'] = analysed_at
+                elif status == 'failed':
+                    row.update(analysis_started_at=analysed_at, analysis_notes='Gemini API error: deadline exceeded')
+                job_rows.append(row)
+                next_id += 1
+
+                if rng.random() < application_rate:
+                    applications.append({
+                        'user_id': user_id, 'job_id': job_id, 'resume_id': resume_id,
+                        'application_status': weighted_choice(
+                            rng, ['pending', 'reviewed', 'shortlisted', 'rejected'], [50, 25, 10, 15]),
+                        'applied_at': analysed_at, 'notes': None
+                    })
+
+            # Ranks as update_ranking would leave them: completed analyses by score, best first
+            completed = sorted((row for row in job_rows if row['analysis_status'] == 'completed'),
+                               key=lambda row: -row['relevance_score'])
+            for rank, row in enumerate(completed, start=1):
+                row['rank'] = rank
+
+            rows.extend(job_rows)
+            self.insert(ResumeAnalysis, rows)
+            self.insert(Application, applications)
+        self.insert(ResumeAnalysis, rows, final=True)
+        self.insert(Application, applications, final=True)
+
+    def candidates(self, rng, family, count):
+        """count distinct resumes for a job, most of them (when available) from the job's own family"""
+        if count * 2 > len(self.resume_profiles):
+            return rng.sample(self.resume_profiles, count)
+        same_family = self.resumes_by_family[family]
+        chosen = rng.sample(same_family, min(int(count * SAME_FAMILY_SHARE), len(same_family)))
+        seen = {profile[0] for profile in chosen}
+        while len(chosen) < count:
+            profile = rng.choice(self.resume_profiles)
+            if profile[0] not in seen:
+                seen.add(profile[0])
+                chosen.append(profile)
+        return chosen
+
+    def finish(self):
+        """Move Postgres id sequences past the explicit ids and refresh planner statistics"""
+        if db.engine.dialect.name == 'postgresql':
+            for model in (User, JobDescription, Resume, ResumeAnalysis):
+                table = model.__tablename__
+                db.session.execute(db.text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--users', type=int, default=1000)
+    arg_parser.add_argument('--admins', type=int, default=5, help='The first N generated users are admins (they own the jobs)')
+    arg_parser.add_argument('--jobs', type=int, default=50)
+    arg_parser.add_argument('--resumes', type=int, default=2000)
+    arg_parser.add_argument('--analyses', type=int, default=10000)
+    arg_parser.add_argument('--applications', type=int, default=None, help='About this many applications (default: analyses / 3)')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--as-of', default='2026-01-01', help='Newest timestamp (YYYY-MM-DD); part of the dataset identity')
+    arg_parser.add_argument('--days', type=int, default=180, help='Spread timestamps over this many days before --as-of')
+    arg_parser.add_argument('--password', default='password123')
+    arg_parser.add_argument('--batch-size', type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    if args.applications is None:
+        args.applications = args.analyses // 3
+    if args.users <= args.admins or not args.jobs or not args.resumes:
+        arg_parser.error('need more users than --admins, at least one job and at least one resume')
+    if args.analyses > args.jobs * args.resumes:
+        arg_parser.error('--analyses cannot exceed jobs x resumes (one analysis per resume and job)')
+
+    app = create_app()
+    with app.app_context():
+        run_migrations()
+        generator = Generator(args)
+        for stage in ('users', 'jobs', 'resumes', 'analyses', 'finish'):
+            started = time.perf_counter()
+            getattr(generator, stage)()
+            print(f"✅ {stage} ({time.perf_counter() - started:.1f}s)")
+            sys.stdout.flush()
+        print('Rows written: ' + ', '.join(f'{table}={count}' for table, count in generator.totals.items()))
+
+if __name__ == "__main__":
+    main()
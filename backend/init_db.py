@@ -8,6 +8,7 @@ import os
 import sys
 from __init__ import create_app, db
 from models import User
+from db_migrations import run_migrations
 from werkzeug.security import generate_password_hash
 
 def create_admin_user():
@@ -56,7 +57,7 @@ def main():
         try:
             # Create all tables
             print("Creating database tables...")
-            db.create_all()
+            run_migrations()
             print("Database tables created successfully")
             
             # Create admin user
@@ -8,6 +8,7 @@ import os
 import sys
 from __init__ import create_app, db
 from models import User
+from db_migrations import run_migrations
 
 def create_default_admin():
     """Create default admin user"""
@@ -54,7 +55,7 @@ def main():
         try:
             # Create all tables
             print("Creating database tables...")
-            db.create_all()
+            run_migrations()
             print("Database tables created successfully")
             
             # Create admin user
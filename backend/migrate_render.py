@@ -6,6 +6,7 @@ import os
 import hashlib
 from __init__ import create_app, db
 from models import User, JobDescription, Resume, ResumeAnalysis, Application
+from db_migrations import run_migrations
 
 def migrate_render():
     app = create_app()
@@ -13,9 +14,11 @@ def migrate_render():
         try:
             print("🚀 Starting Render production database migration...")
             
-            # Create all tables
-            db.create_all()
+            # Create all tables and apply pending migrations
+            applied = run_migrations()
             print("✅ Database tables created successfully")
+            for migration_id in applied:
+                print(f"✅ Applied migration {migration_id}")
             
             # Create admin user if not exists
             admin = User.query.filter_by(username='admin').first()
@@ -1,7 +1,30 @@
 from __init__ import db
 from datetime import datetime
+from sqlalchemy.orm import selectinload, undefer
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
+import zlib
+
+# Pipeline stages timed on every analysis run; each is stored in a <stage>_ms integer column
+TIMING_STAGES = ('resume_parse', 'jd', 'prompt', 'llm', 'response_parse', 'ranking', 'total')
+
+# Scheduling classes of queued analyses, most urgent first (see services/analysis_scheduler.py)
+PRIORITY_CLASSES = ('interactive', 'bulk', 'backfill')
+
+# Resume text is stored once, zlib-compressed, with a short plain-text preview for listings
+TEXT_PREVIEW_LENGTH = 500
+TEXT_COMPRESSION_LEVEL = 6
+
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), TEXT_COMPRESSION_LEVEL) if text else None
+
+def decompress_text(data):
+    return zlib.decompress(data).decode('utf-8') if data else None
+
+def make_text_preview(text):
+    if text and len(text) > TEXT_PREVIEW_LENGTH:
+        return text[:TEXT_PREVIEW_LENGTH] + '...'
+    return text
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -46,11 +69,21 @@ class JobDescription(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+    ranking_version = db.Column(db.Integer, default=0, nullable=False)  # Bumped with each batch of ranking_changes
+    requirement_profile = db.Column(db.Text)  # JSON string: structured requirements extracted from the JD
     
     # Relationships
     creator = db.relationship('User', backref='created_jobs')
     resume_analyses = db.relationship('ResumeAnalysis', backref='job', lazy=True, cascade='all, delete-orphan')
     
+    def set_requirement_profile(self, profile):
+        self.requirement_profile = json.dumps(profile) if profile else None
+    
+    def get_requirement_profile(self):
+        if self.requirement_profile:
+            return json.loads(self.requirement_profile)
+        return None
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -65,7 +98,8 @@ class JobDescription(db.Model):
             'created_at': self.created_at.isoformat(),
             'created_by': self.created_by,
             'is_active': self.is_active,
-            'application_count': len(self.resume_analyses)
+            'requirement_profile': self.get_requirement_profile(),
+            'application_count': self.application_count
         }
 
 class Resume(db.Model):
@@ -76,33 +110,64 @@ class Resume(db.Model):
     original_filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(50), nullable=False)  # PDF, DOCX
-    extracted_text = db.Column(db.Text)
-    parsed_data = db.Column(db.Text)  # JSON string of structured data
+    extracted_text = db.deferred(db.Column(db.Text))  # Legacy uncompressed text, superseded by text_data
+    text_data = db.deferred(db.Column(db.LargeBinary))  # zlib-compressed canonical resume text
+    text_preview = db.Column(db.String(TEXT_PREVIEW_LENGTH + 3))
+    parsed_data = db.deferred(db.Column(db.Text))  # Legacy JSON string, superseded by parsed_data_blob
+    parsed_data_blob = db.deferred(db.Column(db.LargeBinary))  # zlib-compressed JSON of structured data
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Relationships
     analyses = db.relationship('ResumeAnalysis', backref='resume', lazy=True, cascade='all, delete-orphan')
     
+    @property
+    def text(self):
+        """Full resume text (loads the deferred column on first access)"""
+        if self.text_data is not None:
+            return decompress_text(self.text_data)
+        return self.extracted_text
+    
+    @text.setter
+    def text(self, value):
+        self.text_data = compress_text(value)
+        self.text_preview = make_text_preview(value)
+        self.extracted_text = None
+    
     def set_parsed_data(self, data):
-        self.parsed_data = json.dumps(data)
+        data = dict(data)
+        data.pop('raw_text', None)
+        cleaned_text = data.pop('cleaned_text', None)
+        if cleaned_text is not None:
+            self.text = cleaned_text
+        self.parsed_data_blob = compress_text(json.dumps(data))
+        self.parsed_data = None
     
     def get_parsed_data(self):
+        if self.parsed_data_blob is not None:
+            return json.loads(decompress_text(self.parsed_data_blob))
         if self.parsed_data:
-            return json.loads(self.parsed_data)
+            data = json.loads(self.parsed_data)
+            # Rows written before compact storage still carry the text inline
+            data.pop('raw_text', None)
+            data.pop('cleaned_text', None)
+            return data
         return None
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_parsed_data=True):
+        """Serialize the resume; listings pass include_parsed_data=False to skip the deferred payload"""
+        data = {
             'id': self.id,
             'filename': self.filename,
             'original_filename': self.original_filename,
             'file_type': self.file_type,
-            'extracted_text': self.extracted_text[:500] + '...' if self.extracted_text and len(self.extracted_text) > 500 else self.extracted_text,
-            'parsed_data': self.get_parsed_data(),
+            'extracted_text': self.text_preview if self.text_preview is not None else make_text_preview(self.text),
             'uploaded_at': self.uploaded_at.isoformat(),
             'user_id': self.user_id
         }
+        if include_parsed_data:
+            data['parsed_data'] = self.get_parsed_data()
+        return data
 
 class ResumeAnalysis(db.Model):
     __tablename__ = 'resume_analyses'
@@ -123,12 +188,23 @@ class ResumeAnalysis(db.Model):
     rank = db.Column(db.Integer, default=0)
     is_in_queue = db.Column(db.Boolean, default=True)
     queue_position = db.Column(db.Integer, default=0)
+    priority = db.Column(db.String(20), nullable=False, default='interactive')  # interactive, bulk, backfill
     
     # Analysis metadata
     analysis_status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
     analysis_started_at = db.Column(db.DateTime)
     analysis_completed_at = db.Column(db.DateTime)
     analysis_notes = db.Column(db.Text)
+    prompt_stats = db.Column(db.Text)  # JSON string: prompt token sizes by section
+    
+    # Stage timings of the last run in milliseconds (integers so percentiles can be computed in SQL)
+    resume_parse_ms = db.Column(db.Integer)
+    jd_ms = db.Column(db.Integer)
+    prompt_ms = db.Column(db.Integer)
+    llm_ms = db.Column(db.Integer)
+    response_parse_ms = db.Column(db.Integer)
+    ranking_ms = db.Column(db.Integer)
+    total_ms = db.Column(db.Integer)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -156,6 +232,37 @@ class ResumeAnalysis(db.Model):
             return json.loads(self.missing_projects)
         return []
     
+    def get_prompt_stats(self):
+        if self.prompt_stats:
+            return json.loads(self.prompt_stats)
+        return None
+    
+    def set_stage_timings(self, timings):
+        """Store a run's stage timings; stages the run did not reach are cleared"""
+        for stage in TIMING_STAGES:
+            setattr(self, f'{stage}_ms', timings.get(stage))
+    
+    def get_stage_timings(self):
+        timings = {stage: getattr(self, f'{stage}_ms') for stage in TIMING_STAGES}
+        if all(value is None for value in timings.values()):
+            return None
+        return timings
+    
+    def apply_result(self, analysis_result):
+        """Store an AIAnalyzer result and mark the analysis completed"""
+        self.relevance_score = analysis_result['relevance_score']
+        self.verdict = analysis_result['verdict']
+        self.set_missing_skills(analysis_result.get('missing_skills', []))
+        self.set_missing_certifications(analysis_result.get('missing_certifications', []))
+        self.set_missing_projects(analysis_result.get('missing_projects', []))
+        self.improvement_suggestions = '\n'.join(analysis_result.get('improvement_suggestions', []))
+        prompt_tokens = analysis_result.get('prompt_tokens')
+        self.prompt_stats = json.dumps(prompt_tokens) if prompt_tokens else None
+        self.analysis_notes = analysis_result.get('analysis_notes')
+        self.analysis_status = 'completed'
+        self.analysis_completed_at = datetime.utcnow()
+        self.is_in_queue = False
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -170,12 +277,15 @@ class ResumeAnalysis(db.Model):
             'rank': self.rank,
             'is_in_queue': self.is_in_queue,
             'queue_position': self.queue_position,
+            'priority': self.priority,
             'analysis_status': self.analysis_status,
             'analysis_started_at': self.analysis_started_at.isoformat() if self.analysis_started_at else None,
             'analysis_completed_at': self.analysis_completed_at.isoformat() if self.analysis_completed_at else None,
             'analysis_notes': self.analysis_notes,
+            'prompt_tokens': self.get_prompt_stats(),
+            'stage_timings': self.get_stage_timings(),
             'created_at': self.created_at.isoformat(),
-            'resume': self.resume.to_dict() if self.resume else None,
+            'resume': self.resume.to_dict(include_parsed_data=False) if self.resume else None,
             'user': self.resume.user.to_dict() if self.resume and self.resume.user else None
         }
 
@@ -204,11 +314,135 @@ class Application(db.Model):
             'application_status': self.application_status,
             'applied_at': self.applied_at.isoformat(),
             'notes': self.notes,
-            'resume': self.resume.to_dict() if self.resume else None,
+            'resume': self.resume.to_dict(include_parsed_data=False) if self.resume else None,
             'job': self.job.to_dict() if self.job else None
         }
 
+class RankingChange(db.Model):
+    __tablename__ = 'ranking_changes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job_descriptions.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # JobDescription.ranking_version that recorded this change
+    analysis_id = db.Column(db.Integer, nullable=False)  # No FK: removed analyses may no longer exist
+    change_type = db.Column(db.String(20), nullable=False)  # inserted, moved, removed
+    old_rank = db.Column(db.Integer)
+    new_rank = db.Column(db.Integer)
+    relevance_score = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'version': self.version,
+            'analysis_id': self.analysis_id,
+            'change_type': self.change_type,
+            'old_rank': self.old_rank,
+            'new_rank': self.new_rank,
+            'relevance_score': self.relevance_score,
+            'created_at': self.created_at.isoformat()
+        }
+
+class BackfillJob(db.Model):
+    __tablename__ = 'backfill_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, default='pending_applications')
+    scope = db.Column(db.String(20), nullable=False, default='missing')  # missing (no completed analysis) or all
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed, cancelled
+    chunk_size = db.Column(db.Integer, nullable=False)
+    max_application_id = db.Column(db.Integer, nullable=False)  # Applications made later are not part of the job
+    cursor = db.Column(db.Integer, nullable=False, default=0)  # Last application id of the last checkpointed chunk
+    total = db.Column(db.Integer, nullable=False, default=0)
+    done = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)  # Analyzed by other means before the job got to them
+    chunks = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    owner = db.Column(db.String(100))  # Runner holding the lease
+    heartbeat_at = db.Column(db.DateTime)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        remaining = max(self.total - self.done - self.failed - self.skipped, 0)
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'scope': self.scope,
+            'status': self.status,
+            'chunk_size': self.chunk_size,
+            'cursor': self.cursor,
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'remaining': remaining if self.status != 'completed' else 0,
+            'percent': round((self.total - remaining) / self.total * 100, 1) if self.total else 100.0,
+            'chunks': self.chunks,
+            'last_error': self.last_error,
+            'owner': self.owner,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+# Analyses per job as a correlated COUNT instead of loading every analysis; deferred, so listings
+# undefer it to get the counts in the same SELECT as the jobs
+JobDescription.application_count = db.column_property(
+    db.select(db.func.count(ResumeAnalysis.id))
+    .where(ResumeAnalysis.job_id == JobDescription.id)
+    .correlate_except(ResumeAnalysis)
+    .scalar_subquery(),
+    deferred=True
+)
+
+# Loader options for Application.to_dict(): its resume and its job, with the job's application count,
+# in one query each instead of lazy loads per application
+APPLICATION_DETAIL = (
+    selectinload(Application.resume),
+    selectinload(Application.job).options(undefer(JobDescription.application_count))
+)
+
 # Index for better query performance
 db.Index('idx_resume_analysis_job_rank', ResumeAnalysis.job_id, ResumeAnalysis.rank)
 db.Index('idx_resume_analysis_queue', ResumeAnalysis.job_id, ResumeAnalysis.queue_position)
 db.Index('idx_applications_user_job', Application.user_id, Application.job_id)
+db.Index('idx_ranking_changes_job_version', RankingChange.job_id, RankingChange.version)
+
+# Composite/partial indexes for the queue, ranking and stats access paths. create_all builds them
+# on new databases; on existing ones migrations 0003, 0006 and 0007 create frozen copies (see
+# db_migrations.py), so a new index here needs its own migration. tests/test_query_plans.py checks them
+HOT_PATH_INDEXES = [
+    # One analysis per (resume, job); also serves the existence checks and resume -> analyses
+    db.Index('uq_resume_analysis_resume_job', ResumeAnalysis.resume_id, ResumeAnalysis.job_id, unique=True),
+    # Rankings, update_ranking, promotion and per-status queue counts: filter job + status, order by score
+    db.Index('idx_resume_analysis_job_status_score', ResumeAnalysis.job_id, ResumeAnalysis.analysis_status,
+             ResumeAnalysis.relevance_score.desc()),
+    # Next-in-queue and queue length touch only queued rows
+    db.Index('idx_resume_analysis_queued', ResumeAnalysis.job_id, ResumeAnalysis.analysis_status,
+             ResumeAnalysis.queue_position,
+             sqlite_where=ResumeAnalysis.is_in_queue == True,
+             postgresql_where=ResumeAnalysis.is_in_queue == True),
+    # System stats and the admin analyses list (status filter, newest first)
+    db.Index('idx_resume_analysis_status_created', ResumeAnalysis.analysis_status, ResumeAnalysis.created_at),
+    db.Index('idx_resume_analysis_created', ResumeAnalysis.created_at),
+    # Stage timing percentiles over a recent window
+    db.Index('idx_resume_analysis_completed', ResumeAnalysis.analysis_completed_at),
+    # The scheduler's per-(priority, job) backlog and each flow's head
+    db.Index('idx_resume_analysis_status_priority_job', ResumeAnalysis.analysis_status, ResumeAnalysis.priority,
+             ResumeAnalysis.job_id, ResumeAnalysis.queue_position),
+    db.Index('idx_resume_analysis_verdict', ResumeAnalysis.verdict),
+    db.Index('idx_applications_status', Application.application_status),
+    db.Index('idx_applications_user_applied', Application.user_id, Application.applied_at),
+    db.Index('idx_applications_applied', Application.applied_at),
+    db.Index('idx_resumes_user_uploaded', Resume.user_id, Resume.uploaded_at),
+    db.Index('idx_job_descriptions_active_created', JobDescription.is_active, JobDescription.created_at),
+    db.Index('idx_users_admin', User.is_admin),
+    db.Index('idx_users_created', User.created_at),
+]
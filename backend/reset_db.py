@@ -5,6 +5,7 @@ Reset database script - drops and recreates all tables
 
 import os
 from __init__ import create_app, db
+from db_migrations import run_migrations
 
 def reset_database():
     """Drop and recreate all database tables"""
@@ -17,8 +18,8 @@ def reset_database():
             db.drop_all()
             print("✅ All tables dropped")
             
-            # Create all tables
-            db.create_all()
+            # Create all tables and record migrations as applied
+            run_migrations()
             print("✅ All tables created")
             
             print("🎉 Database reset completed successfully!")
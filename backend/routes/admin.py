@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from __init__ import db
-from models import JobDescription, ResumeAnalysis, User
+from models import JobDescription, PRIORITY_CLASSES, Resume, ResumeAnalysis, User
 from services.ranking_service import ranking_service
+from services.response_cache import response_cache
+from services.prompt_builder import prompt_builder
+from services.db_routing import read_replica
+from services.db_writer import run_write
+from services.query_budget import query_budget
+from services.queue_eta import queue_eta
+from services.request_profiler import request_profiler
+from sqlalchemy.orm import selectinload, undefer
+import os
+import threading
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -21,8 +31,10 @@ def admin_required(f):
     return decorated_function
 
 @admin_bp.route('/dashboard', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required
+@query_budget(8)
 def admin_dashboard():
     try:
         # Get basic statistics
@@ -37,6 +49,7 @@ def admin_dashboard():
         
         # Get recent jobs
         recent_jobs = JobDescription.query\
+            .options(undefer(JobDescription.application_count))\
             .filter(JobDescription.is_active == True)\
             .order_by(JobDescription.created_at.desc())\
             .limit(5)\
@@ -56,32 +69,49 @@ def admin_dashboard():
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/jobs/<int:job_id>/rankings', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required
 def get_job_rankings(job_id):
     try:
-        # Verify job exists
-        job = JobDescription.query.get(job_id)
-        if not job:
-            return jsonify({'error': 'Job not found'}), 404
-        
-        # Get rankings
+        # Cached {"job", "rankings"} snapshot; only rebuilt after the ranking version changes
         limit = request.args.get('limit', 50, type=int)
-        rankings = ranking_service.get_job_rankings(job_id, limit)
+        snapshot = ranking_service.get_rankings_snapshot(job_id, limit)
+        if snapshot is None:
+            return jsonify({'error': 'Job not found'}), 404
         
         # Get queue status
-        queue_status = ranking_service.get_queue_status(job_id)
+        queue_status = ranking_service.get_cached_queue_status(job_id)
         
-        return jsonify({
-            'job': job.to_dict(),
-            'rankings': rankings,
-            'queue_status': queue_status
-        }), 200
+        # Splice the live queue status into the serialized snapshot instead of re-encoding it
+        body = snapshot[:-1] + ',"queue_status":' + current_app.json.dumps(queue_status) + '}'
+        return Response(body, status=200, mimetype='application/json')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/jobs/<int:job_id>/rankings/changes', methods=['GET'])
+@read_replica
+@jwt_required()
+@admin_required
+def get_job_ranking_changes(job_id):
+    """Ranking entries inserted, moved or removed since a client's ranking_version"""
+    try:
+        since = request.args.get('since', type=int)
+        if since is None or since < 0:
+            return jsonify({'error': 'A non-negative since version is required'}), 400
+        
+        changes = ranking_service.get_ranking_changes(job_id, since)
+        if changes is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({'job_id': job_id, **changes}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/jobs/<int:job_id>/queue-status', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required
 def get_queue_status(job_id):
@@ -101,8 +131,10 @@ def get_queue_status(job_id):
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/analyses', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required
+@query_budget(10)
 def get_all_analyses():
     try:
         page = request.args.get('page', 1, type=int)
@@ -111,8 +143,8 @@ def get_all_analyses():
         status = request.args.get('status', '')
         verdict = request.args.get('verdict', '')
         
-        # Build query
-        query = ResumeAnalysis.query
+        # Build query; resumes and their users load in one query each, not one per analysis
+        query = ResumeAnalysis.query.options(selectinload(ResumeAnalysis.resume).selectinload(Resume.user))
         
         if job_id:
             query = query.filter(ResumeAnalysis.job_id == job_id)
@@ -131,7 +163,7 @@ def get_all_analyses():
             )
         
         return jsonify({
-            'analyses': [analysis.to_dict() for analysis in analyses.items],
+            'analyses': queue_eta.annotate(analyses.items, [analysis.to_dict() for analysis in analyses.items]),
             'total': analyses.total,
             'pages': analyses.pages,
             'current_page': page,
@@ -141,7 +173,29 @@ def get_all_analyses():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/analyses/timings', methods=['GET'])
+@read_replica
+@jwt_required()
+@admin_required
+def get_analysis_timings():
+    """p50/p95/p99 of each pipeline stage overall and per job, over the last `hours`"""
+    from services.pipeline_timings import timing_report
+
+    try:
+        hours = request.args.get('hours', 24, type=float)
+        job_id = request.args.get('job_id', type=int)
+        job_limit = min(request.args.get('job_limit', 20, type=int), 200)
+
+        if hours <= 0:
+            return jsonify({'error': 'hours must be positive'}), 400
+
+        return jsonify(timing_report(hours=hours, job_id=job_id, job_limit=job_limit)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/users', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required
 def get_users():
@@ -202,16 +256,31 @@ def reprocess_analysis(analysis_id):
         if not analysis:
             return jsonify({'error': 'Analysis not found'}), 404
         
-        # Reset analysis status
-        analysis.analysis_status = 'pending'
-        analysis.analysis_started_at = None
-        analysis.analysis_completed_at = None
-        analysis.analysis_notes = None
-        
-        # Add back to queue
-        ranking_service.add_to_queue(analysis_id, analysis.job_id)
-        
-        db.session.commit()
+        priority = (request.get_json(silent=True) or {}).get('priority', 'interactive')
+        if priority not in PRIORITY_CLASSES:
+            return jsonify({'error': f"priority must be one of {', '.join(PRIORITY_CLASSES)}"}), 400
+        
+        # RankingService commits itself, so this runs as an exclusive write
+        def requeue():
+            analysis = ResumeAnalysis.query.get(analysis_id)
+            
+            # Reset analysis status
+            analysis.analysis_status = 'pending'
+            analysis.analysis_started_at = None
+            analysis.analysis_completed_at = None
+            analysis.analysis_notes = None
+            
+            # Add back to queue
+            ranking_service.add_to_queue(analysis_id, analysis.job_id, priority)
+            
+            # Drop it from the leaderboard until the new result is in
+            ranking_service.update_ranking(analysis.job_id)
+        
+        run_write(requeue, exclusive=True)
+        
+        # A free background worker picks it up now; otherwise it waits its turn in the queue
+        from services.admission import analysis_dispatcher
+        analysis_dispatcher.submit(current_app._get_current_object())
         
         return jsonify({
             'message': 'Analysis queued for reprocessing',
@@ -222,7 +291,65 @@ def reprocess_analysis(analysis_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/analyses/reprocess', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_reprocess_analyses():
+    """Re-queue many analyses at once (by job and/or status) in the bulk class, behind interactive work"""
+    try:
+        data = request.get_json(silent=True) or {}
+        priority = data.get('priority', 'bulk')
+        statuses = data.get('statuses', ['completed', 'failed'])
+        if priority not in PRIORITY_CLASSES:
+            return jsonify({'error': f"priority must be one of {', '.join(PRIORITY_CLASSES)}"}), 400
+        if not statuses or set(statuses) - {'completed', 'failed'}:
+            return jsonify({'error': 'statuses may only contain completed and failed'}), 400
+        
+        def requeue():
+            query = db.session.query(ResumeAnalysis.job_id, db.func.count(ResumeAnalysis.id))\
+                .filter(ResumeAnalysis.analysis_status.in_(statuses))
+            if data.get('job_id'):
+                query = query.filter(ResumeAnalysis.job_id == data['job_id'])
+            jobs = [tuple(row) for row in query.group_by(ResumeAnalysis.job_id).all()]
+            
+            # One UPDATE per job: the batch goes to the end of the job's queue, in id order
+            table = ResumeAnalysis.__table__
+            for job_id, _ in jobs:
+                last_position = db.session.query(db.func.max(ResumeAnalysis.queue_position))\
+                    .filter(ResumeAnalysis.job_id == job_id)\
+                    .scalar() or 0
+                db.session.execute(
+                    table.update()
+                    .where(table.c.job_id == job_id)
+                    .where(table.c.analysis_status.in_(statuses))
+                    .values(analysis_status='pending', priority=priority, is_in_queue=True,
+                            queue_position=last_position + 1, analysis_started_at=None,
+                            analysis_completed_at=None, analysis_notes=None)
+                )
+            return jobs
+        
+        jobs = run_write(requeue)
+        
+        # Drop them from the leaderboards until the new results are in (application counts are unchanged)
+        for job_id, _ in jobs:
+            run_write(lambda: ranking_service.update_ranking(job_id), exclusive=True)
+        
+        from services.admission import analysis_dispatcher
+        analysis_dispatcher.submit(current_app._get_current_object())
+        
+        return jsonify({
+            'message': 'Analyses queued for reprocessing',
+            'priority': priority,
+            'queued': sum(count for _, count in jobs),
+            'jobs': len(jobs)
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/stats', methods=['GET'])
+@read_replica
 @jwt_required()
 @admin_required
 def get_system_stats():
@@ -261,10 +388,11 @@ def get_system_stats():
 @admin_bp.route('/debug/system-status', methods=['GET'])
 @jwt_required()
 @admin_required
+@query_budget(12)
 def get_system_status():
     """Debug endpoint to check system status"""
     try:
-        from models import User, JobDescription, Resume, ResumeAnalysis, Application
+        from models import APPLICATION_DETAIL, User, JobDescription, Resume, ResumeAnalysis, Application
         
         # Get counts
         user_count = User.query.count()
@@ -277,7 +405,10 @@ def get_system_status():
         recent_analyses = ResumeAnalysis.query.order_by(ResumeAnalysis.created_at.desc()).limit(5).all()
         
         # Get recent applications
-        recent_applications = Application.query.order_by(Application.applied_at.desc()).limit(5).all()
+        recent_applications = Application.query.options(*APPLICATION_DETAIL)\
+            .order_by(Application.applied_at.desc())\
+            .limit(5)\
+            .all()
         
         return jsonify({
             'counts': {
@@ -294,6 +425,183 @@ def get_system_status():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_cache_stats():
+    """Hit ratios for the response and ranking snapshot caches"""
+    return jsonify({
+        'responses': response_cache.payloads.stats(),
+        'ranking_snapshots': ranking_service.get_snapshot_stats(),
+        'prompt_job_sections': prompt_builder.stats()['job_sections']
+    }), 200
+
+@admin_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+@admin_required
+def list_profiles():
+    """Captured request profiles, newest first (send X-Profile on any request to capture one)"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({
+            'profiles': request_profiler.list(limit),
+            'retention': request_profiler.retention,
+            'sample_rate': request_profiler.sample_rate,
+            'stats': request_profiler.stats
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_profile(profile_id):
+    """One capture's summary, including its most expensive functions"""
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify({'profile': profile}), 200
+
+@admin_bp.route('/profiles/<profile_id>/download', methods=['GET'])
+@jwt_required()
+@admin_required
+def download_profile(profile_id):
+    """The raw artifact: pstats (.prof) or collapsed stacks (.collapsed)"""
+    path = request_profiler.artifact_path(profile_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path),
+                     mimetype='application/octet-stream')
+
+@admin_bp.route('/analyses/coalescing', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_analysis_coalescing_stats():
+    """How many duplicate analysis requests were coalesced in-process or collapsed by the upsert"""
+    from services.analysis_pipeline import get_stats
+    return jsonify(get_stats()), 200
+
+@admin_bp.route('/analyses/admission', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_admission_status():
+    """Admission thresholds, decisions so far, and the live signals a new submission would see"""
+    from services.admission import admission
+    from services.analysis_scheduler import analysis_scheduler
+    from services.health import queue_snapshot
+    
+    return jsonify(dict(admission.status(), queue=queue_snapshot(), scheduler=analysis_scheduler.stats())), 200
+
+@admin_bp.route('/backfills', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_backfill():
+    """Start a backfill job over the pending applications; poll it for progress"""
+    from services.backfill import SCOPES, backfill_runner
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        scope = data.get('scope', 'missing')
+        chunk_size = data.get('chunk_size')
+        if scope not in SCOPES:
+            return jsonify({'error': f"scope must be one of {', '.join(SCOPES)}"}), 400
+        if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size < 1):
+            return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+        
+        job_id = backfill_runner.create(int(get_jwt_identity()), scope, chunk_size)
+        backfill_runner.start(current_app._get_current_object(), job_id)
+        return jsonify({'message': 'Backfill started', 'backfill': backfill_runner.get(job_id)}), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/backfills', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_backfills():
+    """Recent backfill jobs with their progress"""
+    from services.backfill import backfill_runner
+    
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify({'backfills': backfill_runner.list(limit)}), 200
+
+@admin_bp.route('/backfills/<int:backfill_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_backfill(backfill_id):
+    """One backfill job: done, failed and remaining counts, the chunk in progress and an ETA"""
+    from services.backfill import backfill_runner
+    
+    backfill = backfill_runner.get(backfill_id)
+    if backfill is None:
+        return jsonify({'error': 'Backfill not found'}), 404
+    return jsonify({'backfill': backfill}), 200
+
+@admin_bp.route('/backfills/<int:backfill_id>/resume', methods=['POST'])
+@jwt_required()
+@admin_required
+def resume_backfill(backfill_id):
+    """Continue a failed or interrupted backfill from its last checkpoint"""
+    from services.backfill import backfill_runner
+    
+    backfill = backfill_runner.get(backfill_id)
+    if backfill is None:
+        return jsonify({'error': 'Backfill not found'}), 404
+    if not backfill_runner.start(current_app._get_current_object(), backfill_id):
+        return jsonify({'error': f"Backfill is {backfill['status']} and cannot be resumed"}), 409
+    return jsonify({'message': 'Backfill resumed', 'backfill': backfill_runner.get(backfill_id)}), 202
+
+@admin_bp.route('/backfills/<int:backfill_id>/cancel', methods=['POST'])
+@jwt_required()
+@admin_required
+def cancel_backfill(backfill_id):
+    """Stop a backfill after its current chunk is queued; analyses already queued still run"""
+    from services.backfill import backfill_runner
+    
+    backfill = backfill_runner.get(backfill_id)
+    if backfill is None:
+        return jsonify({'error': 'Backfill not found'}), 404
+    if not backfill_runner.cancel(backfill_id):
+        return jsonify({'error': f"Backfill is already {backfill['status']}"}), 409
+    return jsonify({'message': 'Backfill cancelled', 'backfill': backfill_runner.get(backfill_id)}), 200
+
+@admin_bp.route('/ai/circuit-breaker', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_gemini_breaker_status():
+    """Gemini circuit breaker state and how many analyses are waiting to be re-scored"""
+    from services.ai_analyzer import LOCAL_SCORE_NOTE
+    from services.circuit_breaker import gemini_breaker
+    
+    locally_scored = ResumeAnalysis.query\
+        .filter(ResumeAnalysis.analysis_status == 'completed')\
+        .filter(ResumeAnalysis.analysis_notes.like(f'{LOCAL_SCORE_NOTE}%'))\
+        .count()
+    return jsonify(dict(gemini_breaker.stats(), locally_scored_analyses=locally_scored)), 200
+
+@admin_bp.route('/ai/backend', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_ai_backend_stats():
+    """Which AI backend analyses use (gemini, record, replay, synthetic) and its counters"""
+    from services.ai_backends import get_stats
+    return jsonify(get_stats()), 200
+
+@admin_bp.route('/analyses/rescore-local', methods=['POST'])
+@jwt_required()
+@admin_required
+def rescore_local_analyses():
+    """Re-run analyses that fell back to local scoring (also runs by itself when the breaker closes)"""
+    from services.analysis_pipeline import rescore_local_analyses as rescore
+    from services.circuit_breaker import gemini_breaker, CLOSED
+    
+    if gemini_breaker.state != CLOSED:
+        return jsonify({'error': f'Gemini circuit breaker is {gemini_breaker.state}'}), 409
+    
+    threading.Thread(target=rescore, args=(current_app._get_current_object(),), daemon=True).start()
+    return jsonify({'message': 'Re-scoring started'}), 202
+
 @admin_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for deployment"""
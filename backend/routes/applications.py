@@ -1,13 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from __init__ import db
-from models import Application, JobDescription, Resume, User, ResumeAnalysis
-from services.resume_parser import ResumeParser
-from services.ai_analyzer import AIAnalyzer
-from services.ranking_service import ranking_service
-from services.jd_pdf_parser import JDPDFParser
+from models import APPLICATION_DETAIL, Application, JobDescription, Resume, User, ResumeAnalysis
+from services.admission import DEFER, REJECT, admission, deferred_headers, rejection_response, submit_analysis
+from services.analysis_pipeline import analyze, record_application
+from services.db_routing import read_replica
+from services.db_writer import run_write
+from services.query_budget import query_budget
 from datetime import datetime
-import threading
 
 applications_bp = Blueprint('applications', __name__)
 
@@ -40,7 +40,7 @@ def apply_for_job():
             return jsonify({'error': 'Resume not found'}), 404
         
         # Check if user already applied for this job
-        existing_application = Application.query.filter(
+        existing_application = Application.query.options(*APPLICATION_DETAIL).filter(
             Application.user_id == user_id,
             Application.job_id == job_id
         ).first()
@@ -51,112 +51,29 @@ def apply_for_job():
                 'application': existing_application.to_dict()
             }), 400
         
-        # Create application
-        application = Application(
-            user_id=user_id,
-            job_id=job_id,
-            resume_id=resume_id
-        )
-        
-        db.session.add(application)
-        db.session.commit()
-        
-        # Start analysis in background
-        def analyze_application():
-            from __init__ import create_app
-            app = create_app()
-            with app.app_context():
-                try:
-                    print(f"Starting analysis for resume {resume_id} and job {job_id}")
-                    
-                    # Get parsed resume data
-                    parsed_data = resume.get_parsed_data()
-                    if not parsed_data:
-                        print("No parsed data found, re-parsing resume...")
-                        # Re-parse if needed
-                        parser = ResumeParser()
-                        parsed_data = parser.parse_resume(resume.file_path, resume.file_type.lower())
-                        resume.set_parsed_data(parsed_data)
-                        db.session.commit()
-                        print("Resume parsed successfully")
-                    
-                    # Perform AI analysis with combined job description
-                    print("Starting AI analysis...")
-                    ai_analyzer = AIAnalyzer()
-                    combined_job_description = JDPDFParser.get_combined_job_description(job)
-                    analysis_result = ai_analyzer.perform_comprehensive_analysis(
-                        parsed_data, 
-                        combined_job_description
-                    )
-                    print(f"AI analysis completed with score: {analysis_result.get('relevance_score', 'N/A')}")
-                    
-                    # Create or update resume analysis
-                    analysis = ResumeAnalysis.query.filter(
-                        ResumeAnalysis.resume_id == resume_id,
-                        ResumeAnalysis.job_id == job_id
-                    ).first()
-                    
-                    if not analysis:
-                        analysis = ResumeAnalysis(
-                            resume_id=resume_id,
-                            job_id=job_id,
-                            analysis_status='completed'
-                        )
-                        db.session.add(analysis)
-                    
-                    # Update analysis with results
-                    analysis.relevance_score = analysis_result['relevance_score']
-                    analysis.verdict = analysis_result['verdict']
-                    analysis.set_missing_skills(analysis_result.get('missing_skills', []))
-                    analysis.set_missing_certifications(analysis_result.get('missing_certifications', []))
-                    analysis.set_missing_projects(analysis_result.get('missing_projects', []))
-                    analysis.improvement_suggestions = '\n'.join(analysis_result.get('improvement_suggestions', []))
-                    analysis.analysis_status = 'completed'
-                    analysis.analysis_completed_at = datetime.utcnow()
-                    analysis.is_in_queue = False
-                    
-                    # Add to ranking system
-                    print("Adding to ranking system...")
-                    try:
-                        ranking_service.add_to_ranking(analysis)
-                        print("Successfully added to ranking system")
-                    except Exception as ranking_error:
-                        print(f"Error adding to ranking system: {ranking_error}")
-                        # Continue anyway, don't fail the entire analysis
-                    
-                    # Check if this should be promoted to top
-                    try:
-                        ranking_service.promote_high_score_resume(job_id, min_score=80.0)
-                        print("Promotion check completed")
-                    except Exception as promotion_error:
-                        print(f"Error in promotion check: {promotion_error}")
-                        # Continue anyway
-                    
-                    db.session.commit()
-                    print(f"Analysis completed successfully for resume {resume_id}")
-                    
-                except Exception as e:
-                    print(f"Error in background analysis: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    
-                    # Mark analysis as failed
-                    try:
-                        analysis = ResumeAnalysis.query.filter(
-                            ResumeAnalysis.resume_id == resume_id,
-                            ResumeAnalysis.job_id == job_id
-                        ).first()
-                        if analysis:
-                            analysis.analysis_status = 'failed'
-                            analysis.analysis_notes = str(e)
-                            db.session.commit()
-                    except Exception as db_error:
-                        print(f"Error updating failed analysis: {db_error}")
-        
-        # Start background analysis
-        thread = threading.Thread(target=analyze_application)
-        thread.daemon = True
-        thread.start()
+        # Refused submissions record nothing; deferred ones are recorded and analyzed in queue order
+        decision = admission.check(user_id)
+        if decision['decision'] == REJECT:
+            return rejection_response(decision)
+        
+        # Create the application and its pending analysis in one transaction, so a failure leaves
+        # neither (the analysis is an upsert on the unique (resume_id, job_id), so a concurrent
+        # analyze request cannot add a second row)
+        application_id, analysis_id = record_application(user_id, resume_id, job_id)
+        application = Application.query.options(*APPLICATION_DETAIL).get(application_id)
+        
+        # Background analysis on the bounded worker pool, sharing this app rather than building one per thread
+        _, eta = submit_analysis(current_app._get_current_object(), decision, analysis_id)
+        
+        # 202, or 503 past the queue's soft limit: recorded either way, but the client should back off
+        if decision['decision'] == DEFER:
+            return jsonify({
+                'message': 'Application submitted; analysis queued',
+                'application': application.to_dict(),
+                'reason': decision['reason'],
+                'retry_after': decision['retry_after'],
+                'eta': eta
+            }), decision['status'], deferred_headers(eta, decision)
         
         return jsonify({
             'message': 'Application submitted successfully',
@@ -168,7 +85,9 @@ def apply_for_job():
         return jsonify({'error': str(e)}), 500
 
 @applications_bp.route('/', methods=['GET'])
+@read_replica
 @jwt_required()
+@query_budget(6)
 def get_user_applications():
     """Get applications for the current user"""
     try:
@@ -177,7 +96,10 @@ def get_user_applications():
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
-        query = Application.query.filter(Application.user_id == user_id)
+        # Resumes and jobs (with their application counts) load in one query each
+        query = Application.query\
+            .options(*APPLICATION_DETAIL)\
+            .filter(Application.user_id == user_id)
         
         if status:
             query = query.filter(Application.application_status == status)
@@ -202,12 +124,13 @@ def get_user_applications():
 
 @applications_bp.route('/<int:application_id>', methods=['GET'])
 @jwt_required()
+@query_budget(4)
 def get_application(application_id):
     """Get specific application details"""
     try:
         user_id = int(get_jwt_identity())
         
-        application = Application.query.filter(
+        application = Application.query.options(*APPLICATION_DETAIL).filter(
             Application.id == application_id,
             Application.user_id == user_id
         ).first()
@@ -238,8 +161,7 @@ def withdraw_application(application_id):
         if application.application_status != 'pending':
             return jsonify({'error': 'Cannot withdraw application that has been reviewed'}), 400
         
-        db.session.delete(application)
-        db.session.commit()
+        run_write(lambda: db.session.delete(Application.query.get(application_id)))
         
         return jsonify({'message': 'Application withdrawn successfully'}), 200
         
@@ -270,65 +192,39 @@ def test_analysis(resume_id, job_id):
         
         print(f"Starting synchronous analysis for resume {resume_id} and job {job_id}")
         
-        # Get parsed resume data
-        parsed_data = resume.get_parsed_data()
-        if not parsed_data:
-            print("No parsed data found, re-parsing resume...")
-            parser = ResumeParser()
-            parsed_data = parser.parse_resume(resume.file_path, resume.file_type.lower())
-            resume.set_parsed_data(parsed_data)
-            db.session.commit()
-            print("Resume parsed successfully")
-        
-        # Perform AI analysis with combined job description
-        print("Starting AI analysis...")
-        ai_analyzer = AIAnalyzer()
-        combined_job_description = JDPDFParser.get_combined_job_description(job)
-        analysis_result = ai_analyzer.perform_comprehensive_analysis(
-            parsed_data, 
-            combined_job_description
-        )
-        print(f"AI analysis completed with score: {analysis_result.get('relevance_score', 'N/A')}")
-        
-        # Create or update resume analysis
-        analysis = ResumeAnalysis.query.filter(
-            ResumeAnalysis.resume_id == resume_id,
-            ResumeAnalysis.job_id == job_id
-        ).first()
-        
-        if not analysis:
-            analysis = ResumeAnalysis(
-                resume_id=resume_id,
-                job_id=job_id,
-                analysis_status='completed'
+        # A completed analysis is re-run; queued or running ones are left alone and joined below
+        def requeue_completed():
+            table = ResumeAnalysis.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.resume_id == resume_id)
+                .where(table.c.job_id == job_id)
+                .where(table.c.analysis_status == 'completed')
+                .values(analysis_status='pending', analysis_started_at=None, analysis_completed_at=None,
+                        analysis_notes=None)
             )
-            db.session.add(analysis)
-        
-        # Update analysis with results
-        analysis.relevance_score = analysis_result['relevance_score']
-        analysis.verdict = analysis_result['verdict']
-        analysis.set_missing_skills(analysis_result.get('missing_skills', []))
-        analysis.set_missing_certifications(analysis_result.get('missing_certifications', []))
-        analysis.set_missing_projects(analysis_result.get('missing_projects', []))
-        analysis.improvement_suggestions = '\n'.join(analysis_result.get('improvement_suggestions', []))
-        analysis.analysis_status = 'completed'
-        analysis.analysis_completed_at = datetime.utcnow()
-        analysis.is_in_queue = False
-        
-        # Add to ranking system
-        print("Adding to ranking system...")
-        ranking_service.add_to_ranking(analysis)
-        
-        # Check if this should be promoted to top
-        ranking_service.promote_high_score_resume(job_id, min_score=80.0)
-        
-        db.session.commit()
+        
+        run_write(requeue_completed)
+        
+        # Concurrent calls share one run (and its ResumeAnalysis row) instead of racing to insert
+        outcome, coalesced = analyze(resume_id, job_id)
+        analysis = ResumeAnalysis.query.populate_existing().get(outcome['analysis_id'])
+        
+        if not outcome['ran']:
+            return jsonify({
+                'message': 'Analysis already in progress',
+                'analysis': analysis.to_dict()
+            }), 202
+        
+        if outcome['error']:
+            return jsonify({'error': outcome['error']}), 500
+        
         print(f"Analysis completed successfully for resume {resume_id}")
         
         return jsonify({
             'message': 'Analysis completed successfully',
             'analysis': analysis.to_dict(),
-            'analysis_result': analysis_result
+            'coalesced': coalesced
         }), 200
         
     except Exception as e:
@@ -341,112 +237,35 @@ def test_analysis(resume_id, job_id):
 @applications_bp.route('/process-pending', methods=['POST'])
 @jwt_required()
 def process_pending_applications():
-    """Process all pending applications synchronously (for debugging)"""
+    """Analyze the pending applications as a resumable backfill job (progress: GET /api/admin/backfills/<id>)"""
+    from services.backfill import SCOPES, backfill_runner
+    
     try:
         user_id = int(get_jwt_identity())
         
         # Check if user is admin
-        from models import User
         user = User.query.get(user_id)
         if not user or not user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
-        # Get all pending applications
-        pending_applications = Application.query.filter_by(application_status='pending').all()
+        data = request.get_json(silent=True) or {}
+        scope = data.get('scope', 'missing')
+        if scope not in SCOPES:
+            return jsonify({'error': f"scope must be one of {', '.join(SCOPES)}"}), 400
         
-        if not pending_applications:
+        total_pending = Application.query.filter_by(application_status='pending').count()
+        if not total_pending:
             return jsonify({'message': 'No pending applications found'}), 200
         
-        processed_count = 0
-        errors = []
-        
-        for application in pending_applications:
-            try:
-                print(f"Processing application {application.id}...")
-                
-                # Get resume and job
-                resume = Resume.query.get(application.resume_id)
-                job = JobDescription.query.get(application.job_id)
-                
-                if not resume or not job:
-                    errors.append(f"Application {application.id}: Resume or job not found")
-                    continue
-                
-                # Get parsed resume data
-                parsed_data = resume.get_parsed_data()
-                if not parsed_data:
-                    print(f"Parsing resume {resume.id}...")
-                    parser = ResumeParser()
-                    parsed_data = parser.parse_resume(resume.file_path, resume.file_type.lower())
-                    resume.set_parsed_data(parsed_data)
-                    db.session.commit()
-                
-                # Perform AI analysis
-                print(f"Starting AI analysis for application {application.id}...")
-                ai_analyzer = AIAnalyzer()
-                combined_job_description = JDPDFParser.get_combined_job_description(job)
-                analysis_result = ai_analyzer.perform_comprehensive_analysis(
-                    parsed_data, 
-                    combined_job_description
-                )
-                print(f"AI analysis completed with score: {analysis_result.get('relevance_score', 'N/A')}")
-                
-                # Create or update resume analysis
-                analysis = ResumeAnalysis.query.filter(
-                    ResumeAnalysis.resume_id == application.resume_id,
-                    ResumeAnalysis.job_id == application.job_id
-                ).first()
-                
-                if not analysis:
-                    analysis = ResumeAnalysis(
-                        resume_id=application.resume_id,
-                        job_id=application.job_id,
-                        analysis_status='completed'
-                    )
-                    db.session.add(analysis)
-                
-                # Update analysis with results
-                analysis.relevance_score = analysis_result['relevance_score']
-                analysis.verdict = analysis_result['verdict']
-                analysis.set_missing_skills(analysis_result.get('missing_skills', []))
-                analysis.set_missing_certifications(analysis_result.get('missing_certifications', []))
-                analysis.set_missing_projects(analysis_result.get('missing_projects', []))
-                analysis.improvement_suggestions = '\n'.join(analysis_result.get('improvement_suggestions', []))
-                analysis.analysis_status = 'completed'
-                analysis.analysis_completed_at = datetime.utcnow()
-                analysis.is_in_queue = False
-                
-                # Add to ranking system
-                try:
-                    ranking_service.add_to_ranking(analysis)
-                    print(f"Successfully added application {application.id} to ranking system")
-                except Exception as ranking_error:
-                    print(f"Error adding application {application.id} to ranking system: {ranking_error}")
-                    errors.append(f"Application {application.id}: Ranking error - {ranking_error}")
-                
-                # Check if this should be promoted to top
-                try:
-                    ranking_service.promote_high_score_resume(application.job_id, min_score=80.0)
-                except Exception as promotion_error:
-                    print(f"Error in promotion check for application {application.id}: {promotion_error}")
-                
-                processed_count += 1
-                print(f"Application {application.id} processed successfully")
-                
-            except Exception as e:
-                error_msg = f"Application {application.id}: {str(e)}"
-                errors.append(error_msg)
-                print(f"Error processing application {application.id}: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        db.session.commit()
+        job_id = backfill_runner.create(user_id, scope)
+        backfill_runner.start(current_app._get_current_object(), job_id)
+        backfill = backfill_runner.get(job_id)
         
         return jsonify({
-            'message': f'Processed {processed_count} applications',
-            'errors': errors,
-            'total_pending': len(pending_applications)
-        }), 200
+            'message': f"Backfill {job_id} started for {backfill['total']} applications",
+            'backfill': backfill,
+            'total_pending': total_pending
+        }), 202
         
     except Exception as e:
         db.session.rollback()
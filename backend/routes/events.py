@@ -0,0 +1,70 @@
+from flask import Blueprint, request, jsonify, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from __init__ import db
+from models import User
+from services.event_bus import event_bus, format_sse, user_topic, job_topic, SubscriberLimitError
+import time
+
+events_bp = Blueprint('events', __name__)
+
+@events_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_events():
+    """Server-Sent Events: the user's analysis status changes, plus a job's ranking updates for admins"""
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        topics = [user_topic(user_id)]
+        
+        job_id = request.args.get('job_id', type=int)
+        if job_id:
+            if not user.is_admin:
+                return jsonify({'error': 'Admin access required'}), 403
+            topics.append(job_topic(job_id))
+        
+        subscription = event_bus.subscribe(topics)
+        
+    except SubscriberLimitError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(current_app.config['EVENT_HEARTBEAT_SECONDS'])
+        return response, 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    heartbeat = current_app.config['EVENT_HEARTBEAT_SECONDS']
+    max_age = current_app.config['EVENT_STREAM_MAX_AGE']
+    
+    # Idle streams must not pin a pooled DB connection
+    db.session.remove()
+    
+    def generate():
+        try:
+            # Reconnect delay for EventSource once the stream is recycled
+            yield f'retry: {heartbeat * 1000}\n\n'
+            while time.monotonic() - subscription.created_at < max_age:
+                event = subscription.get(timeout=heartbeat)
+                if event is None:
+                    yield ': heartbeat\n\n'
+                else:
+                    yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+@events_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def event_stats():
+    """Subscriber and publish counters for this process"""
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify({'events': event_bus.stats()}), 200
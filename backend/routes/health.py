@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify, current_app
+from services.health import liveness, readiness_probe
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('', methods=['GET'])
+@health_bp.route('/live', methods=['GET'])
+def live():
+    """Liveness: the process is up (restart it if this fails)"""
+    return jsonify(liveness()), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: ok / degraded / down per check; 503 when down so the load balancer stops routing here"""
+    try:
+        report = readiness_probe.report(current_app._get_current_object())
+    except Exception as e:
+        return jsonify({'status': 'down', 'ready': False, 'error': str(e)}), 503
+    return jsonify(report), 200 if report['ready'] else 503
@@ -2,6 +2,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from __init__ import db
 from models import JobDescription, User
+from services.db_writer import run_write
+from services.query_budget import query_budget
+from services.response_cache import response_cache, request_variant, invalidate_job, job_namespace, JOBS_NAMESPACE
+from sqlalchemy.orm import undefer
 import os
 import uuid
 from werkzeug.utils import secure_filename
@@ -10,6 +14,7 @@ jobs_bp = Blueprint('jobs', __name__)
 
 @jobs_bp.route('/', methods=['GET'])
 @jwt_required()
+@query_budget(5)
 def get_jobs():
     try:
         page = request.args.get('page', 1, type=int)
@@ -17,52 +22,61 @@ def get_jobs():
         search = request.args.get('search', '')
         is_active = request.args.get('is_active', True, type=lambda x: x.lower() == 'true')
         
-        # Build query
-        query = JobDescription.query
-        
-        if search:
-            query = query.filter(
-                db.or_(
-                    JobDescription.title.contains(search),
-                    JobDescription.company.contains(search),
-                    JobDescription.description.contains(search)
+        def build_payload():
+            # Build query; application counts come back in the same SELECT
+            query = JobDescription.query.options(undefer(JobDescription.application_count))
+            
+            if search:
+                query = query.filter(
+                    db.or_(
+                        JobDescription.title.contains(search),
+                        JobDescription.company.contains(search),
+                        JobDescription.description.contains(search)
+                    )
                 )
+            
+            if is_active is not None:
+                query = query.filter(JobDescription.is_active == is_active)
+            
+            # Order by creation date (newest first)
+            query = query.order_by(JobDescription.created_at.desc())
+            
+            # Paginate
+            jobs = query.paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
             )
-        
-        if is_active is not None:
-            query = query.filter(JobDescription.is_active == is_active)
-        
-        # Order by creation date (newest first)
-        query = query.order_by(JobDescription.created_at.desc())
-        
-        # Paginate
-        jobs = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        return jsonify({
-            'jobs': [job.to_dict() for job in jobs.items],
-            'total': jobs.total,
-            'pages': jobs.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+            
+            return {
+                'jobs': [job.to_dict() for job in jobs.items],
+                'total': jobs.total,
+                'pages': jobs.pages,
+                'current_page': page,
+                'per_page': per_page
+            }
+        
+        # Served from cache (or 304) until a job or its application count changes
+        return response_cache.respond(JOBS_NAMESPACE, build_payload, variant=request_variant())
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @jobs_bp.route('/<int:job_id>', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def get_job(job_id):
     try:
-        job = JobDescription.query.get(job_id)
+        def build_payload():
+            job = JobDescription.query.options(undefer(JobDescription.application_count)).get(job_id)
+            return {'job': job.to_dict()} if job else None
         
-        if not job:
+        response = response_cache.respond(job_namespace(job_id), build_payload)
+        
+        if response is None:
             return jsonify({'error': 'Job not found'}), 404
         
-        return jsonify({'job': job.to_dict()}), 200
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -111,20 +125,25 @@ def create_job():
                 jd_pdf_path = file_path
         
         # Create new job
-        job = JobDescription(
-            title=data['title'],
-            company=data.get('company', ''),
-            description=data['description'],
-            requirements=data.get('requirements', ''),
-            location=data.get('location', ''),
-            experience_level=data.get('experience_level', ''),
-            employment_type=data.get('employment_type', ''),
-            jd_pdf_path=jd_pdf_path,
-            created_by=user_id
-        )
-        
-        db.session.add(job)
-        db.session.commit()
+        def insert():
+            job = JobDescription(
+                title=data['title'],
+                company=data.get('company', ''),
+                description=data['description'],
+                requirements=data.get('requirements', ''),
+                location=data.get('location', ''),
+                experience_level=data.get('experience_level', ''),
+                employment_type=data.get('employment_type', ''),
+                jd_pdf_path=jd_pdf_path,
+                created_by=user_id
+            )
+            db.session.add(job)
+            db.session.flush()
+            return job.id
+        
+        job_id = run_write(insert)
+        invalidate_job(job_id)
+        job = JobDescription.query.options(undefer(JobDescription.application_count)).get(job_id)
         
         return jsonify({
             'message': 'Job created successfully',
@@ -154,24 +173,28 @@ def update_job(job_id):
         data = request.get_json()
         
         # Update fields
-        if 'title' in data:
-            job.title = data['title']
-        if 'company' in data:
-            job.company = data['company']
-        if 'description' in data:
-            job.description = data['description']
-        if 'requirements' in data:
-            job.requirements = data['requirements']
-        if 'location' in data:
-            job.location = data['location']
-        if 'experience_level' in data:
-            job.experience_level = data['experience_level']
-        if 'employment_type' in data:
-            job.employment_type = data['employment_type']
-        if 'is_active' in data:
-            job.is_active = data['is_active']
-        
-        db.session.commit()
+        def update():
+            job = JobDescription.query.get(job_id)
+            if 'title' in data:
+                job.title = data['title']
+            if 'company' in data:
+                job.company = data['company']
+            if 'description' in data:
+                job.description = data['description']
+            if 'requirements' in data:
+                job.requirements = data['requirements']
+            if 'location' in data:
+                job.location = data['location']
+            if 'experience_level' in data:
+                job.experience_level = data['experience_level']
+            if 'employment_type' in data:
+                job.employment_type = data['employment_type']
+            if 'is_active' in data:
+                job.is_active = data['is_active']
+        
+        run_write(update)
+        invalidate_job(job_id)
+        job = JobDescription.query.options(undefer(JobDescription.application_count)).populate_existing().get(job_id)
         
         return jsonify({
             'message': 'Job updated successfully',
@@ -199,8 +222,11 @@ def delete_job(job_id):
             return jsonify({'error': 'Job not found'}), 404
         
         # Soft delete by setting is_active to False
-        job.is_active = False
-        db.session.commit()
+        def deactivate():
+            JobDescription.query.get(job_id).is_active = False
+        
+        run_write(deactivate)
+        invalidate_job(job_id)
         
         return jsonify({'message': 'Job deactivated successfully'}), 200
         
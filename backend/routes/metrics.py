@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify, Response
+from services.metrics import metrics, metrics_authorized
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def scrape_metrics():
+    """Prometheus text exposition of request, queue, database and LLM metrics"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    
+    try:
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -7,9 +7,15 @@ from datetime import datetime
 from __init__ import db, limiter
 from models import Resume, ResumeAnalysis, JobDescription, User
 from services.resume_parser import ResumeParser
-from services.ai_analyzer import AIAnalyzer
+from services.admission import (DEFER, IN_FLIGHT_STATUSES, REJECT, admission, analysis_dispatcher,
+                                deferred_headers, rejection_response, submit_analysis)
+from services.analysis_pipeline import analyze, ensure_analysis
 from services.ranking_service import ranking_service
-from services.jd_pdf_parser import JDPDFParser
+from services.db_routing import read_replica
+from services.db_writer import run_write
+from services.query_budget import query_budget
+from services.queue_eta import queue_eta
+from sqlalchemy.orm import selectinload
 
 resumes_bp = Blueprint('resumes', __name__)
 
@@ -55,18 +61,20 @@ def upload_resume():
         parsed_data = parser.parse_resume(file_path, file_extension)
         
         # Create resume record
-        resume = Resume(
-            filename=unique_filename,
-            original_filename=file.filename,
-            file_path=file_path,
-            file_type=file_extension.upper(),
-            extracted_text=parsed_data['cleaned_text'],
-            user_id=user_id
-        )
-        resume.set_parsed_data(parsed_data)
-        
-        db.session.add(resume)
-        db.session.commit()
+        def insert():
+            resume = Resume(
+                filename=unique_filename,
+                original_filename=file.filename,
+                file_path=file_path,
+                file_type=file_extension.upper(),
+                user_id=user_id
+            )
+            resume.set_parsed_data(parsed_data)
+            db.session.add(resume)
+            db.session.flush()
+            return resume.id
+        
+        resume = Resume.query.get(run_write(insert))
         
         return jsonify({
             'message': 'Resume uploaded and parsed successfully',
@@ -84,7 +92,9 @@ def upload_resume():
         return jsonify({'error': str(e)}), 500
 
 @resumes_bp.route('/', methods=['GET'])
+@read_replica
 @jwt_required()
+@query_budget(4)
 def get_user_resumes():
     try:
         user_id = int(get_jwt_identity())
@@ -101,7 +111,7 @@ def get_user_resumes():
             )
         
         return jsonify({
-            'resumes': [resume.to_dict() for resume in resumes.items],
+            'resumes': [resume.to_dict(include_parsed_data=False) for resume in resumes.items],
             'total': resumes.total,
             'pages': resumes.pages,
             'current_page': page,
@@ -155,87 +165,76 @@ def analyze_resume(resume_id, job_id):
             ResumeAnalysis.job_id == job_id
         ).first()
         
-        if existing_analysis:
+        if existing_analysis and existing_analysis.analysis_status == 'completed':
             return jsonify({
                 'message': 'Analysis already exists',
                 'analysis': existing_analysis.to_dict()
             }), 200
         
-        # Create new analysis record
-        analysis = ResumeAnalysis(
-            resume_id=resume_id,
-            job_id=job_id,
-            analysis_status='pending'
-        )
-        
-        db.session.add(analysis)
-        db.session.commit()
-        
-        # Add to queue
-        queue_position = ranking_service.add_to_queue(analysis.id, job_id)
-        
-        # Start analysis in background (simplified version)
-        try:
-            # Get parsed resume data
-            parsed_data = resume.get_parsed_data()
-            if not parsed_data:
-                # Re-parse if needed
-                parser = ResumeParser()
-                parsed_data = parser.parse_resume(resume.file_path, resume.file_type.lower())
-                resume.set_parsed_data(parsed_data)
-                db.session.commit()
-            
-            # Perform AI analysis with combined job description (including PDF)
-            ai_analyzer = AIAnalyzer()
-            combined_job_description = JDPDFParser.get_combined_job_description(job)
-            analysis_result = ai_analyzer.perform_comprehensive_analysis(
-                parsed_data, 
-                combined_job_description
-            )
-            
-            # Update analysis with results
-            analysis.relevance_score = analysis_result['relevance_score']
-            analysis.verdict = analysis_result['verdict']
-            analysis.set_missing_skills(analysis_result.get('missing_skills', []))
-            analysis.set_missing_certifications(analysis_result.get('missing_certifications', []))
-            analysis.set_missing_projects(analysis_result.get('missing_projects', []))
-            analysis.improvement_suggestions = '\n'.join(analysis_result.get('improvement_suggestions', []))
-            analysis.analysis_status = 'completed'
-            analysis.analysis_completed_at = datetime.utcnow()
-            analysis.is_in_queue = False
-            
-            # Update rankings
-            ranking_service.update_ranking(job_id, analysis)
-            
-            # Check if this should be promoted to top
-            ranking_service.promote_high_score_resume(job_id, min_score=80.0)
-            
-            db.session.commit()
-            
+        # Already queued: report its place instead of claiming it ahead of the queue (and of admission)
+        if existing_analysis and existing_analysis.analysis_status == 'pending':
+            analysis_dispatcher.submit(current_app._get_current_object())
+            eta = queue_eta.analysis_etas([existing_analysis]).get(existing_analysis.id)
             return jsonify({
-                'message': 'Analysis completed successfully',
-                'analysis': analysis.to_dict(),
-                'queue_position': queue_position
-            }), 200
-            
-        except Exception as analysis_error:
-            # Mark analysis as failed
-            analysis.analysis_status = 'failed'
-            analysis.analysis_notes = str(analysis_error)
-            db.session.commit()
-            
+                'message': 'Analysis queued',
+                'analysis_id': existing_analysis.id,
+                'queue_position': existing_analysis.queue_position,
+                'eta': eta
+            }), 202, deferred_headers(eta)
+        
+        # New work and retries of failed work go through admission control; a running analysis is joined below
+        if not existing_analysis or existing_analysis.analysis_status not in IN_FLIGHT_STATUSES:
+            decision = admission.check(user_id)
+            if decision['decision'] == REJECT:
+                return rejection_response(decision)
+            if decision['decision'] == DEFER:
+                if existing_analysis:
+                    # A failed analysis goes back in its job's queue for the background workers
+                    analysis_id = existing_analysis.id
+                    run_write(lambda: ranking_service.add_to_queue(analysis_id, job_id), exclusive=True)
+                else:
+                    analysis_id = ensure_analysis(resume_id, job_id)
+                _, eta = submit_analysis(current_app._get_current_object(), decision, analysis_id)
+                return jsonify({
+                    'message': 'Analysis queued',
+                    'analysis_id': analysis_id,
+                    'reason': decision['reason'],
+                    'retry_after': decision['retry_after'],
+                    'eta': eta
+                }), decision['status'], deferred_headers(eta, decision)
+        
+        # Double-clicks and retries join the run already in flight instead of calling Gemini again
+        outcome, coalesced = analyze(resume_id, job_id)
+        analysis = ResumeAnalysis.query.populate_existing().get(outcome['analysis_id'])
+        
+        if not outcome['ran']:
+            return jsonify({
+                'message': 'Analysis already in progress',
+                'analysis': analysis.to_dict()
+            }), 202
+        
+        if outcome['error']:
             return jsonify({
                 'message': 'Analysis queued but failed during processing',
-                'error': str(analysis_error),
-                'queue_position': queue_position
+                'error': outcome['error'],
+                'queue_position': analysis.queue_position
             }), 202
         
+        return jsonify({
+            'message': 'Analysis completed successfully',
+            'analysis': analysis.to_dict(),
+            'queue_position': analysis.queue_position,
+            'coalesced': coalesced
+        }), 200
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @resumes_bp.route('/analyses', methods=['GET'])
+@read_replica
 @jwt_required()
+@query_budget(8)
 def get_user_analyses():
     try:
         user_id = int(get_jwt_identity())
@@ -244,6 +243,7 @@ def get_user_analyses():
         job_id = request.args.get('job_id', type=int)
         
         query = ResumeAnalysis.query.join(Resume)\
+            .options(selectinload(ResumeAnalysis.resume).selectinload(Resume.user))\
             .filter(Resume.user_id == user_id)
         
         if job_id:
@@ -257,7 +257,8 @@ def get_user_analyses():
             )
         
         return jsonify({
-            'analyses': [analysis.to_dict() for analysis in analyses.items],
+            # Queued analyses carry an ETA (two queries for the whole page)
+            'analyses': queue_eta.annotate(analyses.items, [analysis.to_dict() for analysis in analyses.items]),
             'total': analyses.total,
             'pages': analyses.pages,
             'current_page': page,
@@ -267,6 +268,30 @@ def get_user_analyses():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@resumes_bp.route('/analyses/<int:analysis_id>/eta', methods=['GET'])
+@jwt_required()
+def get_analysis_eta(analysis_id):
+    """Status and ETA of one of the user's analyses (cheap enough to poll)"""
+    try:
+        user_id = int(get_jwt_identity())
+        analysis = ResumeAnalysis.query.join(Resume)\
+            .filter(ResumeAnalysis.id == analysis_id)\
+            .filter(Resume.user_id == user_id)\
+            .first()
+        
+        if not analysis:
+            return jsonify({'error': 'Analysis not found'}), 404
+        
+        return jsonify({
+            'analysis_id': analysis.id,
+            'analysis_status': analysis.analysis_status,
+            'queue_position': analysis.queue_position,
+            'eta': queue_eta.analysis_etas([analysis]).get(analysis.id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @resumes_bp.route('/<int:resume_id>', methods=['DELETE'])
 @jwt_required()
 def delete_resume(resume_id):
@@ -288,8 +313,7 @@ def delete_resume(resume_id):
             print(f"Error deleting file: {e}")
         
         # Delete from database (cascade will handle analyses)
-        db.session.delete(resume)
-        db.session.commit()
+        run_write(lambda: db.session.delete(Resume.query.get(resume_id)))
         
         return jsonify({'message': 'Resume deleted successfully'}), 200
         
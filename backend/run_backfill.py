@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Backfill runner for the command line - analyzes the pending applications in checkpointed chunks
+in the foreground, the same job the admin API starts. With --resume it continues a failed or
+interrupted job (one whose runner died) from its last checkpoint; with --status it only prints
+progress. Stop it with Ctrl+C and resume it later: the chunk in progress is redone.
+
+Example:
+    python run_backfill.py --scope missing --chunk-size 100
+    python run_backfill.py --resume 3
+"""
+
+import argparse
+import json
+from __init__ import create_app
+from services.backfill import SCOPES, backfill_runner
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--scope', choices=SCOPES, default='missing',
+                            help='missing: applications without a completed analysis; all: re-run every one')
+    arg_parser.add_argument('--chunk-size', type=int, help='Applications per checkpoint (default BACKFILL_CHUNK_SIZE)')
+    arg_parser.add_argument('--resume', type=int, metavar='ID', help='Continue this backfill job')
+    arg_parser.add_argument('--status', type=int, metavar='ID', help='Print this backfill job and exit')
+    args = arg_parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.status:
+            print(json.dumps(backfill_runner.get(args.status), indent=2))
+            return
+
+        job_id = args.resume or backfill_runner.create(None, args.scope, args.chunk_size)
+        print(f"🔄 Running backfill {job_id}...")
+        if not backfill_runner.run(app, job_id):
+            backfill = backfill_runner.get(job_id)
+            print(f"❌ Backfill {job_id} is {backfill['status'] if backfill else 'missing'} and cannot be run here")
+            return
+
+        backfill = backfill_runner.get(job_id)
+        print(f"✅ Backfill {job_id} {backfill['status']}: {backfill['done']} done, {backfill['failed']} failed, "
+              f"{backfill['skipped']} skipped, {backfill['remaining']} remaining")
+
+if __name__ == '__main__':
+    main()
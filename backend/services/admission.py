@@ -0,0 +1,320 @@
+"""
+Admission Control
+Backpressure on analysis submission, decided from live queue depth and worker saturation. A
+submission is admitted (its analysis starts now) or deferred: recorded as pending and served in
+order by the background workers. Deferral answers 202 while this process' workers are saturated,
+and 503 once the pending queue reaches ADMISSION_QUEUE_SOFT_LIMIT, so clients and load balancers
+back off while the submission still counts. A submission is rejected (nothing recorded) with 429
+when the user already has ADMISSION_USER_MAX_IN_FLIGHT analyses pending or processing. 503s and
+rejections carry a Retry-After from the queue ETA model.
+
+Background analyses run on at most ANALYSIS_WORKER_CAPACITY threads per process instead of one
+thread per application; each thread keeps taking the analysis the scheduler picks next until none
+are left. A sweep every ANALYSIS_SWEEP_SECONDS, starting with a process' first request, re-queues
+analyses stuck in processing (their worker died) and drains anything left pending.
+"""
+from __init__ import db
+from flask import jsonify
+from models import Resume, ResumeAnalysis
+from services.analysis_scheduler import analysis_scheduler
+from services.metrics import Counter, Gauge, analysis_workers_busy, metrics
+from services.db_writer import run_write
+from services.queue_eta import queue_eta
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import math
+import threading
+import time
+import traceback
+
+ADMIT, DEFER, REJECT = 'admit', 'defer', 'reject'
+IN_FLIGHT_STATUSES = ('pending', 'processing')
+
+admission_decisions = Counter(metrics, 'admission_decisions', 'Analysis submissions by admission decision',
+                              ['decision', 'reason'])
+analysis_dispatcher_threads = Gauge(metrics, 'analysis_dispatcher_threads', 'Background analysis threads running')
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = True
+        self.queue_soft_limit = 200
+        self.user_max_in_flight = 10
+        self.worker_capacity = 8
+        self.retry_after_max = 600
+        self.lock = threading.Lock()
+        self.decisions = {ADMIT: 0, DEFER: 0, REJECT: 0}
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get('ADMISSION_CONTROL', True)
+        self.queue_soft_limit = app.config.get('ADMISSION_QUEUE_SOFT_LIMIT', 200)
+        self.user_max_in_flight = app.config.get('ADMISSION_USER_MAX_IN_FLIGHT', 10)
+        self.worker_capacity = app.config.get('ANALYSIS_WORKER_CAPACITY', 8)
+        self.retry_after_max = app.config.get('ADMISSION_RETRY_AFTER_MAX', 600)
+        analysis_dispatcher.capacity = self.worker_capacity
+        analysis_dispatcher.sweep_seconds = app.config.get('ANALYSIS_SWEEP_SECONDS', 60)
+        analysis_dispatcher.stale_processing_seconds = app.config.get('ANALYSIS_STALE_PROCESSING_SECONDS', 900)
+        if analysis_dispatcher.sweep_seconds > 0:
+            # On the first request rather than here, so scripts that only build the app run no analyses
+            app.before_request(lambda: analysis_dispatcher.start_sweeper(app))
+
+    def _retry_after(self, seconds: float) -> int:
+        return min(max(int(math.ceil(seconds)), 1), self.retry_after_max)
+
+    def _decide(self, decision: str, reason: str, status: int, signals: Dict,
+                retry_after: Optional[float] = None, message: Optional[str] = None) -> Dict:
+        admission_decisions.inc(decision=decision, reason=reason)
+        with self.lock:
+            self.decisions[decision] += 1
+        return dict(signals, decision=decision, reason=reason, status=status, message=message,
+                    retry_after=self._retry_after(retry_after) if retry_after is not None else None)
+
+    def check(self, user_id: int) -> Dict:
+        """Whether a new analysis for this user should start now, wait in the queue or be refused"""
+        from services.health import queue_snapshot
+
+        if not self.enabled:
+            return self._decide(ADMIT, 'disabled', 201, {})
+
+        in_flight = ResumeAnalysis.query.join(Resume)\
+            .filter(Resume.user_id == user_id)\
+            .filter(ResumeAnalysis.analysis_status.in_(IN_FLIGHT_STATUSES))\
+            .limit(self.user_max_in_flight)\
+            .all()
+        queue = queue_snapshot()
+        pending, processing = queue['pending']['count'], queue['processing']['count']
+        busy = int(analysis_workers_busy.get())
+        signals = {'pending': pending, 'processing': processing, 'workers_busy': busy,
+                   'user_in_flight': len(in_flight)}
+
+        if self.user_max_in_flight and len(in_flight) >= self.user_max_in_flight:
+            # Retry once the user's first analysis should be done
+            etas = queue_eta.analysis_etas(in_flight)
+            wait = min((eta['estimated_completion_seconds'] for eta in etas.values()), default=0.0)
+            return self._decide(REJECT, 'user_in_flight', 429, signals, wait,
+                                f'You already have {len(in_flight)} analyses in progress; '
+                                f'retry when one has finished')
+
+        if pending >= self.queue_soft_limit:
+            # Recorded and queued, but the client should back off until the queue is under the limit again
+            estimates = queue_eta.estimates()
+            wait = queue_eta.pending_eta(pending - self.queue_soft_limit, 1.0, processing,
+                                         estimates)['estimated_start_seconds']
+            return self._decide(DEFER, 'queue_depth', 503, signals, wait,
+                                'The analysis queue is busy; your submission was queued')
+        if busy >= self.worker_capacity:
+            return self._decide(DEFER, 'workers_saturated', 202, signals)
+        return self._decide(ADMIT, 'ok', 201, signals)
+
+    def status(self) -> Dict:
+        """Thresholds, the decisions made so far in this process and the dispatcher's threads"""
+        with self.lock:
+            decisions = dict(self.decisions)
+        return {
+            'enabled': self.enabled,
+            'thresholds': {
+                'queue_soft_limit': self.queue_soft_limit,
+                'user_max_in_flight': self.user_max_in_flight,
+                'worker_capacity': self.worker_capacity,
+                'retry_after_max': self.retry_after_max
+            },
+            'decisions': decisions,
+            'workers_busy': int(analysis_workers_busy.get()),
+            'dispatcher': analysis_dispatcher.stats()
+        }
+
+admission = AdmissionController()
+
+def rejection_response(decision: Dict):
+    """The 429/503 response (with Retry-After) for a rejected submission"""
+    return jsonify({
+        'error': decision['message'],
+        'reason': decision['reason'],
+        'retry_after': decision['retry_after']
+    }), decision['status'], {'Retry-After': str(decision['retry_after'])}
+
+def deferred_headers(eta: Optional[Dict], decision: Optional[Dict] = None) -> Dict[str, str]:
+    """Retry-After for a deferred analysis: the decision's backoff (503) or its estimated completion
+    (202, when to poll its status)"""
+    if decision is not None and decision['retry_after'] is not None:
+        return {'Retry-After': str(decision['retry_after'])}
+    if eta is None:
+        return {}
+    return {'Retry-After': str(admission._retry_after(eta['estimated_completion_seconds']))}
+
+class AnalysisDispatcher:
+    """Runs background analyses on a bounded number of threads that drain the pending queue"""
+
+    def __init__(self):
+        self.capacity = 8
+        self.sweep_seconds = 60
+        self.stale_processing_seconds = 900
+        self.lock = threading.Lock()
+        self.threads = 0
+        self.sweeper_started = False
+        self.wakeups = 0  # Bumped by every submit, so a thread about to retire knows to look again
+        self.in_flight: Set[int] = set()  # Analyses this process' threads have picked
+        self.counters = {'threads_started': 0, 'submitted_direct': 0, 'submitted_queued': 0, 'drained': 0,
+                         'pick_errors': 0, 'sweeps': 0, 'reclaimed': 0}
+
+    def submit(self, app, analysis_id: Optional[int] = None) -> bool:
+        """Start a thread for this analysis (or just the queue) if one is free; otherwise a running
+        thread picks it up from the queue. Returns whether a thread was started."""
+        with self.lock:
+            self.wakeups += 1
+            if self.threads >= self.capacity:
+                self.counters['submitted_queued'] += 1
+                return False
+            self.threads += 1
+            self.counters['threads_started'] += 1
+            self.counters['submitted_direct' if analysis_id else 'submitted_queued'] += 1
+            if analysis_id:
+                self.in_flight.add(analysis_id)
+            analysis_dispatcher_threads.set(self.threads)
+
+        thread = threading.Thread(target=self._run, args=(app, analysis_id), daemon=True)
+        thread.start()
+        return True
+
+    def _retire(self) -> None:
+        self.threads -= 1
+        analysis_dispatcher_threads.set(self.threads)
+
+    def _next_pending(self) -> Optional[int]:
+        """Pick the next pending analysis no thread of this process has picked; on None the thread
+        has been retired"""
+        while True:
+            # The scheduler's queries run outside the lock, so submit() never waits on the database
+            with self.lock:
+                exclude, wakeups = list(self.in_flight), self.wakeups
+            analysis_id = analysis_scheduler.pick(exclude)
+            db.session.rollback()
+
+            with self.lock:
+                if analysis_id is None:
+                    if self.wakeups != wakeups:
+                        # A submit may have found every thread busy after the pick looked; look again
+                        continue
+                    self._retire()
+                    return None
+                if analysis_id in self.in_flight:
+                    # Another thread picked it meanwhile
+                    continue
+                self.in_flight.add(analysis_id)
+                self.counters['drained'] += 1
+                return analysis_id
+
+    def _run(self, app, analysis_id: Optional[int]) -> None:
+        from services.analysis_pipeline import analyze
+
+        retired = False
+        with app.app_context():
+            try:
+                while True:
+                    if analysis_id is None:
+                        analysis_id = self._next_pending()
+                        if analysis_id is None:
+                            retired = True
+                            break
+                    try:
+                        pair = db.session.query(ResumeAnalysis.resume_id, ResumeAnalysis.job_id)\
+                            .filter(ResumeAnalysis.id == analysis_id)\
+                            .first()
+                        if pair is not None:
+                            outcome, _ = analyze(pair.resume_id, pair.job_id)
+                            if not outcome['ran']:
+                                print(f"Analysis {analysis_id} already running or completed, skipped")
+                    except Exception as e:
+                        print(f"Error in background analysis {analysis_id}: {e}")
+                        traceback.print_exc()
+                    finally:
+                        with self.lock:
+                            self.in_flight.discard(analysis_id)
+                        db.session.remove()
+                    analysis_id = None
+            except Exception as e:
+                # e.g. a locked or unreachable database while picking; the next submit or sweep starts a new thread
+                print(f"Error picking the next analysis: {e}")
+                traceback.print_exc()
+                with self.lock:
+                    self.counters['pick_errors'] += 1
+            finally:
+                if not retired:
+                    with self.lock:
+                        self._retire()
+                db.session.remove()
+
+    def reclaim_stale(self, analysis_ids: Optional[List[int]] = None) -> int:
+        """Put analyses whose worker died mid-run (processing longer than stale_processing_seconds, e.g.
+        across a restart or deploy) back to pending, optionally only among analysis_ids"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_processing_seconds)
+        with self.lock:
+            running_here = list(self.in_flight)
+        table = ResumeAnalysis.__table__
+        statement = table.update()\
+            .where(table.c.analysis_status == 'processing')\
+            .where(table.c.analysis_started_at < cutoff)\
+            .values(analysis_status='pending', analysis_started_at=None)
+        if analysis_ids is not None:
+            statement = statement.where(table.c.id.in_(analysis_ids))
+        if running_here:
+            statement = statement.where(table.c.id.notin_(running_here))
+        reclaimed = run_write(lambda: db.session.execute(statement).rowcount)
+        if reclaimed:
+            with self.lock:
+                self.counters['reclaimed'] += reclaimed
+            print(f"Re-queued {reclaimed} analyses stuck in processing")
+        return reclaimed
+
+    def sweep(self, app) -> int:
+        """Reclaim stale analyses and start threads for whatever is pending; returns threads started"""
+        with app.app_context():
+            try:
+                self.reclaim_stale()
+                pending = db.session.query(db.func.count(ResumeAnalysis.id))\
+                    .filter(ResumeAnalysis.analysis_status == 'pending')\
+                    .scalar()
+            finally:
+                db.session.remove()
+
+        started = 0
+        with self.lock:
+            self.counters['sweeps'] += 1
+        for _ in range(min(pending, self.capacity)):
+            if not self.submit(app):
+                break
+            started += 1
+        return started
+
+    def start_sweeper(self, app) -> None:
+        """Sweep now (deferred submissions left by a previous process) and every sweep_seconds after"""
+        if self.sweeper_started:
+            return
+        with self.lock:
+            if self.sweeper_started:
+                return
+            self.sweeper_started = True
+        threading.Thread(target=self._sweep_loop, args=(app,), name='analysis-sweeper', daemon=True).start()
+
+    def _sweep_loop(self, app) -> None:
+        while True:
+            try:
+                self.sweep(app)
+            except Exception as e:
+                print(f"Error in analysis sweep: {e}")
+            time.sleep(self.sweep_seconds)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counters, threads=self.threads, capacity=self.capacity,
+                        picked=len(self.in_flight), sweeper=self.sweeper_started)
+
+analysis_dispatcher = AnalysisDispatcher()
+
+def submit_analysis(app, decision: Dict, analysis_id: int) -> Tuple[bool, Optional[Dict]]:
+    """Hand a recorded analysis to the dispatcher: admitted ones start now, deferred ones wait their
+    turn in the queue. Returns (started, eta for a deferred analysis)."""
+    if decision['decision'] == ADMIT:
+        return analysis_dispatcher.submit(app, analysis_id), None
+    analysis_dispatcher.submit(app)
+    analysis = db.session.get(ResumeAnalysis, analysis_id)
+    return False, queue_eta.analysis_etas([analysis]).get(analysis_id) if analysis else None
@@ -1,37 +1,97 @@
-import google.generativeai as genai
 import os
 import re
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
+from services.ai_backends import get_model
+from services.circuit_breaker import CircuitOpenError, gemini_breaker
+from services.local_scorer import local_scorer
+from services.metrics import llm_errors, llm_request_duration, llm_tokens
+from services.pipeline_timings import StageTimer
+from services.prompt_builder import estimate_tokens, prompt_builder
+
+# analysis_notes prefix for results scored without Gemini; those analyses are re-queued later
+LOCAL_SCORE_NOTE = '[local-score]'
+
+class GeminiCallError(Exception):
+    """A Gemini call that failed and was recorded by the breaker"""
 
 class AIAnalyzer:
     def __init__(self):
-        # Configure Gemini API
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        # Gemini by default; AI_BACKEND=record/replay/synthetic for recorded or offline runs
+        self.model = get_model()
+        self.backend = os.getenv('AI_BACKEND', 'gemini')
+        self.timeout = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 30))
     
-    def perform_comprehensive_analysis(self, resume_data: Dict, job_description: str) -> Dict[str, Any]:
-        """Perform comprehensive resume analysis using Gemini AI"""
+    def perform_comprehensive_analysis(self, resume_data: Dict, job_description: str,
+                                       requirement_profile: Optional[Dict] = None,
+                                       timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+        """Perform comprehensive resume analysis using Gemini AI (prompt, llm and response_parse stages go to timer)"""
+        timer = timer or StageTimer()
+        prompt_tokens = None
+        resume_text = ''
         try:
-            # Extract key information from resume
-            resume_text = self._extract_resume_text(resume_data)
-            
-            # Create analysis prompt
-            prompt = self._create_analysis_prompt(resume_text, job_description)
+            with timer.stage('prompt'):
+                # Extract key information from resume
+                resume_text = self._extract_resume_text(resume_data)
+                
+                # Create analysis prompt within the token budget
+                prompt, prompt_tokens = prompt_builder.build(job_description, resume_text)
             
-            # Get AI analysis
-            response = self.model.generate_content(prompt)
-            analysis_text = response.text
+            # Get AI analysis; the breaker fails fast while Gemini is down or slow
+            with timer.stage('llm'):
+                analysis_text = self._generate(prompt, prompt_tokens)
             
             # Parse the response
-            return self._parse_analysis_response(analysis_text)
+            with timer.stage('response_parse'):
+                analysis = self._parse_analysis_response(analysis_text)
             
+        except CircuitOpenError as e:
+            analysis = self._get_local_analysis(resume_text, requirement_profile, str(e))
+        except GeminiCallError as e:
+            print(f"Error in AI analysis: {e}")
+            analysis = self._get_local_analysis(resume_text, requirement_profile, f"Gemini call failed: {e}")
         except Exception as e:
+            # Not a Gemini outage (e.g. the prompt could not be built): a re-score would fail the same way
             print(f"Error in AI analysis: {e}")
-            return self._get_fallback_analysis()
+            analysis = self._get_local_analysis(resume_text, requirement_profile, f"Analysis failed: {e}",
+                                                rescore=False)
+        
+        analysis['prompt_tokens'] = prompt_tokens
+        return analysis
+    
+    def _generate(self, prompt: str, prompt_tokens: Dict) -> str:
+        """Call the model through the breaker, recording latency, tokens and errors"""
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            # .text raises for blocked or empty responses; reading it inside the call counts that as a failure
+            text = gemini_breaker.call(
+                lambda: self.model.generate_content(prompt, request_options={'timeout': self.timeout}).text
+            )
+        except CircuitOpenError:
+            outcome = 'short_circuited'
+            raise
+        except Exception as e:
+            outcome = 'error'
+            llm_errors.inc(backend=self.backend, error_class=type(e).__name__)
+            raise GeminiCallError(str(e)) from e
+        finally:
+            llm_request_duration.observe(time.perf_counter() - started, backend=self.backend, outcome=outcome)
+        
+        llm_tokens.inc(prompt_tokens['total'], backend=self.backend, direction='prompt')
+        llm_tokens.inc(estimate_tokens(text), backend=self.backend, direction='completion')
+        return text
+    
+    def _get_local_analysis(self, resume_text: str, requirement_profile: Optional[Dict], reason: str,
+                            rescore: bool = True) -> Dict[str, Any]:
+        """Analysis without Gemini, marked (if rescore) so it is re-scored once Gemini is healthy again"""
+        if requirement_profile:
+            # Score against the job's structured requirements instead of a flat default
+            analysis = local_scorer.score(resume_text, requirement_profile)
+        else:
+            analysis = self._get_fallback_analysis()
+        analysis['analysis_notes'] = f"{LOCAL_SCORE_NOTE} {reason}" if rescore else reason
+        return analysis
     
     def _extract_resume_text(self, resume_data: Dict) -> str:
         """Extract and format resume text for analysis"""
@@ -66,58 +126,14 @@ class AIAnalyzer:
         if resume_data.get('projects'):
             text_parts.append("\nProjects:")
             for proj in resume_data['projects']:
-                text_parts.append(f"- {proj.get('name', '')}: {proj.get('description', '')}")
+                # ResumeParser returns projects as plain text lines
+                if isinstance(proj, str):
+                    text_parts.append(f"- {proj}")
+                else:
+                    text_parts.append(f"- {proj.get('name', '')}: {proj.get('description', '')}")
         
         return "\n".join(text_parts)
     
-    def _create_analysis_prompt(self, resume_text: str, job_description: str) -> str:
-        """Create a comprehensive analysis prompt for Gemini"""
-        return f"""
-        Analyze this resume against the job description and provide a detailed assessment.
-
-        JOB DESCRIPTION:
-        {job_description}
-
-        RESUME:
-        {resume_text}
-
-        Please provide your analysis in the following JSON format:
-        {{
-            "relevance_score": 85,
-            "verdict": "High",
-            "missing_skills": ["Python", "Docker"],
-            "missing_certifications": ["AWS Certified"],
-            "missing_projects": ["Machine Learning Project"],
-            "improvement_suggestions": [
-                "Add more Python projects to your portfolio",
-                "Consider getting AWS certification",
-                "Include specific metrics in your experience descriptions"
-            ],
-            "strengths": [
-                "Strong educational background",
-                "Relevant work experience"
-            ],
-            "weaknesses": [
-                "Limited project portfolio",
-                "Missing some key technical skills"
-            ]
-        }}
-
-        Scoring Guidelines:
-        - 90-100: Exceptional match, highly recommended
-        - 80-89: Strong match, good candidate
-        - 70-79: Moderate match, acceptable with improvements
-        - 60-69: Weak match, needs significant improvement
-        - Below 60: Poor match, not recommended
-
-        Verdict Guidelines:
-        - High: 80+ score
-        - Medium: 60-79 score
-        - Low: Below 60 score
-
-        Please ensure the response is valid JSON format only.
-        """
-    
     def _parse_analysis_response(self, response_text: str) -> Dict[str, Any]:
         """Parse the AI response and extract structured data"""
         try:
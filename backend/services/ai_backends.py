@@ -0,0 +1,228 @@
+"""
+AI Backends
+Interchangeable models behind AIAnalyzer, chosen with AI_BACKEND:
+
+  gemini     the Gemini API (default; needs GEMINI_API_KEY and the network)
+  record     Gemini, appending every prompt/response/latency to the AI_CASSETTE file
+  replay     answers from the AI_CASSETTE file, no network or API key
+  synthetic  deterministic, plausible JSON computed from the prompt, no network or API key
+
+AI_LATENCY injects a delay into replay/synthetic calls (milliseconds): "none", "recorded"
+(replay only, the latency captured with each response), "fixed:800", "uniform:300,1500",
+"normal:800,200" or "lognormal:700,0.5" (median, sigma). Delays are drawn from AI_SEED and the
+prompt, so a given prompt always gets the same delay. AI_REPLAY_MISS picks what replay does
+with a prompt that is not in the cassette: "cycle" (a recorded response chosen by prompt hash),
+"synthetic" or "error".
+"""
+from datetime import datetime
+from typing import Dict, Optional
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+class ModelResponse:
+    """The part of a Gemini response AIAnalyzer reads"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+class LatencyModel:
+    """Injected call latency parsed from an AI_LATENCY spec"""
+
+    def __init__(self, spec: str = 'none', seed: int = 0):
+        self.spec = spec or 'none'
+        self.seed = seed
+        self.kind, _, raw_params = self.spec.partition(':')
+        self.params = [float(value) for value in raw_params.split(',') if value.strip()]
+        expected = {'none': 0, 'recorded': 0, 'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if expected.get(self.kind) != len(self.params):
+            raise ValueError(f"Invalid AI_LATENCY '{self.spec}'")
+
+    def sample_ms(self, key: str, recorded_ms: Optional[float] = None) -> float:
+        rng = random.Random(f'{self.seed}:{key}')
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(*self.params)
+        if self.kind == 'normal':
+            return max(rng.gauss(*self.params), 0.0)
+        if self.kind == 'lognormal':
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma)
+        if self.kind == 'recorded':
+            return recorded_ms or 0.0
+        return 0.0
+
+    def wait(self, key: str, request_options: Optional[Dict], recorded_ms: Optional[float] = None) -> None:
+        """Sleep for the sampled latency, timing out like the real client would"""
+        delay = self.sample_ms(key, recorded_ms) / 1000
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Injected latency {delay:.1f}s exceeded the {timeout}s timeout")
+        if delay:
+            time.sleep(delay)
+
+class GeminiModel:
+    def __init__(self):
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+
+        # The Gemini SDK takes most of a second to import; load it only when a Gemini model is built
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel('gemini-pro')
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None):
+        return self.model.generate_content(prompt, request_options=request_options)
+
+class RecordingModel:
+    """Gemini, with every exchange appended to a JSON-lines cassette"""
+
+    def __init__(self, cassette_path: str):
+        self.inner = GeminiModel()
+        self.cassette_path = cassette_path
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None):
+        started = time.perf_counter()
+        response = self.inner.generate_content(prompt, request_options=request_options)
+        entry = {
+            'key': prompt_key(prompt),
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            'response': response.text,
+            'recorded_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            with open(self.cassette_path, 'a', encoding='utf-8') as cassette:
+                cassette.write(json.dumps(entry) + '\n')
+            self.recorded += 1
+        return response
+
+class SyntheticModel:
+    """Deterministic JSON scored from the skills the job asks for and the resume mentions"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None):
+        key = prompt_key(prompt)
+        self.latency.wait(key, request_options)
+        return ModelResponse(self.respond(prompt, key))
+
+    def respond(self, prompt: str, key: str) -> str:
+        from services.job_requirements import find_skills
+
+        job_text, _, resume_text = prompt.partition('\nRESUME:\n')
+        job_text = job_text.partition('JOB DESCRIPTION:\n')[2]
+        required = re.search(r'^Required skills: (.+)$', job_text, re.MULTILINE)
+        wanted = [skill.strip() for skill in required.group(1).split(',')] if required else find_skills(job_text)
+        have = set(find_skills(resume_text))
+        missing = [skill for skill in wanted if skill not in have]
+
+        rng = random.Random(key)
+        overlap = (len(wanted) - len(missing)) / len(wanted) if wanted else 0.5
+        score = round(min(max(40 + 55 * overlap + rng.uniform(-6, 6), 0), 100), 1)
+        verdict = 'High' if score >= 80 else 'Medium' if score >= 60 else 'Low'
+        return json.dumps({
+            'relevance_score': score,
+            'verdict': verdict,
+            'missing_skills': missing[:6],
+            'missing_certifications': [],
+            'missing_projects': [f'Project using {missing[0]}'] if missing else [],
+            'improvement_suggestions': [f'Add evidence of {skill}' for skill in missing[:3]] or ['Quantify project impact'],
+            'strengths': [f'Experience with {skill}' for skill in sorted(have)[:3]],
+            'weaknesses': [f'No {skill} experience shown' for skill in missing[:2]]
+        })
+
+class ReplayModel:
+    """Answers from a recorded cassette, with injected latency"""
+
+    def __init__(self, cassette_path: str, latency: LatencyModel, on_miss: str = 'cycle'):
+        if on_miss not in ('cycle', 'synthetic', 'error'):
+            raise ValueError(f"Invalid AI_REPLAY_MISS '{on_miss}'")
+        self.latency = latency
+        self.on_miss = on_miss
+        self.entries = {}
+        if os.path.exists(cassette_path):
+            with open(cassette_path, encoding='utf-8') as cassette:
+                for line in cassette:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry['key']] = entry
+        if not self.entries and on_miss == 'cycle':
+            raise ValueError(f"Cassette '{cassette_path}' is empty or missing")
+        self._ordered = [self.entries[key] for key in sorted(self.entries)]
+        self._synthetic = SyntheticModel(latency)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None):
+        key = prompt_key(prompt)
+        entry = self.entries.get(key)
+        with self._lock:
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None and self.on_miss == 'error':
+            raise LookupError(f"Prompt {key[:12]} is not in the cassette")
+        if entry is None and self.on_miss == 'synthetic':
+            self.latency.wait(key, request_options)
+            return ModelResponse(self._synthetic.respond(prompt, key))
+        if entry is None:
+            entry = self._ordered[int(key, 16) % len(self._ordered)]
+
+        self.latency.wait(key, request_options, entry.get('latency_ms'))
+        return ModelResponse(entry['response'])
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model():
+    """The process-wide model for the configured AI_BACKEND"""
+    backend = os.getenv('AI_BACKEND', 'gemini')
+    cassette_path = os.getenv('AI_CASSETTE', 'ai_cassette.jsonl')
+    latency_spec = os.getenv('AI_LATENCY', 'recorded' if backend == 'replay' else 'none')
+    seed = int(os.getenv('AI_SEED', 0))
+    cache_key = (backend, cassette_path, latency_spec, seed)
+
+    with _models_lock:
+        model = _models.get(cache_key)
+        if model is None:
+            if backend == 'gemini':
+                model = GeminiModel()
+            elif backend == 'record':
+                model = RecordingModel(cassette_path)
+            elif backend == 'replay':
+                model = ReplayModel(cassette_path, LatencyModel(latency_spec, seed), os.getenv('AI_REPLAY_MISS', 'cycle'))
+            elif backend == 'synthetic':
+                model = SyntheticModel(LatencyModel(latency_spec, seed))
+            else:
+                raise ValueError(f"Unknown AI_BACKEND '{backend}'")
+            _models[cache_key] = model
+        return model
+
+def get_stats() -> Dict:
+    stats = {'backend': os.getenv('AI_BACKEND', 'gemini')}
+    for model in list(_models.values()):
+        if isinstance(model, ReplayModel):
+            stats.update(replay_hits=model.hits, replay_misses=model.misses, cassette_entries=len(model.entries))
+        elif isinstance(model, RecordingModel):
+            stats.update(recorded=model.recorded, cassette=model.cassette_path)
+        elif isinstance(model, SyntheticModel):
+            stats.update(latency=model.latency.spec)
+    return stats
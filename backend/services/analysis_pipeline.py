@@ -0,0 +1,275 @@
+"""
+Analysis Pipeline
+Runs one (resume, job) analysis end to end without duplicate Gemini calls: concurrent requests
+in this process share one run (single-flight), and across processes the unique (resume_id,
+job_id) row is upserted and claimed with a conditional pending -> processing update
+"""
+from __init__ import db
+from models import Application, Resume, JobDescription, ResumeAnalysis
+from services.ai_analyzer import LOCAL_SCORE_NOTE
+from services.circuit_breaker import CLOSED, gemini_breaker
+from services.db_writer import run_write
+from services.event_bus import publish_status_change
+from services.job_requirements import requirement_profile
+from services.metrics import (analysis_runs, analysis_stage_duration, analysis_worker_busy_seconds,
+                              analysis_workers_busy)
+from services.pipeline_timings import StageTimer
+from services.prompt_builder import prompt_builder
+from services.queue_eta import queue_eta
+from services.ranking_service import ranking_service
+from services.response_cache import invalidate_application_count
+from services.single_flight import SingleFlight
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+import threading
+import time
+
+# Statuses a new request may (re)start; completed and processing analyses are left alone
+CLAIMABLE_STATUSES = ('pending', 'failed')
+
+analysis_flight = SingleFlight()
+
+_rescore_lock = threading.Lock()
+_rescore_attempts: Dict[int, int] = {}  # Analysis id -> Gemini re-scores tried in this process
+_counters_lock = threading.Lock()
+_counters = {'rows_created': 0, 'upsert_conflicts': 0, 'claims_won': 0, 'claims_lost': 0}
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+def analysis_key(resume_id: int, job_id: int) -> str:
+    return f'analysis:{resume_id}:{job_id}'
+
+def _upsert_pending_analysis(resume_id: int, job_id: int, priority: str) -> Tuple[int, bool]:
+    """INSERT ... ON CONFLICT DO NOTHING on (resume_id, job_id); returns (analysis id, created)"""
+    table = ResumeAnalysis.__table__
+    # Queue placement happens in the same write: a later add_to_queue would reset a claimed row to pending
+    last_position = db.session.query(db.func.max(ResumeAnalysis.queue_position))\
+        .filter(ResumeAnalysis.job_id == job_id)\
+        .scalar() or 0
+    values = {'resume_id': resume_id, 'job_id': job_id, 'analysis_status': 'pending',
+              'is_in_queue': True, 'queue_position': last_position + 1, 'priority': priority}
+    dialect = db.session.get_bind(mapper=ResumeAnalysis).dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).values(**values).on_conflict_do_nothing(index_elements=['resume_id', 'job_id'])
+        created = db.session.execute(statement).rowcount == 1
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**values))
+            created = True
+        except IntegrityError:
+            created = False
+
+    analysis_id = db.session.query(ResumeAnalysis.id)\
+        .filter(ResumeAnalysis.resume_id == resume_id, ResumeAnalysis.job_id == job_id)\
+        .scalar()
+    return analysis_id, created
+
+def _analysis_recorded(analysis_id: int, job_id: int, created: bool) -> None:
+    _count('rows_created' if created else 'upsert_conflicts')
+    if created:
+        # Core inserts bypass the session hooks that keep application_count fresh
+        invalidate_application_count(job_id)
+        publish_status_change(analysis_id, None)
+
+def ensure_analysis(resume_id: int, job_id: int, priority: str = 'interactive') -> int:
+    """Return the pair's analysis id, creating and queueing a pending row (in this scheduling class) if there is none"""
+    analysis_id, created = run_write(lambda: _upsert_pending_analysis(resume_id, job_id, priority))
+    _analysis_recorded(analysis_id, job_id, created)
+    return analysis_id
+
+def record_application(user_id: int, resume_id: int, job_id: int) -> Tuple[int, int]:
+    """Insert an application and its pending analysis in one transaction; returns (application id, analysis id)"""
+    def write():
+        application = Application(user_id=user_id, job_id=job_id, resume_id=resume_id)
+        db.session.add(application)
+        db.session.flush()
+        return (application.id,) + _upsert_pending_analysis(resume_id, job_id, 'interactive')
+    application_id, analysis_id, created = run_write(write)
+    _analysis_recorded(analysis_id, job_id, created)
+    return application_id, analysis_id
+
+def _claim_analysis(analysis_id: int) -> Tuple[bool, str]:
+    """Atomically move a claimable analysis to processing; only one caller anywhere wins"""
+    previous_status = db.session.query(ResumeAnalysis.analysis_status)\
+        .filter(ResumeAnalysis.id == analysis_id)\
+        .scalar()
+    result = db.session.execute(
+        ResumeAnalysis.__table__.update()
+        .where(ResumeAnalysis.__table__.c.id == analysis_id)
+        .where(ResumeAnalysis.__table__.c.analysis_status.in_(CLAIMABLE_STATUSES))
+        .values(analysis_status='processing', analysis_started_at=datetime.utcnow(), analysis_notes=None)
+    )
+    return result.rowcount == 1, previous_status
+
+def run_analysis(resume_id: int, job_id: int) -> Dict:
+    """Create/claim the pair's analysis and, if this caller won the claim, run it to completion"""
+    analysis_id = ensure_analysis(resume_id, job_id)
+    claimed, previous_status = run_write(lambda: _claim_analysis(analysis_id))
+    if not claimed:
+        # Already processing in another process/thread, or already completed
+        _count('claims_lost')
+        return {'analysis_id': analysis_id, 'ran': False, 'error': None}
+
+    _count('claims_won')
+    publish_status_change(analysis_id, previous_status)
+    queue_eta.observe_concurrency(ResumeAnalysis.query.filter(ResumeAnalysis.analysis_status == 'processing').count())
+
+    started = time.perf_counter()
+    analysis_workers_busy.inc()
+    try:
+        return _run_claimed(analysis_id, resume_id, job_id)
+    finally:
+        analysis_workers_busy.dec()
+        analysis_worker_busy_seconds.inc(time.perf_counter() - started)
+
+def _observe_run(timings: Dict[str, int], outcome: str) -> None:
+    """Export one finished run's outcome and stage timings as metrics"""
+    analysis_runs.inc(outcome=outcome)
+    for stage, ms in timings.items():
+        analysis_stage_duration.observe(ms / 1000, stage=stage)
+    if outcome == 'completed':
+        queue_eta.observe_service(timings['total'] / 1000)
+
+def _run_claimed(analysis_id: int, resume_id: int, job_id: int) -> Dict:
+    """Run an analysis this caller has claimed, marking it failed on error"""
+    from services.resume_parser import ResumeParser
+    from services.ai_analyzer import AIAnalyzer
+
+    timer = StageTimer()
+    try:
+        resume = Resume.query.get(resume_id)
+        job = JobDescription.query.get(job_id)
+
+        # Get parsed resume data
+        with timer.stage('resume_parse'):
+            parsed_data = resume.get_parsed_data()
+            if not parsed_data:
+                print("No parsed data found, re-parsing resume...")
+                parser = ResumeParser()
+                parsed_data = parser.parse_resume(resume.file_path, resume.file_type.lower())
+                run_write(lambda: Resume.query.get(resume_id).set_parsed_data(parsed_data))
+
+        # JD PDF extraction and requirement extraction happen here when the job's cached copies are stale
+        with timer.stage('jd'):
+            combined_job_description = prompt_builder.job_section(job)
+            profile = requirement_profile(job)
+        db.session.rollback()  # End the read transaction before the slow AI call
+
+        print(f"Starting AI analysis for resume {resume_id} and job {job_id}...")
+        analysis_result = AIAnalyzer().perform_comprehensive_analysis(parsed_data, combined_job_description, profile,
+                                                                      timer=timer)
+        print(f"AI analysis completed with score: {analysis_result.get('relevance_score', 'N/A')}")
+
+        run_write(lambda: ResumeAnalysis.query.get(analysis_id).apply_result(analysis_result))
+
+        # RankingService commits itself, so this runs as an exclusive write
+        def update_ranking():
+            with timer.stage('ranking'):
+                try:
+                    ranking_service.add_to_ranking(ResumeAnalysis.query.get(analysis_id))
+                    ranking_service.promote_high_score_resume(job_id, min_score=80.0)
+                except Exception as ranking_error:
+                    # Continue anyway, don't fail the entire analysis
+                    print(f"Error updating rankings: {ranking_error}")
+                    db.session.rollback()
+            # Committed by run_write after the ranking's own commits
+            timings = timer.finish()
+            ResumeAnalysis.query.get(analysis_id).set_stage_timings(timings)
+            _observe_run(timings, 'completed')
+        run_write(update_ranking, exclusive=True)
+
+        return {'analysis_id': analysis_id, 'ran': True, 'error': None}
+
+    except Exception as e:
+        print(f"Error in analysis for resume {resume_id} and job {job_id}: {e}")
+        db.session.rollback()
+
+        def mark_failed():
+            analysis = ResumeAnalysis.query.get(analysis_id)
+            analysis.analysis_status = 'failed'
+            analysis.analysis_notes = str(e)
+            timings = timer.finish()
+            analysis.set_stage_timings(timings)
+            _observe_run(timings, 'failed')
+        run_write(mark_failed)
+
+        return {'analysis_id': analysis_id, 'ran': True, 'error': str(e)}
+
+def analyze(resume_id: int, job_id: int) -> Tuple[Dict, bool]:
+    """run_analysis, shared with any identical call already in flight; returns (outcome, coalesced)"""
+    return analysis_flight.do(analysis_key(resume_id, job_id), lambda: run_analysis(resume_id, job_id))
+
+def _requeue_local_scores(batch_size: int, skip: Set[int]) -> List[Tuple[int, int, int]]:
+    """Put a batch of analyses scored without Gemini (other than `skip`) back in their job's queue"""
+    query = ResumeAnalysis.query\
+        .filter(ResumeAnalysis.analysis_status == 'completed')\
+        .filter(ResumeAnalysis.analysis_notes.like(f'{LOCAL_SCORE_NOTE}%'))
+    if skip:
+        query = query.filter(ResumeAnalysis.id.notin_(list(skip)))
+    analyses = query.order_by(ResumeAnalysis.id.asc()).limit(batch_size).all()
+    batch = [(analysis.id, analysis.resume_id, analysis.job_id) for analysis in analyses]
+
+    # Same reset as the admin reprocess endpoint; RankingService commits itself
+    for analysis in analyses:
+        analysis.analysis_started_at = None
+        analysis.analysis_completed_at = None
+        ranking_service.add_to_queue(analysis.id, analysis.job_id)
+    for job_id in {job_id for _, _, job_id in batch}:
+        ranking_service.update_ranking(job_id)
+    return batch
+
+def rescore_local_analyses(app) -> int:
+    """Re-run locally scored analyses through Gemini, a batch at a time while the breaker stays closed.
+    Each analysis is tried once per run and at most GEMINI_RESCORE_MAX_ATTEMPTS times per process."""
+    if not _rescore_lock.acquire(blocking=False):
+        return 0
+
+    rescored = 0
+    try:
+        with app.app_context():
+            batch_size = app.config.get('GEMINI_RESCORE_BATCH_SIZE', 20)
+            max_attempts = app.config.get('GEMINI_RESCORE_MAX_ATTEMPTS', 3)
+            # Analyses at the cap are skipped; the rest are tried once per run, so ones that fall back again end it
+            tried = {analysis_id for analysis_id, attempts in _rescore_attempts.items() if attempts >= max_attempts}
+            while gemini_breaker.state == CLOSED:
+                batch = run_write(lambda: _requeue_local_scores(batch_size, tried), exclusive=True)
+                if not batch:
+                    break
+                # A re-opened breaker fails these fast back to local scores, so none are left pending
+                for analysis_id, resume_id, job_id in batch:
+                    tried.add(analysis_id)
+                    _rescore_attempts[analysis_id] = _rescore_attempts.get(analysis_id, 0) + 1
+                    analyze(resume_id, job_id)
+                rescored += len(batch)
+                db.session.remove()
+    finally:
+        _rescore_lock.release()
+
+    print(f"Re-scored {rescored} locally scored analyses with Gemini")
+    return rescored
+
+def init_rescore_on_close(app) -> None:
+    """Re-score analyses that fell back to local scoring whenever the Gemini breaker closes"""
+    if 'gemini_rescore' in app.extensions:
+        return
+
+    def on_state_change(previous_state, state):
+        if state == CLOSED:
+            threading.Thread(target=rescore_local_analyses, args=(app,), daemon=True).start()
+
+    gemini_breaker.add_listener(on_state_change)
+    app.extensions['gemini_rescore'] = on_state_change
+
+def get_stats() -> Dict:
+    with _counters_lock:
+        counters = dict(_counters)
+    return {'single_flight': analysis_flight.stats(), **counters}
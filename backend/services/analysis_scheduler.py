@@ -0,0 +1,173 @@
+"""
+Analysis Scheduler
+Chooses the pending analysis a free worker runs next. Each analysis has a priority class
+(interactive, bulk or backfill), and each (class, job) pair is a flow. Classes share the workers
+by SCHEDULER_WEIGHTS, and the jobs within a class share that class equally. Both levels use
+start-time fair queuing, so a bulk reprocess or a viral job gets its share and no more. Within a
+flow, analyses run in queue_position order. A backlogged class that has not been served for
+SCHEDULER_AGING_SECONDS goes next regardless of its weight (anti-starvation aging).
+
+SchedulingPolicy holds only the fairness state; benchmarks/scheduler_simulation.py drives it
+directly. Each process keeps its own state, so a process is fair over the analyses it picks.
+"""
+from __init__ import db
+from collections import Counter, defaultdict
+from models import PRIORITY_CLASSES, ResumeAnalysis
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+import threading
+import time
+
+DEFAULT_WEIGHTS = 'interactive:16,bulk:4,backfill:1'
+
+Flow = Tuple[str, int]  # (priority class, job id)
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """'interactive:16,bulk:4,backfill:1' -> {'interactive': 16.0, ...}; every class needs a positive weight"""
+    weights = {}
+    for part in spec.split(','):
+        priority, _, weight = part.strip().partition(':')
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class in SCHEDULER_WEIGHTS: {priority!r}")
+        weights[priority] = float(weight)
+        if weights[priority] <= 0:
+            raise ValueError(f"SCHEDULER_WEIGHTS needs a positive weight for {priority}")
+    missing = set(PRIORITY_CLASSES) - set(weights)
+    if missing:
+        raise ValueError(f"SCHEDULER_WEIGHTS has no weight for {', '.join(sorted(missing))}")
+    return weights
+
+class StartTimeFairQueue:
+    """Start-time fair queuing: serve the backlogged flow with the smallest start tag"""
+
+    def __init__(self):
+        self.virtual_time = 0.0
+        self.finish: Dict[Hashable, float] = {}
+
+    def start_tag(self, flow: Hashable) -> float:
+        # A flow that was idle restarts at the virtual time instead of saving up credit
+        return max(self.virtual_time, self.finish.get(flow, 0.0))
+
+    def choose(self, weights: Dict[Hashable, float], tiebreak: Dict) -> Hashable:
+        """Pick among backlogged flows (flow -> weight); ties go to the smaller tiebreak value"""
+        flow = min(weights, key=lambda candidate: (self.start_tag(candidate), tiebreak[candidate]))
+        self.served(flow, weights[flow])
+        return flow
+
+    def served(self, flow: Hashable, weight: float) -> None:
+        start = self.start_tag(flow)
+        self.virtual_time = start
+        self.finish[flow] = start + 1.0 / weight
+        if len(self.finish) > 4096:
+            # Tags behind the virtual time no longer matter
+            self.finish = {key: tag for key, tag in self.finish.items() if tag > self.virtual_time}
+
+class SchedulingPolicy:
+    def __init__(self, weights: Dict[str, float], aging_seconds: float):
+        self.weights = weights
+        self.aging_seconds = aging_seconds
+        self.classes = StartTimeFairQueue()
+        self.jobs = defaultdict(StartTimeFairQueue)
+        self.waiting_since: Dict[str, float] = {}  # Backlogged class -> when it was last served or became backlogged
+        self.served = Counter()
+        self.aged = Counter()
+
+    def choose(self, oldest: Dict[Flow, object], now: float) -> Optional[Flow]:
+        """The flow to serve next, given each backlogged flow's oldest pending time"""
+        if not oldest:
+            self.waiting_since.clear()
+            return None
+
+        backlogged = {priority for priority, _ in oldest}
+        for priority in list(self.waiting_since):
+            if priority not in backlogged:
+                del self.waiting_since[priority]
+        for priority in backlogged:
+            self.waiting_since.setdefault(priority, now)
+
+        starved = [priority for priority in backlogged if now - self.waiting_since[priority] >= self.aging_seconds]
+        if starved:
+            priority = min(starved, key=self.waiting_since.get)
+            self.classes.served(priority, self.weight(priority))
+            self.aged[priority] += 1
+        else:
+            class_oldest = {}
+            for (flow_priority, _), created in oldest.items():
+                if flow_priority not in class_oldest or created < class_oldest[flow_priority]:
+                    class_oldest[flow_priority] = created
+            priority = self.classes.choose({p: self.weight(p) for p in backlogged}, class_oldest)
+
+        jobs = {job_id: created for (flow_priority, job_id), created in oldest.items() if flow_priority == priority}
+        job_id = self.jobs[priority].choose({job_id: 1.0 for job_id in jobs}, jobs)
+        self.waiting_since[priority] = now
+        self.served[priority] += 1
+        return priority, job_id
+
+    def weight(self, priority: str) -> float:
+        # Rows written with a class missing from the configuration get the smallest share
+        return self.weights.get(priority, min(self.weights.values()))
+
+    def share(self, flow: Flow, backlogged: Iterable[Flow]) -> float:
+        """Long-run share of the workers a flow gets while these flows (including it) are backlogged"""
+        flows = set(backlogged) | {flow}
+        classes = {priority for priority, _ in flows}
+        class_share = self.weight(flow[0]) / sum(self.weight(priority) for priority in classes)
+        return class_share / sum(1 for priority, _ in flows if priority == flow[0])
+
+class AnalysisScheduler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.policy = SchedulingPolicy(parse_weights(DEFAULT_WEIGHTS), 300.0)
+
+    def init_app(self, app) -> None:
+        self.policy = SchedulingPolicy(parse_weights(app.config.get('SCHEDULER_WEIGHTS', DEFAULT_WEIGHTS)),
+                                       app.config.get('SCHEDULER_AGING_SECONDS', 300.0))
+
+    def backlog(self, exclude: Iterable[int] = (), job_id: Optional[int] = None) -> Dict[Flow, Dict]:
+        """Pending analyses per (priority, job): count and oldest created_at (one grouped query)"""
+        query = db.session.query(ResumeAnalysis.priority, ResumeAnalysis.job_id,
+                                 db.func.count(ResumeAnalysis.id), db.func.min(ResumeAnalysis.created_at))\
+            .filter(ResumeAnalysis.analysis_status == 'pending')
+        exclude = list(exclude)
+        if exclude:
+            query = query.filter(ResumeAnalysis.id.notin_(exclude))
+        if job_id is not None:
+            query = query.filter(ResumeAnalysis.job_id == job_id)
+        rows = query.group_by(ResumeAnalysis.priority, ResumeAnalysis.job_id).all()
+        return {(priority, flow_job_id): {'count': count, 'oldest': oldest}
+                for priority, flow_job_id, count, oldest in rows}
+
+    def pick(self, exclude: Iterable[int] = (), job_id: Optional[int] = None) -> Optional[int]:
+        """Id of the pending analysis to run next (optionally within one job); two queries"""
+        exclude = list(exclude)
+        backlog = self.backlog(exclude, job_id)
+        with self.lock:
+            flow = self.policy.choose({flow: stats['oldest'] for flow, stats in backlog.items()}, time.monotonic())
+        if flow is None:
+            return None
+
+        query = db.session.query(ResumeAnalysis.id)\
+            .filter(ResumeAnalysis.analysis_status == 'pending')\
+            .filter(ResumeAnalysis.priority == flow[0])\
+            .filter(ResumeAnalysis.job_id == flow[1])
+        if exclude:
+            query = query.filter(ResumeAnalysis.id.notin_(exclude))
+        row = query.order_by(ResumeAnalysis.queue_position.asc(), ResumeAnalysis.id.asc()).first()
+        return row.id if row is not None else None
+
+    def share(self, flow: Flow, backlogged: Iterable[Flow]) -> float:
+        with self.lock:
+            return self.policy.share(flow, backlogged)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            now = time.monotonic()
+            return {
+                'weights': dict(self.policy.weights),
+                'aging_seconds': self.policy.aging_seconds,
+                'served': dict(self.policy.served),
+                'aged': dict(self.policy.aged),
+                'waiting_seconds': {priority: round(now - since, 1)
+                                    for priority, since in self.policy.waiting_since.items()}
+            }
+
+analysis_scheduler = AnalysisScheduler()
@@ -0,0 +1,273 @@
+"""
+Backfill Runner
+Analyzes the backlog of pending applications as a resumable background job instead of inside one
+HTTP request. A job walks the applications in id order, up to the newest id at the time it was
+created, in chunks of chunk_size. Each chunk's analyses are queued in the backfill priority class
+and run in parallel by the analysis workers, behind interactive and bulk work. Once none of them
+is pending or processing, the job's cursor and done/failed counts are committed as a checkpoint,
+so a crash loses at most the chunk in progress. A runner holds its job through a heartbeat lease;
+any process can resume a failed job, or a running one whose heartbeat is older than
+BACKFILL_LEASE_SECONDS.
+"""
+from __init__ import db
+from models import Application, BackfillJob, ResumeAnalysis
+from services.admission import analysis_dispatcher
+from services.analysis_pipeline import ensure_analysis
+from services.db_writer import run_write
+from services.metrics import Counter, metrics
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from typing import Dict, List, Optional, Tuple
+import os
+import secrets
+import socket
+import threading
+import time
+import traceback
+
+SCOPES = ('missing', 'all')
+FINISHED_STATUSES = ('completed', 'cancelled')
+# Statuses a runner may take a job over from; a running job only once its lease has expired
+RESUMABLE_STATUSES = ('queued', 'failed')
+
+backfill_analyses = Counter(metrics, 'backfill_analyses', 'Analyses finished by backfill jobs', ['outcome'])
+
+def _scope_query(scope: str, max_application_id: int):
+    """(id, resume_id, job_id) of the pending applications a job of this scope covers"""
+    query = db.session.query(Application.id, Application.resume_id, Application.job_id)\
+        .filter(Application.application_status == 'pending')\
+        .filter(Application.id <= max_application_id)
+    if scope == 'missing':
+        query = query.outerjoin(ResumeAnalysis, and_(ResumeAnalysis.resume_id == Application.resume_id,
+                                                    ResumeAnalysis.job_id == Application.job_id))\
+            .filter(or_(ResumeAnalysis.id.is_(None), ResumeAnalysis.analysis_status != 'completed'))
+    return query
+
+def _queue_chunk(chunk, scope: str) -> List[int]:
+    """Create or re-queue the chunk's analyses in the backfill class; returns their ids"""
+    from services.ranking_service import ranking_service
+
+    analysis_ids = [ensure_analysis(resume_id, job_id, priority='backfill') for _, resume_id, job_id in chunk]
+    rerun = ('failed', 'completed') if scope == 'all' else ('failed',)
+
+    def requeue():
+        table = ResumeAnalysis.__table__
+        return db.session.execute(
+            table.update()
+            .where(table.c.id.in_(analysis_ids))
+            .where(table.c.analysis_status.in_(rerun))
+            .values(analysis_status='pending', priority='backfill', is_in_queue=True, analysis_started_at=None,
+                    analysis_completed_at=None, analysis_notes=None)
+        ).rowcount
+    if run_write(requeue) and scope == 'all':
+        # Re-run results leave the leaderboards until they are in again (application counts are unchanged)
+        for job_id in {job_id for _, _, job_id in chunk}:
+            run_write(lambda: ranking_service.update_ranking(job_id), exclusive=True)
+    return analysis_ids
+
+class BackfillRunner:
+    def __init__(self):
+        self.chunk_size = 50
+        self.lease_seconds = 120
+        self.poll_seconds = 2.0
+        self.lock = threading.Lock()
+        self.progress: Dict[int, Dict] = {}  # Chunk in progress of the jobs this process runs
+
+    def init_app(self, app) -> None:
+        self.chunk_size = app.config.get('BACKFILL_CHUNK_SIZE', 50)
+        self.lease_seconds = app.config.get('BACKFILL_LEASE_SECONDS', 120)
+        self.poll_seconds = app.config.get('BACKFILL_POLL_SECONDS', 2.0)
+
+    def create(self, created_by: Optional[int], scope: str = 'missing', chunk_size: Optional[int] = None) -> int:
+        """Record a new job over the applications pending right now; returns its id"""
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+        max_application_id = db.session.query(db.func.max(Application.id)).scalar() or 0
+        total = _scope_query(scope, max_application_id).count()
+
+        def insert():
+            job = BackfillJob(scope=scope, chunk_size=chunk_size or self.chunk_size,
+                              max_application_id=max_application_id, total=total, created_by=created_by)
+            db.session.add(job)
+            db.session.flush()
+            return job.id
+        return run_write(insert)
+
+    def start(self, app, job_id: int) -> bool:
+        """Take the job's lease and run it on a background thread; False if it cannot be (re)started"""
+        owner = f'{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}'
+        if not self._claim(job_id, owner):
+            return False
+        threading.Thread(target=self._run, args=(app, job_id, owner), name=f'backfill-{job_id}', daemon=True).start()
+        return True
+
+    def run(self, app, job_id: int) -> bool:
+        """Take the job's lease and run it in the calling thread (command line use)"""
+        owner = f'{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}'
+        if not self._claim(job_id, owner):
+            return False
+        self._run(app, job_id, owner)
+        return True
+
+    def cancel(self, job_id: int) -> bool:
+        """Stop the job at its runner's next poll; analyses already queued still run"""
+        table = BackfillJob.__table__
+        return run_write(lambda: db.session.execute(
+            table.update()
+            .where(table.c.id == job_id)
+            .where(table.c.status.notin_(FINISHED_STATUSES))
+            .values(status='cancelled', finished_at=datetime.utcnow())
+        ).rowcount) == 1
+
+    def _claim(self, job_id: int, owner: str) -> bool:
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=self.lease_seconds)
+        table = BackfillJob.__table__
+        return run_write(lambda: db.session.execute(
+            table.update()
+            .where(table.c.id == job_id)
+            .where(or_(table.c.status.in_(RESUMABLE_STATUSES),
+                       and_(table.c.status == 'running',
+                            or_(table.c.heartbeat_at.is_(None), table.c.heartbeat_at < expired))))
+            .values(status='running', owner=owner, heartbeat_at=now, finished_at=None,
+                    started_at=db.func.coalesce(table.c.started_at, now))
+        ).rowcount) == 1
+
+    def _heartbeat(self, job_id: int, owner: str, **values) -> bool:
+        """Renew the lease (and apply `values`); False once the job was cancelled or taken over"""
+        table = BackfillJob.__table__
+        return run_write(lambda: db.session.execute(
+            table.update()
+            .where(table.c.id == job_id)
+            .where(table.c.owner == owner)
+            .where(table.c.status == 'running')
+            .values(heartbeat_at=datetime.utcnow(), **values)
+        ).rowcount) == 1
+
+    def _finish(self, job_id: int, owner: str, status: str, error: Optional[str] = None) -> None:
+        table = BackfillJob.__table__
+        values = {'status': status, 'finished_at': datetime.utcnow()}
+        if status == 'completed':
+            # Applications the job never got to were analyzed some other way meanwhile
+            values['skipped'] = table.c.total - table.c.done - table.c.failed
+        if error:
+            values['last_error'] = error
+        run_write(lambda: db.session.execute(
+            table.update()
+            .where(table.c.id == job_id)
+            .where(table.c.owner == owner)
+            .where(table.c.status == 'running')
+            .values(**values)
+        ))
+
+    def _wait_for_chunk(self, app, job_id: int, owner: str,
+                        analysis_ids: List[int]) -> Optional[Tuple[int, int, Optional[str]]]:
+        """Poll until none of the chunk's analyses is queued or running; returns (completed, failed,
+        an error) or None if the job was cancelled or taken over meanwhile"""
+        while True:
+            counts = dict(db.session.query(ResumeAnalysis.analysis_status, db.func.count(ResumeAnalysis.id))
+                          .filter(ResumeAnalysis.id.in_(analysis_ids))
+                          .group_by(ResumeAnalysis.analysis_status)
+                          .all())
+            with self.lock:
+                self.progress[job_id] = dict(counts, size=len(analysis_ids))
+
+            if not counts.get('pending') and not counts.get('processing'):
+                error = None
+                if counts.get('failed'):
+                    error = db.session.query(ResumeAnalysis.analysis_notes)\
+                        .filter(ResumeAnalysis.id.in_(analysis_ids))\
+                        .filter(ResumeAnalysis.analysis_status == 'failed')\
+                        .limit(1)\
+                        .scalar()
+                db.session.rollback()
+                return counts.get('completed', 0), counts.get('failed', 0), error
+            db.session.rollback()
+
+            if counts.get('processing'):
+                analysis_dispatcher.reclaim_stale(analysis_ids)
+            if counts.get('pending') and not analysis_dispatcher.stats()['threads']:
+                analysis_dispatcher.submit(app)
+            time.sleep(self.poll_seconds)
+            if not self._heartbeat(job_id, owner):
+                return None
+
+    def _run(self, app, job_id: int, owner: str) -> None:
+        with app.app_context():
+            try:
+                job = db.session.get(BackfillJob, job_id)
+                scope, chunk_size, max_application_id, cursor = job.scope, job.chunk_size, job.max_application_id, job.cursor
+                db.session.rollback()
+                print(f"Backfill {job_id}: {scope} applications after #{cursor}, {chunk_size} per chunk")
+
+                while True:
+                    chunk = _scope_query(scope, max_application_id)\
+                        .filter(Application.id > cursor)\
+                        .order_by(Application.id.asc())\
+                        .limit(chunk_size)\
+                        .all()
+                    db.session.rollback()
+                    if not chunk:
+                        self._finish(job_id, owner, 'completed')
+                        print(f"Backfill {job_id} completed")
+                        break
+
+                    analysis_ids = _queue_chunk(chunk, scope)
+                    # Wake as many workers as the chunk can use; the pool caps it at its capacity
+                    for _ in analysis_ids:
+                        if not analysis_dispatcher.submit(app):
+                            break
+
+                    outcome = self._wait_for_chunk(app, job_id, owner, analysis_ids)
+                    if outcome is None:
+                        print(f"Backfill {job_id} cancelled or taken over by another runner")
+                        break
+                    completed, failed, error = outcome
+                    backfill_analyses.inc(completed, outcome='completed')
+                    backfill_analyses.inc(failed, outcome='failed')
+
+                    cursor = chunk[-1].id
+                    table = BackfillJob.__table__
+                    values = {'cursor': cursor, 'done': table.c.done + completed, 'failed': table.c.failed + failed,
+                              'chunks': table.c.chunks + 1}
+                    if error:
+                        values['last_error'] = error
+                    if not self._heartbeat(job_id, owner, **values):
+                        break
+            except Exception as e:
+                print(f"Backfill {job_id} failed: {e}")
+                traceback.print_exc()
+                db.session.rollback()
+                self._finish(job_id, owner, 'failed', str(e))
+            finally:
+                with self.lock:
+                    self.progress.pop(job_id, None)
+                db.session.remove()
+
+    def describe(self, job: BackfillJob) -> Dict:
+        """The job's persisted progress, plus its live chunk and an ETA when this process runs it"""
+        result = job.to_dict()
+        result['interrupted'] = job.status == 'running' and (
+            job.heartbeat_at is None or
+            datetime.utcnow() - job.heartbeat_at > timedelta(seconds=self.lease_seconds))
+        result['resumable'] = job.status in RESUMABLE_STATUSES or result['interrupted']
+
+        processed = job.done + job.failed
+        if job.status == 'running' and job.started_at and processed:
+            rate = processed / max((datetime.utcnow() - job.started_at).total_seconds(), 1.0)
+            result['eta_seconds'] = round(result['remaining'] / rate, 1)
+        with self.lock:
+            chunk = self.progress.get(job.id)
+        if chunk is not None:
+            result['chunk'] = dict(chunk)
+        return result
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        job = db.session.get(BackfillJob, job_id)
+        return self.describe(job) if job else None
+
+    def list(self, limit: int = 20) -> List[Dict]:
+        jobs = BackfillJob.query.order_by(BackfillJob.id.desc()).limit(limit).all()
+        return [self.describe(job) for job in jobs]
+
+backfill_runner = BackfillRunner()
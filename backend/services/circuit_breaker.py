@@ -0,0 +1,178 @@
+"""
+Circuit Breaker Service
+Closed / open / half-open breaker driven by the error rate and slow-call rate over a rolling
+window; while open, calls fail immediately with CircuitOpenError instead of waiting on a
+dependency that is down
+"""
+from collections import deque
+from typing import Any, Callable, Dict, List
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Numeric state for metrics/dashboards
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of making the call while the breaker is open"""
+
+class CircuitBreaker:
+    def __init__(self, name: str, window_seconds: float = 60, min_calls: int = 10,
+                 failure_rate_threshold: float = 0.5, slow_call_seconds: float = 15,
+                 slow_rate_threshold: float = 0.5, open_seconds: float = 30, half_open_calls: int = 2):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.listeners: List[Callable[[str, str], None]] = []
+
+        self._lock = threading.Lock()
+        self._calls = deque()  # (finished_at, failed, slow)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.short_circuited = 0
+        self.transitions = 0
+        self._configured = False
+
+    def init_app(self, app, prefix: str) -> None:
+        # create_app may run more than once per process; keep the current state and window
+        if self._configured:
+            return
+        self._configured = True
+        config = app.config
+        self.window_seconds = config.get(f'{prefix}_WINDOW_SECONDS', self.window_seconds)
+        self.min_calls = config.get(f'{prefix}_MIN_CALLS', self.min_calls)
+        self.failure_rate_threshold = config.get(f'{prefix}_FAILURE_RATE', self.failure_rate_threshold)
+        self.slow_call_seconds = config.get(f'{prefix}_SLOW_CALL_SECONDS', self.slow_call_seconds)
+        self.slow_rate_threshold = config.get(f'{prefix}_SLOW_RATE', self.slow_rate_threshold)
+        self.open_seconds = config.get(f'{prefix}_OPEN_SECONDS', self.open_seconds)
+        self.half_open_calls = config.get(f'{prefix}_HALF_OPEN_CALLS', self.half_open_calls)
+
+    def add_listener(self, listener: Callable[[str, str], None]) -> None:
+        """Call listener(previous_state, state) after every state change"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())[0]
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run fn through the breaker; raises CircuitOpenError without running it while open"""
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self._after_call(failed=True, duration=time.monotonic() - started)
+            raise
+        self._after_call(failed=False, duration=time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            state, _ = self._current_state(now)
+            self._trim(now)
+            calls = len(self._calls)
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+            return {
+                'name': self.name,
+                'state': state,
+                'state_code': STATE_CODES[state],
+                'window_calls': calls,
+                'failure_rate': round(failures / calls, 4) if calls else 0.0,
+                'slow_rate': round(slow / calls, 4) if calls else 0.0,
+                'open_for_seconds': round(now - self._opened_at, 1) if state != CLOSED and self._opened_at else 0.0,
+                'short_circuited': self.short_circuited,
+                'transitions': self.transitions
+            }
+
+    def _current_state(self, now: float):
+        """State as of now (an open breaker becomes half-open once open_seconds have passed)"""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            return HALF_OPEN, True
+        return self._state, False
+
+    def _before_call(self) -> None:
+        with self._lock:
+            state, expired = self._current_state(time.monotonic())
+            changed = self._transition(HALF_OPEN) if expired else None
+
+            allowed = state == CLOSED or (state == HALF_OPEN and self._probes_started < self.half_open_calls)
+            if state == HALF_OPEN and allowed:
+                self._probes_started += 1
+            if not allowed:
+                self.short_circuited += 1
+
+        self._notify(changed)
+        if not allowed:
+            raise CircuitOpenError(f"{self.name} circuit breaker is {state}")
+
+    def _after_call(self, failed: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            changed = None
+
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    changed = self._transition(OPEN)
+                else:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_calls:
+                        changed = self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._calls.append((now, failed, slow))
+                self._trim(now)
+                calls = len(self._calls)
+                if calls >= self.min_calls:
+                    failure_rate = sum(1 for _, was_failed, _ in self._calls if was_failed) / calls
+                    slow_rate = sum(1 for _, _, was_slow in self._calls if was_slow) / calls
+                    if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_rate_threshold:
+                        changed = self._transition(OPEN)
+            # Calls that started before the breaker opened and finish afterwards are ignored
+
+        self._notify(changed)
+
+    def _transition(self, state: str):
+        previous_state = self._state
+        self._state = state
+        self.transitions += 1
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            # Start the rolling window over so the outage does not re-open the breaker
+            self._calls.clear()
+            self._opened_at = None
+        print(f"Circuit breaker '{self.name}': {previous_state} -> {state}")
+        return previous_state, state
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _notify(self, changed) -> None:
+        if not changed:
+            return
+        for listener in list(self.listeners):
+            try:
+                listener(*changed)
+            except Exception as e:
+                print(f"Error in circuit breaker listener: {e}")
+
+# Breaker around the Gemini API, shared by every AIAnalyzer in the process
+gemini_breaker = CircuitBreaker('gemini')
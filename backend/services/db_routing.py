@@ -0,0 +1,124 @@
+"""
+Database Routing Service
+Connection pool profiles per process role, and read/write routing that sends opted-in GET
+endpoints to a read replica while writes (and readers that just wrote) stay on the primary
+"""
+from flask import request
+from flask_sqlalchemy.session import Session
+from contextlib import contextmanager
+from functools import wraps
+from sqlalchemy.sql.dml import UpdateBase
+import time
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_COOKIE = 'db_primary_until'
+
+def normalize_database_url(url: str) -> str:
+    # Heroku/Render style URLs use the scheme SQLAlchemy dropped
+    if url and url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+def _pool_options(app, url: str) -> dict:
+    """Engine options for url from the DB_ROLE pool profile plus DB_* overrides"""
+    profiles = app.config.get('DB_POOL_PROFILES', {})
+    role = app.config.get('DB_ROLE', 'web')
+    if role not in profiles:
+        raise ValueError(f"Unsupported DB_ROLE: {role}")
+
+    profile = dict(profiles[role])
+    for key, setting in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW'),
+                         ('pool_timeout', 'DB_POOL_TIMEOUT'), ('pool_recycle', 'DB_POOL_RECYCLE'),
+                         ('statement_timeout_ms', 'DB_STATEMENT_TIMEOUT_MS')):
+        if app.config.get(setting) is not None:
+            profile[key] = app.config[setting]
+
+    statement_timeout_ms = profile.pop('statement_timeout_ms', None)
+    options = {'pool_pre_ping': app.config.get('DB_POOL_PRE_PING', True)}
+
+    # In-memory SQLite uses a single static connection; pool sizing does not apply
+    if url.startswith('sqlite') and (url in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in url):
+        return options
+
+    options.update(profile)
+    if statement_timeout_ms and url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout_ms)}'}
+    return options
+
+def configure_engine_options(app) -> None:
+    """Apply pool profiles to the primary and replica engines (call before db.init_app)"""
+    primary_url = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    engine_options = _pool_options(app, primary_url)
+    engine_options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+    replica_url = normalize_database_url(app.config.get('SQLALCHEMY_REPLICA_URI'))
+    if replica_url:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = dict(_pool_options(app, replica_url), url=replica_url)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+class RoutingSession(Session):
+    """Session that reads from the replica when the request opted in and nothing was written yet"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('read_replica'):
+            if self._flushing or isinstance(clause, UpdateBase):
+                # Once this session writes, its later reads must see those writes
+                self.info['read_replica'] = False
+            else:
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _primary_requested() -> bool:
+    if request.headers.get('X-Read-Consistency', '').lower() == 'primary':
+        return True
+    try:
+        return float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_replica(f):
+    """Decorator: serve this GET endpoint from the read replica when one is configured"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from __init__ import db
+
+        if request.method == 'GET' and not _primary_requested():
+            db.session.info['read_replica'] = True
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+@contextmanager
+def use_primary():
+    """Force reads inside the block onto the primary (e.g. when building cached payloads)"""
+    from __init__ import db
+
+    previous = db.session.info.get('read_replica', False)
+    db.session.info['read_replica'] = False
+    try:
+        yield
+    finally:
+        db.session.info['read_replica'] = previous
+
+def init_read_routing(app) -> None:
+    """Keep a client on the primary for a short window after it writes (read-your-writes)"""
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+    if not app.config.get('SQLALCHEMY_REPLICA_URI') or not sticky_seconds:
+        return
+
+    @app.after_request
+    def stick_to_primary_after_write(response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_UNTIL_COOKIE,
+                str(time.time() + sticky_seconds),
+                max_age=int(sticky_seconds) + 1,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
@@ -0,0 +1,165 @@
+"""
+Database Writer Service
+SQLite concurrency tuning (WAL, busy timeout) and a single writer thread that batches commits,
+so background analyses and request threads stop failing with "database is locked"
+"""
+from __init__ import db
+from concurrent.futures import Future
+from flask import current_app
+from typing import Any, Callable, List
+import queue
+import threading
+import time
+
+def is_sqlite(app) -> bool:
+    return app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite')
+
+def configure_sqlite_engine_options(app) -> None:
+    """Set the busy timeout before the engine is created (call before db.init_app)"""
+    if not is_sqlite(app):
+        return
+
+    engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    connect_args = dict(engine_options.get('connect_args', {}))
+    # pysqlite's timeout installs SQLite's busy handler: lock waits block instead of failing
+    connect_args.setdefault('timeout', app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000)
+    connect_args.setdefault('check_same_thread', False)
+    engine_options['connect_args'] = connect_args
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+def install_sqlite_pragmas(app) -> None:
+    """Apply WAL/synchronous/busy_timeout pragmas to every new SQLite connection"""
+    if not is_sqlite(app) or not app.config.get('SQLITE_WAL', True):
+        return
+
+    from sqlalchemy import event
+
+    busy_timeout_ms = app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run alongside the single writer; NORMAL is durable across app crashes in WAL mode
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_pragmas)
+
+class _WriteJob:
+    def __init__(self, fn: Callable[[], Any], exclusive: bool):
+        self.fn = fn
+        self.exclusive = exclusive
+        self.future = Future()
+
+class SQLiteWriteQueue:
+    """Runs write callables on one thread, committing several of them per transaction"""
+
+    def __init__(self, app, max_batch: int = 50, batch_window: float = 0.005):
+        self.app = app
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.jobs = 0
+
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[], Any], exclusive: bool = False) -> Future:
+        job = _WriteJob(fn, exclusive)
+        self._queue.put(job)
+        return job.future
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            jobs = [self._queue.get()]
+
+            # Gather whatever else arrives within the batch window
+            deadline = time.monotonic() + self.batch_window
+            while len(jobs) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    jobs.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self.app.app_context():
+                # Exclusive jobs commit on their own, so they never share a transaction
+                batch = []
+                for job in jobs:
+                    if job.exclusive:
+                        if batch:
+                            self._execute_batch(batch)
+                            batch = []
+                        self._execute_batch([job])
+                    else:
+                        batch.append(job)
+                if batch:
+                    self._execute_batch(batch)
+                db.session.remove()
+
+    def _execute_batch(self, jobs: List[_WriteJob]) -> None:
+        try:
+            results = [job.fn() for job in jobs]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if len(jobs) == 1:
+                jobs[0].future.set_exception(e)
+                return
+            # Isolate the failing job by retrying each one in its own transaction
+            for job in jobs:
+                self._execute_batch([job])
+            return
+
+        self.batches += 1
+        self.jobs += len(jobs)
+        for job, result in zip(jobs, results):
+            job.future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth(),
+            'batches': self.batches,
+            'jobs': self.jobs,
+            'average_batch_size': round(self.jobs / self.batches, 2) if self.batches else 0.0
+        }
+
+def init_write_queue(app) -> None:
+    """Start the single writer thread for SQLite databases when enabled"""
+    if is_sqlite(app) and app.config.get('SQLITE_WRITE_QUEUE', True):
+        app.extensions['sqlite_write_queue'] = SQLiteWriteQueue(
+            app,
+            max_batch=app.config.get('SQLITE_WRITE_BATCH_SIZE', 50),
+            batch_window=app.config.get('SQLITE_WRITE_BATCH_WINDOW_MS', 5) / 1000
+        )
+
+def run_write(fn: Callable[[], Any], exclusive: bool = False) -> Any:
+    """
+    Run a write and commit it, returning fn's result
+
+    fn uses db.session and must not commit unless exclusive=True (e.g. RankingService methods,
+    which commit themselves). With the SQLite write queue it runs on the writer thread, so it
+    should look up its own rows and return plain values, not ORM instances.
+    """
+    write_queue = current_app.extensions.get('sqlite_write_queue')
+    if write_queue is None:
+        try:
+            result = fn()
+            db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+
+    result = write_queue.submit(fn, exclusive).result()
+    # The write happened in another session; drop anything this session cached
+    db.session.expire_all()
+    return result
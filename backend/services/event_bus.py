@@ -0,0 +1,258 @@
+"""
+Event Bus Service
+In-process publish/subscribe for analysis status and ranking updates, with an optional Redis
+backend so events published by one worker reach subscribers connected to another
+"""
+from sqlalchemy import inspect
+from typing import Dict, Iterable, List, Optional
+import itertools
+import json
+import queue
+import threading
+import time
+
+class SubscriberLimitError(Exception):
+    """Raised when the bus already holds the configured maximum of subscribers"""
+    pass
+
+class Subscription:
+    """A subscriber's bounded event queue; a slow reader loses events and is told to resync"""
+
+    def __init__(self, topics: Iterable[str], max_queue_size: int):
+        self.topics = tuple(topics)
+        self.created_at = time.monotonic()
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._overflowed = False
+        self.dropped = 0
+
+    def put(self, event: Dict) -> None:
+        """Never blocks the publisher; a full queue is discarded and flagged"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflowed = True
+            self.dropped += self._queue.qsize() + 1
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Next event, a resync marker after an overflow, or None when the timeout expires"""
+        if self._overflowed:
+            self._overflowed = False
+            return {'id': None, 'type': 'resync', 'data': {'dropped': self.dropped}}
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class MemoryEventBackend:
+    """Delivers events to subscribers of this process only"""
+
+    def __init__(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, topics: List[str], event: Dict) -> None:
+        self._dispatch(topics, event)
+
+class RedisEventBackend:
+    """Fans events out through a Redis channel; every process forwards them to its own subscribers"""
+
+    def __init__(self, url: str, dispatch, channel: str = 'resume_analyzer:events'):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("The redis package is required for EVENT_BACKEND=redis")
+
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._dispatch = dispatch
+
+        listener = threading.Thread(target=self._listen, daemon=True)
+        listener.start()
+
+    def publish(self, topics: List[str], event: Dict) -> None:
+        self._client.publish(self._channel, json.dumps({'topics': topics, 'event': event}))
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    self._dispatch(payload['topics'], payload['event'])
+            except Exception as e:
+                print(f"Event bus Redis listener error, reconnecting: {e}")
+                time.sleep(1)
+
+class EventBus:
+    def __init__(self, max_queue_size: int = 100, max_subscribers: int = 10000):
+        self.max_queue_size = max_queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._subscriber_count = 0
+        self._sequence = itertools.count(1)
+        self._backend = MemoryEventBackend(self._dispatch)
+        self._configured = False
+        self.published = 0
+
+    def init_app(self, app) -> None:
+        # create_app may run more than once per process; keep existing subscribers
+        if self._configured:
+            return
+        self._configured = True
+
+        self.max_queue_size = app.config.get('EVENT_QUEUE_SIZE', self.max_queue_size)
+        self.max_subscribers = app.config.get('EVENT_MAX_SUBSCRIBERS', self.max_subscribers)
+
+        backend = app.config.get('EVENT_BACKEND', 'memory')
+        if backend == 'redis':
+            self._backend = RedisEventBackend(app.config['EVENT_REDIS_URL'], self._dispatch)
+        elif backend != 'memory':
+            raise ValueError(f"Unsupported EVENT_BACKEND: {backend}")
+
+    def subscribe(self, topics: List[str]) -> Subscription:
+        subscription = Subscription(topics, self.max_queue_size)
+        with self._lock:
+            if self._subscriber_count >= self.max_subscribers:
+                raise SubscriberLimitError("Too many event subscribers")
+
+            self._subscriber_count += 1
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            removed = False
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._topics[topic]
+            if removed:
+                self._subscriber_count -= 1
+
+    def publish(self, topics: Iterable[str], event_type: str, data: Dict) -> None:
+        """Publish one event to several topics; a subscriber on more than one still gets it once"""
+        event = {'id': next(self._sequence), 'type': event_type, 'data': data}
+        self.published += 1
+        self._backend.publish(list(topics), event)
+
+    def _dispatch(self, topics: List[str], event: Dict) -> None:
+        with self._lock:
+            subscribers = set()
+            for topic in topics:
+                subscribers.update(self._topics.get(topic, ()))
+
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'subscribers': self._subscriber_count,
+                'topics': len(self._topics),
+                'published': self.published
+            }
+
+def format_sse(event: Dict) -> str:
+    """Encode an event in the text/event-stream wire format"""
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return '\n'.join(lines) + '\n\n'
+
+# Global event bus instance
+event_bus = EventBus()
+
+def user_topic(user_id: int) -> str:
+    return f'user:{user_id}'
+
+def job_topic(job_id: int) -> str:
+    return f'job:{job_id}'
+
+def _collect_status_transitions(session, flush_context):
+    from models import ResumeAnalysis, Resume
+
+    transitions = session.info.setdefault('analysis_transitions', [])
+    for instance in list(session.new) + list(session.dirty):
+        if not isinstance(instance, ResumeAnalysis):
+            continue
+
+        history = inspect(instance).attrs.analysis_status.history
+        if not history.has_changes():
+            continue
+
+        # Resolve the owner on the flush connection; lazy loads are unsafe inside flush events
+        user_id = session.connection().execute(
+            Resume.__table__.select()
+            .with_only_columns(Resume.__table__.c.user_id)
+            .where(Resume.__table__.c.id == instance.resume_id)
+        ).scalar()
+
+        transitions.append({
+            'analysis_id': instance.id,
+            'job_id': instance.job_id,
+            'resume_id': instance.resume_id,
+            'user_id': user_id,
+            'previous_status': history.deleted[0] if history.deleted else None,
+            'status': instance.analysis_status,
+            'relevance_score': instance.relevance_score if instance.analysis_status == 'completed' else None
+        })
+
+def _publish_transition(transition: Dict) -> None:
+    topics = [job_topic(transition['job_id'])]
+    if transition['user_id'] is not None:
+        topics.append(user_topic(transition['user_id']))
+    event_bus.publish(topics, 'analysis_status', transition)
+
+def _publish_status_transitions(session):
+    for transition in session.info.pop('analysis_transitions', ()):
+        _publish_transition(transition)
+
+def publish_status_change(analysis_id: int, previous_status: Optional[str]) -> None:
+    """Publish a committed status change made with a Core UPDATE, which the session hooks do not see"""
+    from __init__ import db
+    from models import ResumeAnalysis, Resume
+
+    row = db.session.query(ResumeAnalysis.job_id, ResumeAnalysis.resume_id, ResumeAnalysis.analysis_status,
+                           ResumeAnalysis.relevance_score, Resume.user_id)\
+        .join(Resume, Resume.id == ResumeAnalysis.resume_id)\
+        .filter(ResumeAnalysis.id == analysis_id)\
+        .first()
+    if row is None:
+        return
+
+    _publish_transition({
+        'analysis_id': analysis_id,
+        'job_id': row.job_id,
+        'resume_id': row.resume_id,
+        'user_id': row.user_id,
+        'previous_status': previous_status,
+        'status': row.analysis_status,
+        'relevance_score': row.relevance_score if row.analysis_status == 'completed' else None
+    })
+
+def _discard_status_transitions(session):
+    session.info.pop('analysis_transitions', None)
+
+def register_event_hooks(session) -> None:
+    """Publish ResumeAnalysis status transitions once their transaction commits"""
+    from sqlalchemy import event
+
+    if event.contains(session, 'after_flush', _collect_status_transitions):
+        return
+
+    event.listen(session, 'after_flush', _collect_status_transitions)
+    event.listen(session, 'after_commit', _publish_status_transitions)
+    event.listen(session, 'after_rollback', _discard_status_transitions)
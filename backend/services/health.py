@@ -0,0 +1,204 @@
+"""
+Health Checks
+Liveness (the process answers) and readiness (this instance should get traffic): a database round
+trip and pool saturation, analysis queue depth and age, this process' analysis worker saturation
+and the Gemini breaker. Each check reports ok, degraded or down; the queue and worker checks only
+reach down when READY_QUEUE_AGE_DOWN_SECONDS / READY_WORKERS_DOWN are set, since a backlog shared by
+every instance would otherwise take the whole fleet out. The readiness report is cached for
+READINESS_CACHE_SECONDS so frequent load balancer probes cost one computation per interval.
+"""
+from __init__ import db
+from datetime import datetime
+from sqlalchemy import text
+from typing import Dict, Optional
+import os
+import threading
+import time
+
+OK, DEGRADED, DOWN = 'ok', 'degraded', 'down'
+LEVELS = {OK: 0, DEGRADED: 1, DOWN: 2}
+
+def _level(value: float, degraded_at: float, down_at: Optional[float]) -> str:
+    """ok, degraded or down for a value against its thresholds; without a down threshold it caps at degraded"""
+    if down_at is not None and value >= down_at:
+        return DOWN
+    if value >= degraded_at:
+        return DEGRADED
+    return OK
+
+def _worst(*statuses: str) -> str:
+    return max(statuses, key=LEVELS.get)
+
+def queue_snapshot() -> Dict[str, Dict]:
+    """Pending and processing analyses with the age of the oldest of each (from created / started)"""
+    from models import ResumeAnalysis
+
+    now = datetime.utcnow()
+    rows = db.session.query(ResumeAnalysis.analysis_status, db.func.count(ResumeAnalysis.id),
+                            db.func.min(ResumeAnalysis.created_at), db.func.min(ResumeAnalysis.analysis_started_at))\
+        .filter(ResumeAnalysis.analysis_status.in_(('pending', 'processing')))\
+        .group_by(ResumeAnalysis.analysis_status)\
+        .all()
+    found = {status: (count, oldest_created, oldest_started) for status, count, oldest_created, oldest_started in rows}
+
+    snapshot = {}
+    for status in ('pending', 'processing'):
+        count, oldest_created, oldest_started = found.get(status, (0, None, None))
+        oldest = oldest_started if status == 'processing' else oldest_created
+        snapshot[status] = {
+            'count': count,
+            'oldest_age_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0.0
+        }
+    return snapshot
+
+def _pool_stats(engine) -> Optional[Dict]:
+    """Checked-out connections against pool_size + max_overflow (None for pools without a size)"""
+    pool = engine.pool
+    if not hasattr(pool, 'size') or not hasattr(pool, 'checkedout'):
+        return None
+    capacity = pool.size() + max(getattr(pool, '_max_overflow', 0), 0)
+    checked_out = pool.checkedout()
+    return {
+        'size': pool.size(),
+        'checked_out': checked_out,
+        'overflow': max(pool.overflow(), 0),
+        'capacity': capacity,
+        'saturation': round(checked_out / capacity, 3) if capacity else 0.0
+    }
+
+def check_database(config) -> Dict:
+    engine = db.engine
+    result = {'status': OK}
+    pool = _pool_stats(engine)
+    if pool is not None:
+        result['pool'] = pool
+        result['status'] = _level(pool['saturation'], config['READY_POOL_DEGRADED'], config['READY_POOL_DOWN'])
+        if result['status'] == DOWN:
+            # An exhausted pool would block this probe for pool_timeout
+            result['error'] = 'Connection pool exhausted'
+            return result
+
+    writer = config.get('sqlite_write_queue')
+    if writer is not None:
+        result['write_queue_depth'] = writer.depth()
+
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+    except Exception as e:
+        result.update(status=DOWN, error=str(e))
+        return result
+    latency_ms = (time.perf_counter() - started) * 1000
+    result['latency_ms'] = round(latency_ms, 2)
+    result['status'] = _worst(result['status'],
+                              _level(latency_ms, config['READY_DB_DEGRADED_MS'], config['READY_DB_DOWN_MS']))
+    return result
+
+def check_queue(config) -> Dict:
+    try:
+        snapshot = queue_snapshot()
+    except Exception as e:
+        db.session.rollback()
+        # An unreachable database is reported (as down) by check_database
+        return {'status': DEGRADED, 'error': str(e)}
+    oldest_pending = snapshot['pending']['oldest_age_seconds']
+    return {
+        'status': _level(oldest_pending, config['READY_QUEUE_AGE_DEGRADED_SECONDS'],
+                         config['READY_QUEUE_AGE_DOWN_SECONDS']),
+        'pending': snapshot['pending']['count'],
+        'processing': snapshot['processing']['count'],
+        'oldest_pending_age_seconds': oldest_pending,
+        'oldest_processing_age_seconds': snapshot['processing']['oldest_age_seconds']
+    }
+
+def check_workers(config) -> Dict:
+    from services.metrics import analysis_workers_busy
+
+    busy = int(analysis_workers_busy.get())
+    capacity = config['ANALYSIS_WORKER_CAPACITY']
+    saturation = busy / capacity if capacity else 0.0
+    return {
+        'status': _level(saturation, config['READY_WORKERS_DEGRADED'], config['READY_WORKERS_DOWN']),
+        'busy': busy,
+        'capacity': capacity,
+        'saturation': round(saturation, 3)
+    }
+
+def check_llm(config) -> Dict:
+    from services.circuit_breaker import CLOSED, gemini_breaker
+
+    stats = gemini_breaker.stats()
+    # Analyses fall back to local scoring while the breaker is open, so the instance stays usable
+    return {
+        'status': OK if stats['state'] == CLOSED else DEGRADED,
+        'backend': os.getenv('AI_BACKEND', 'gemini'),
+        'breaker_state': stats['state'],
+        'failure_rate': stats['failure_rate'],
+        'slow_rate': stats['slow_rate'],
+        'open_for_seconds': stats['open_for_seconds']
+    }
+
+# (name, check, whether it queries the database through the pool)
+CHECKS = (
+    ('database', check_database, False),
+    ('queue', check_queue, True),
+    ('workers', check_workers, False),
+    ('llm', check_llm, False),
+)
+
+class ReadinessProbe:
+    def __init__(self):
+        self.cache_seconds = 2.0
+        self.lock = threading.Lock()
+        self._report = None
+        self._computed_at = 0.0
+        self._last_checks: Dict[str, Dict] = {}  # Last result of each check that ran
+        self.computations = 0
+
+    def report(self, app) -> Dict:
+        """The cached readiness report, recomputed by one caller once it is older than cache_seconds"""
+        with self.lock:
+            now = time.monotonic()
+            cached = self._report is not None and now - self._computed_at < self.cache_seconds
+            if not cached:
+                self._report = self._compute(app)
+                self._computed_at = now
+                self.computations += 1
+            report = dict(self._report, cached=cached, age_seconds=round(now - self._computed_at, 3))
+        return report
+
+    def _compute(self, app) -> Dict:
+        self.cache_seconds = app.config.get('READINESS_CACHE_SECONDS', 2.0)
+        config = dict(app.config, sqlite_write_queue=app.extensions.get('sqlite_write_queue'))
+
+        checks = {}
+        for name, check, uses_database in CHECKS:
+            if uses_database and checks['database']['status'] == DOWN:
+                # It would wait pool_timeout for a connection (or fail on the same database) while
+                # every other readiness caller waits on the probe lock; report its last result instead
+                last = self._last_checks.get(name)
+                checks[name] = dict(last, stale=True) if last else {'status': DOWN}
+                checks[name]['skipped'] = 'database is down'
+                continue
+            started = time.perf_counter()
+            try:
+                checks[name] = check(config)
+            except Exception as e:
+                checks[name] = {'status': DOWN, 'error': str(e)}
+            checks[name]['check_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            self._last_checks[name] = checks[name]
+
+        status = _worst(*(check['status'] for check in checks.values()))
+        return {
+            'status': status,
+            'ready': status != DOWN,
+            'checked_at': datetime.utcnow().isoformat(),
+            'checks': checks
+        }
+
+readiness_probe = ReadinessProbe()
+
+def liveness() -> Dict:
+    """The process is up and serving requests; deliberately checks nothing else"""
+    return {'status': OK, 'pid': os.getpid(), 'checked_at': datetime.utcnow().isoformat()}
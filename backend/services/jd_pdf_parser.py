@@ -2,9 +2,8 @@
 Job Description PDF Parser Service
 Extracts text from uploaded job description PDF files for resume analysis
 """
-import PyPDF2
-import fitz  # PyMuPDF
 from typing import Optional
+from services.metrics import jd_pdf_extract_duration
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,15 +23,16 @@ class JDPDFParser:
             Optional[str]: Extracted text or None if extraction fails
         """
         try:
-            # Try PyMuPDF first (faster and more reliable)
-            text = JDPDFParser._extract_with_pymupdf(pdf_path)
-            if text:
+            with jd_pdf_extract_duration.time():
+                # Try PyMuPDF first (faster and more reliable)
+                text = JDPDFParser._extract_with_pymupdf(pdf_path)
+                if text:
+                    return text
+                
+                # Fallback to PyPDF2
+                text = JDPDFParser._extract_with_pypdf2(pdf_path)
                 return text
             
-            # Fallback to PyPDF2
-            text = JDPDFParser._extract_with_pypdf2(pdf_path)
-            return text
-            
         except Exception as e:
             logger.error(f"Error extracting text from PDF {pdf_path}: {str(e)}")
             return None
@@ -41,6 +41,8 @@ class JDPDFParser:
     def _extract_with_pymupdf(pdf_path: str) -> Optional[str]:
         """Extract text using PyMuPDF (fitz)"""
         try:
+            import fitz  # PyMuPDF, imported on first use to keep startup fast
+            
             doc = fitz.open(pdf_path)
             text = ""
             
@@ -64,6 +66,8 @@ class JDPDFParser:
     def _extract_with_pypdf2(pdf_path: str) -> Optional[str]:
         """Extract text using PyPDF2 (fallback)"""
         try:
+            import PyPDF2  # Imported on first use to keep startup fast
+            
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 text = ""
@@ -0,0 +1,295 @@
+"""
+Job Requirements Service
+Turns a job's description, requirements and JD PDF into a compact structured requirement set
+(skills, certifications, years of experience, education) once per version of the job; the
+analysis prompt and the local scorer read this instead of re-interpreting the raw text
+"""
+from typing import Dict, List, Optional
+import hashlib
+import os
+import re
+
+PROFILE_VERSION = 1
+
+# Canonical skill -> pattern; the ambiguous one-letter/short names only match in their usual casing
+SKILL_PATTERNS = {
+    'python': r'python', 'java': r'java(?!\s*script)', 'javascript': r'javascript|(?-i:\bJS\b)',
+    'typescript': r'typescript', 'c++': r'c\+\+', 'c#': r'c#', 'go': r'golang|(?-i:\bGo\b)',
+    'rust': r'rust', 'scala': r'scala', 'r': r'(?-i:\bR\b)(?!&)', 'kotlin': r'kotlin', 'swift': r'swift',
+    'php': r'php', 'ruby': r'ruby', 'sql': r'sql', 'nosql': r'nosql',
+    'postgresql': r'postgres(?:ql)?', 'mysql': r'mysql', 'mongodb': r'mongo(?:db)?', 'redis': r'redis',
+    'pandas': r'pandas', 'numpy': r'numpy', 'scikit-learn': r'scikit[- ]learn|sklearn',
+    'tensorflow': r'tensorflow', 'pytorch': r'pytorch', 'keras': r'keras',
+    'spark': r'(?:py)?spark', 'hadoop': r'hadoop', 'kafka': r'kafka', 'airflow': r'airflow',
+    'databricks': r'databricks', 'snowflake': r'snowflake', 'etl': r'etl',
+    'machine learning': r'machine learning|(?-i:\bML\b)', 'deep learning': r'deep learning',
+    'nlp': r'nlp|natural language processing', 'computer vision': r'computer vision',
+    'generative ai': r'generative ai|gen ?ai|llms?', 'statistics': r'statistic(?:s|al)',
+    'data analysis': r'data analy(?:sis|tics)|exploratory data analysis|eda',
+    'data visualization': r'data visuali[sz]ation', 'tableau': r'tableau', 'power bi': r'power ?bi',
+    'excel': r'excel', 'react': r'react(?:\.?js)?', 'angular': r'angular', 'vue': r'vue(?:\.?js)?',
+    'node.js': r'node(?:\.?js)', 'django': r'django', 'flask': r'flask', 'fastapi': r'fastapi',
+    'spring': r'spring(?: boot)?', 'html': r'html5?', 'css': r'css3?', 'rest': r'rest(?:ful)? apis?',
+    'graphql': r'graphql', 'aws': r'aws|amazon web services', 'azure': r'azure', 'gcp': r'gcp|google cloud',
+    'docker': r'docker', 'kubernetes': r'kubernetes|k8s', 'terraform': r'terraform',
+    'ci/cd': r'ci ?/ ?cd|continuous integration', 'jenkins': r'jenkins', 'linux': r'linux', 'git': r'git(?!hub)',
+    'devops': r'devops', 'agile': r'agile', 'scrum': r'scrum', 'communication': r'communication',
+    'leadership': r'leadership', 'teamwork': r'teamwork|collaborat\w+', 'problem solving': r'problem[- ]solving',
+    'project management': r'project management',
+}
+SKILL_REGEXES = {skill: re.compile(rf'(?<![\w+#]){pattern}(?![\w+#])', re.IGNORECASE)
+                 for skill, pattern in SKILL_PATTERNS.items()}
+
+CERTIFICATION_ACRONYMS = re.compile(r'\b(PMP|CISSP|CISA|CISM|CKA|CKAD|CCNA|CCNP|CPA|CFA|CSM|PSM|ITIL|Six Sigma)\b')
+_CAPITALIZED = r'[A-Z][\w+#.\-]*'
+CERTIFIED_PATTERN = re.compile(rf'((?:{_CAPITALIZED}\s+){{0,3}})[Cc]ertified((?:\s+{_CAPITALIZED}){{0,4}})')
+CERTIFICATION_OF_PATTERN = re.compile(rf'((?:{_CAPITALIZED}\s+){{1,4}})[Cc]ertification\b')
+CERTIFICATION_IN_PATTERN = re.compile(rf'\b[Cc]ertification (?:in|as) (?:an? )?((?:{_CAPITALIZED}\s*){{1,4}})')
+CERTIFICATION_STOPWORDS = {'a', 'an', 'the', 'any', 'relevant', 'with', 'or', 'and', 'preferred', 'required',
+                           'professional', 'industry', 'other', 'is', 'are'}
+
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+                'nine': 9, 'ten': 10, 'a': 1, 'an': 1}
+YEARS_PATTERN = re.compile(
+    r'\b(\d{1,2}|one|two|three|four|five|six|seven|eight|nine|ten)\s*\+?\s*'
+    r'(?:(?:-|–|to)\s*\d{1,2}\s*\+?\s*)?(?:years?|yrs?)\b',
+    re.IGNORECASE
+)
+NO_EXPERIENCE_PATTERN = re.compile(r'\b(no (?:prior )?experience|fresher|entry[- ]level)\b', re.IGNORECASE)
+
+# Lowest to highest; each level with the patterns that name it
+EDUCATION_LEVELS = ['diploma', 'bachelor', 'master', 'phd']
+EDUCATION_PATTERNS = {
+    'phd': re.compile(r"\b(ph\.?\s?d|doctorate|doctoral)\b", re.IGNORECASE),
+    'master': re.compile(r"\b(master'?s?|m\.?\s?s\.?c?|m\.?\s?tech|m\.?\s?e\.|mba|postgraduate)(?!\w)", re.IGNORECASE),
+    'bachelor': re.compile(r"\b(bachelor'?s?|b\.?\s?s\.?c?|b\.?\s?tech|b\.?\s?e\.?|b\.?\s?a\.|undergraduate|degree)(?!\w)",
+                           re.IGNORECASE),
+    'diploma': re.compile(r'\bdiploma\b', re.IGNORECASE),
+}
+EDUCATION_FIELDS = re.compile(
+    r'\b(computer science|computer engineering|software engineering|information technology|data science|'
+    r'mathematics|statistics|physics|economics|electrical engineering|electronics|mechanical|automotive|'
+    r'production|manufacturing|industrial engineering|business administration|finance)\b',
+    re.IGNORECASE
+)
+
+PREFERRED_PATTERN = re.compile(
+    r'\b(preferred|nice[- ]to[- ]have|good[- ]to[- ]have|bonus|a plus|desirable|advantageous|advantage|ideally)\b',
+    re.IGNORECASE
+)
+REQUIRED_HEADING = re.compile(
+    r'^(requirements?|required|qualifications?|must[- ]haves?|who you are|what you.ll need|skills|'
+    r'eligibility|minimum qualifications|basic qualifications)\b',
+    re.IGNORECASE
+)
+# Sections whose text says nothing about what the candidate needs
+IGNORED_HEADING = re.compile(
+    r'^(about|benefits|perks|what we offer|compensation|salary|stipend|schedule|location|bond|job types?)\b',
+    re.IGNORECASE
+)
+# A line ending in one of these continues on the next one
+WRAP_WORDS = {'in', 'of', 'and', 'or', 'with', 'for', 'to', 'the', 'a', 'an', 'on', 'including'}
+BULLET = re.compile(r'^\s*[●•\-*–·]+[\s\u200b]*')
+
+def job_fingerprint(job) -> str:
+    """Hash of everything the requirement set and prompt section are derived from"""
+    pdf_mtime = None
+    if job.jd_pdf_path:
+        try:
+            pdf_mtime = os.path.getmtime(job.jd_pdf_path)
+        except OSError:
+            pass
+    fields = (job.title, job.company, job.description, job.requirements, job.location,
+              job.experience_level, job.employment_type, job.jd_pdf_path, pdf_mtime)
+    return hashlib.sha1(repr(fields).encode('utf-8')).hexdigest()
+
+def find_skills(text: str) -> List[str]:
+    """Canonical names of the known skills mentioned in text"""
+    return [skill for skill, regex in SKILL_REGEXES.items() if regex.search(text or '')]
+
+def education_level(text: str) -> Optional[str]:
+    """Highest education level named in text"""
+    for level in reversed(EDUCATION_LEVELS):
+        if EDUCATION_PATTERNS[level].search(text or ''):
+            return level
+    return None
+
+def _lowest_education_level(text: str) -> Optional[str]:
+    # "Bachelor's or Master's" asks for a bachelor's
+    for level in EDUCATION_LEVELS:
+        if EDUCATION_PATTERNS[level].search(text):
+            return level
+    return None
+
+def _statements(text: str) -> List[str]:
+    """Logical lines: bullets stripped, PDF line wraps joined back into one statement"""
+    statements = []
+    for raw_line in (text or '').splitlines():
+        line = ' '.join(BULLET.sub('', raw_line).split())
+        if not line:
+            continue
+        bulleted = BULLET.match(raw_line) is not None
+        wrapped = statements and (line[0].islower() or statements[-1].endswith(',')
+                                  or statements[-1].split()[-1].lower() in WRAP_WORDS)
+        if wrapped and not bulleted and not statements[-1].endswith(('.', ':', ';')):
+            statements[-1] += ' ' + line
+        else:
+            statements.append(line)
+    return statements
+
+def _strip_stopwords(words: List[str]) -> List[str]:
+    while words and words[0].lower() in CERTIFICATION_STOPWORDS:
+        words.pop(0)
+    while words and words[-1].lower().rstrip('.,;') in CERTIFICATION_STOPWORDS:
+        words.pop()
+    return words
+
+def _certifications(statement: str) -> List[str]:
+    found = [match.group(1) for match in CERTIFICATION_ACRONYMS.finditer(statement)]
+    for match in CERTIFIED_PATTERN.finditer(statement):
+        before, after = _strip_stopwords(match.group(1).split()), _strip_stopwords(match.group(2).split())
+        if before or after:
+            found.append(' '.join(before + ['Certified'] + after))
+    for match in CERTIFICATION_OF_PATTERN.finditer(statement):
+        words = _strip_stopwords(match.group(1).split())
+        if words and 'Certified' not in words:
+            found.append(' '.join(words + ['certification']))
+    for match in CERTIFICATION_IN_PATTERN.finditer(statement):
+        words = _strip_stopwords(match.group(1).split())
+        if words:
+            found.append(' '.join(['Certification in'] + words))
+    return [certification.rstrip('.,;') for certification in found]
+
+def _years(statement: str) -> List[int]:
+    if 'experience' not in statement.lower():
+        return []
+    years = []
+    for match in YEARS_PATTERN.finditer(statement):
+        value = match.group(1).lower()
+        years.append(NUMBER_WORDS[value] if value in NUMBER_WORDS else int(value))
+    return years
+
+def extract_requirements(job) -> Dict:
+    """Build the job's structured requirement set from its text fields and JD PDF"""
+    from services.jd_pdf_parser import JDPDFParser
+
+    sources = [job.requirements, job.description]
+    if job.jd_pdf_path:
+        sources.append(JDPDFParser.extract_text(job.jd_pdf_path))
+
+    required_skills, preferred_skills, certifications = [], [], []
+    required_years, preferred_years = [], []
+    required_levels, preferred_levels, fields = [], [], []
+    no_experience = False
+
+    for text in sources:
+        section = 'required'
+        for statement in _statements(text):
+            # Bare headings switch the current section; "Location: Pune"-style lines are skipped on their own
+            is_heading = len(statement.split()) <= 6 and (
+                statement.endswith(':') or (':' not in statement and (REQUIRED_HEADING.match(statement)
+                                                                      or IGNORED_HEADING.match(statement))))
+            if is_heading and IGNORED_HEADING.match(statement):
+                section = 'ignored'
+            elif is_heading and PREFERRED_PATTERN.search(statement):
+                section = 'preferred'
+            elif is_heading:
+                section = 'required'
+            if section == 'ignored' or IGNORED_HEADING.match(statement):
+                continue
+
+            preferred = section == 'preferred' or PREFERRED_PATTERN.search(statement) is not None
+            (preferred_skills if preferred else required_skills).extend(find_skills(statement))
+            (preferred_years if preferred else required_years).extend(_years(statement))
+            certifications.extend(_certifications(statement))
+            no_experience = no_experience or NO_EXPERIENCE_PATTERN.search(statement) is not None
+
+            level = _lowest_education_level(statement)
+            if level:
+                (preferred_levels if preferred else required_levels).append(level)
+                fields.extend(match.lower() for match in EDUCATION_FIELDS.findall(statement))
+
+    required_skills = list(dict.fromkeys(required_skills))
+    preferred_skills = [skill for skill in dict.fromkeys(preferred_skills) if skill not in required_skills]
+    certifications = list({certification.lower(): certification for certification in certifications}.values())
+
+    min_years = None
+    if required_years:
+        # The strictest stated minimum, bounded so company history ("20 years of ...") cannot dominate
+        min_years = min(max(required_years), 15)
+    elif no_experience:
+        min_years = 0
+
+    return {
+        'version': PROFILE_VERSION,
+        'fingerprint': job_fingerprint(job),
+        'required_skills': required_skills,
+        'preferred_skills': preferred_skills,
+        'certifications': certifications[:10],
+        'min_years_experience': min_years,
+        'preferred_years_experience': max(preferred_years) if preferred_years else None,
+        'education': {
+            'level': min(required_levels, key=EDUCATION_LEVELS.index) if required_levels else None,
+            'preferred_level': max(preferred_levels, key=EDUCATION_LEVELS.index) if preferred_levels else None,
+            'fields': list(dict.fromkeys(fields))
+        }
+    }
+
+def is_current(profile: Optional[Dict], job) -> bool:
+    return bool(profile) and profile.get('version') == PROFILE_VERSION \
+        and profile.get('fingerprint') == job_fingerprint(job)
+
+def requirement_profile(job) -> Dict:
+    """The job's stored requirement set, or a freshly extracted one if it is missing or stale"""
+    profile = job.get_requirement_profile()
+    if is_current(profile, job):
+        return profile
+    return extract_requirements(job)
+
+def has_requirements(profile: Dict) -> bool:
+    return bool(profile.get('required_skills') or profile.get('preferred_skills') or profile.get('certifications')
+                or profile.get('min_years_experience') or profile['education'].get('level'))
+
+def format_requirements(profile: Dict) -> str:
+    """Compact text form of the requirement set for the analysis prompt"""
+    lines = []
+    if profile.get('required_skills'):
+        lines.append(f"Required skills: {', '.join(profile['required_skills'])}")
+    if profile.get('preferred_skills'):
+        lines.append(f"Preferred skills: {', '.join(profile['preferred_skills'])}")
+    if profile.get('certifications'):
+        lines.append(f"Certifications: {', '.join(profile['certifications'])}")
+    if profile.get('min_years_experience'):
+        lines.append(f"Minimum experience: {profile['min_years_experience']}+ years")
+    elif profile.get('min_years_experience') == 0:
+        lines.append("Minimum experience: none (entry level)")
+    if profile.get('preferred_years_experience'):
+        lines.append(f"Preferred experience: {profile['preferred_years_experience']}+ years")
+
+    education = profile.get('education') or {}
+    if education.get('level'):
+        fields = f" in {' / '.join(education['fields'])}" if education.get('fields') else ''
+        lines.append(f"Education: {education['level']} or higher{fields}")
+    if education.get('preferred_level'):
+        lines.append(f"Preferred education: {education['preferred_level']}")
+    return '\n'.join(lines)
+
+def _refresh_requirement_profiles(session, flush_context, instances):
+    from models import JobDescription
+
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, JobDescription) and not is_current(instance.get_requirement_profile(), instance):
+            try:
+                instance.set_requirement_profile(extract_requirements(instance))
+            except Exception as e:
+                # Never block saving a job; requirement_profile() extracts again on first use
+                print(f"Error extracting requirements for job {instance.id}: {e}")
+
+def register_requirement_hooks(session) -> None:
+    """Re-extract a job's requirement set whenever it is created or its text/PDF changes"""
+    from sqlalchemy import event
+
+    if event.contains(session, 'before_flush', _refresh_requirement_profiles):
+        return
+
+    event.listen(session, 'before_flush', _refresh_requirement_profiles)
@@ -0,0 +1,126 @@
+"""
+Local Scorer
+Scores a resume against a job's structured requirement set without calling Gemini; results use
+the same shape as AIAnalyzer so they can stand in for it
+"""
+from services.job_requirements import EDUCATION_LEVELS, education_level, find_skills
+from datetime import datetime
+from typing import Dict, List, Optional
+import re
+
+# Relative weight of each requirement kind; kinds the job does not ask for are left out
+WEIGHTS = {'required_skills': 55, 'preferred_skills': 15, 'experience': 15, 'education': 10, 'certifications': 5}
+
+STATED_YEARS_PATTERN = re.compile(r'\b(\d{1,2})\s*\+?\s*(?:years?|yrs?)\b', re.IGNORECASE)
+DATE_RANGE_PATTERN = re.compile(
+    r'\b((?:19|20)\d{2})\s*(?:-|–|to)\s*((?:19|20)\d{2}|present|current|now|till date)\b',
+    re.IGNORECASE
+)
+
+def resume_years_of_experience(resume_text: str) -> Optional[float]:
+    """Years stated outright ("5 years"), else the summed span of date ranges; None if neither appears"""
+    stated = [int(years) for years in STATED_YEARS_PATTERN.findall(resume_text) if int(years) <= 40]
+    if stated:
+        return float(max(stated))
+
+    current_year = datetime.utcnow().year
+    total = 0
+    for start, end in DATE_RANGE_PATTERN.findall(resume_text):
+        end_year = int(end) if end.isdigit() else current_year
+        if int(start) <= end_year <= current_year:
+            total += end_year - int(start)
+    return float(total) if total else None
+
+def _matched(needed: List[str], have: List[str]) -> List[str]:
+    return [item for item in needed if item in have]
+
+def _certification_matched(certification: str, resume_lower: str) -> bool:
+    words = [word for word in re.findall(r'[\w+#]+', certification.lower()) if word not in ('certified', 'certification')]
+    return bool(words) and all(re.search(rf'(?<![\w+#]){re.escape(word)}(?![\w+#])', resume_lower) for word in words)
+
+def _verdict(score: float) -> str:
+    if score >= 80:
+        return 'High'
+    if score >= 60:
+        return 'Medium'
+    return 'Low'
+
+class LocalScorer:
+    def score(self, resume_text: str, profile: Dict) -> Dict:
+        """Score resume_text against a requirement profile from services.job_requirements"""
+        resume_text = resume_text or ''
+        resume_lower = resume_text.lower()
+        resume_skills = find_skills(resume_text)
+        components = {}
+        strengths, weaknesses, suggestions = [], [], []
+
+        required = profile.get('required_skills') or []
+        matched_required = _matched(required, resume_skills)
+        missing_skills = [skill for skill in required if skill not in matched_required]
+        if required:
+            components['required_skills'] = len(matched_required) / len(required)
+            if matched_required:
+                strengths.append(f"Has {len(matched_required)} of {len(required)} required skills: "
+                                 f"{', '.join(matched_required)}")
+            if missing_skills:
+                weaknesses.append(f"Missing required skills: {', '.join(missing_skills)}")
+                suggestions.append(f"Add evidence of {', '.join(missing_skills[:5])} (projects, coursework or work)")
+
+        preferred = profile.get('preferred_skills') or []
+        matched_preferred = _matched(preferred, resume_skills)
+        if preferred:
+            components['preferred_skills'] = len(matched_preferred) / len(preferred)
+            if matched_preferred:
+                strengths.append(f"Also has preferred skills: {', '.join(matched_preferred)}")
+            missing_skills += [skill for skill in preferred if skill not in matched_preferred]
+
+        min_years = profile.get('min_years_experience')
+        if min_years:
+            years = resume_years_of_experience(resume_text)
+            # Unknown experience counts half rather than zero; the text may just not state it
+            components['experience'] = 0.5 if years is None else min(years / min_years, 1.0)
+            if years is not None and years >= min_years:
+                strengths.append(f"Meets the {min_years}+ years experience requirement")
+            else:
+                weaknesses.append(f"Does not clearly show {min_years}+ years of experience")
+                suggestions.append(f"State total years of relevant experience (the role asks for {min_years}+)")
+
+        education = profile.get('education') or {}
+        if education.get('level'):
+            needed = EDUCATION_LEVELS.index(education['level'])
+            found = education_level(resume_text)
+            have = EDUCATION_LEVELS.index(found) if found else -1
+            components['education'] = 1.0 if have >= needed else 0.5 if have == needed - 1 else 0.0
+            if have >= needed:
+                strengths.append(f"Meets the education requirement ({education['level']} or higher)")
+            else:
+                weaknesses.append(f"Education requirement ({education['level']}) not evident")
+
+        certifications = profile.get('certifications') or []
+        missing_certifications = [certification for certification in certifications
+                                  if not _certification_matched(certification, resume_lower)]
+        if certifications:
+            components['certifications'] = 1 - len(missing_certifications) / len(certifications)
+            if missing_certifications:
+                suggestions.append(f"Consider certifications the role lists: {', '.join(missing_certifications)}")
+
+        if components:
+            total_weight = sum(WEIGHTS[name] for name in components)
+            score = round(100 * sum(WEIGHTS[name] * value for name, value in components.items()) / total_weight, 1)
+        else:
+            score = 50.0
+            weaknesses.append('Job has no structured requirements to score against')
+
+        return {
+            'relevance_score': score,
+            'verdict': _verdict(score),
+            'missing_skills': missing_skills,
+            'missing_certifications': missing_certifications,
+            'missing_projects': [],
+            'improvement_suggestions': suggestions,
+            'strengths': strengths,
+            'weaknesses': weaknesses
+        }
+
+# Global local scorer instance
+local_scorer = LocalScorer()
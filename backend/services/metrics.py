@@ -0,0 +1,434 @@
+"""
+Metrics Service
+Low-overhead counters, gauges and histograms rendered in the Prometheus text format at /metrics.
+With METRICS_BACKEND=redis every process flushes its counter/histogram increments and current
+gauge values to Redis, and a scrape of any process reports the sum over all of them
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import hmac
+import json
+import math
+import os
+import socket
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str,
+                 labelnames: Iterable[str] = (), aggregate: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Gauges read from the shared database at scrape time are the same in every process: not summed
+        self.aggregate = aggregate
+        self._lock = registry.lock
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: Tuple) -> Tuple:
+        return tuple(zip(self.labelnames, key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            return [('_total', self._labels(key), value) for key, value in self._values.items()]
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        """This process' current value"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            return [('', self._labels(key), value) for key, value in self._values.items()]
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str,
+                 labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts (the last slot is +Inf), then sum and count
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+
+        samples = []
+        for key, state in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state):
+                cumulative += count
+                samples.append(('_bucket', labels + (('le', _format_value(bound)),), cumulative))
+            samples.append(('_sum', labels, state[-2]))
+            samples.append(('_count', labels, state[-1]))
+        return samples
+
+class RedisMetricsStore:
+    """Sums every process' metrics in Redis: increments for counters/histograms, live values for gauges"""
+
+    def __init__(self, url: str, gauge_ttl: float, prefix: str = 'resume_analyzer:metrics'):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("The redis package is required for METRICS_BACKEND=redis")
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._gauge_ttl = max(int(gauge_ttl), 1)
+
+    def push(self, increments: Dict[str, float], gauges: Dict[str, float], process: str) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for field, amount in increments.items():
+            pipeline.hincrbyfloat(f'{self._prefix}:samples', field, amount)
+        gauge_key = f'{self._prefix}:gauges:{process}'
+        pipeline.delete(gauge_key)
+        if gauges:
+            pipeline.hset(gauge_key, mapping=gauges)
+            pipeline.expire(gauge_key, self._gauge_ttl)
+        pipeline.execute()
+
+    def read(self) -> Dict[str, float]:
+        totals = {field.decode('utf-8'): float(value)
+                  for field, value in self._client.hgetall(f'{self._prefix}:samples').items()}
+        # Gauge hashes of processes that stopped flushing expire, so only live processes are summed
+        for key in self._client.scan_iter(match=f'{self._prefix}:gauges:*'):
+            for field, value in self._client.hgetall(key).items():
+                field = field.decode('utf-8')
+                totals[field] = totals.get(field, 0.0) + float(value)
+        return totals
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+        self.store: Optional[RedisMetricsStore] = None
+        self.flush_seconds = 5.0
+        self.process = f'{socket.gethostname()}:{os.getpid()}'
+        self._flushed = {}
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._configured = False
+        self.flush_errors = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run collector (which sets gauges) before every render"""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def init_app(self, app) -> None:
+        if 'metrics' not in app.extensions:
+            app.extensions['metrics'] = self
+            install_request_metrics(app)
+            install_query_metrics(app)
+
+        # create_app may run more than once per process; keep the counters and the flush thread
+        if self._configured:
+            return
+        self._configured = True
+
+        backend = app.config.get('METRICS_BACKEND', 'memory')
+        self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', 5)
+        if backend == 'redis':
+            self.store = RedisMetricsStore(app.config['METRICS_REDIS_URL'], gauge_ttl=self.flush_seconds * 3 + 5)
+            self._start_flusher()
+        elif backend != 'memory':
+            raise ValueError(f"Unsupported METRICS_BACKEND: {backend}")
+
+    def _start_flusher(self) -> None:
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def _after_fork(self) -> None:
+        # A forked worker starts from zero: the parent keeps reporting what it counted itself
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric._lock = self.lock
+            metric._values.clear()
+        self._flushed = {}
+        self.process = f'{socket.gethostname()}:{os.getpid()}'
+        if self.store is not None:
+            self._start_flusher()
+
+    @staticmethod
+    def _field(name: str, suffix: str, labels: Tuple) -> str:
+        return json.dumps([name, suffix, labels])
+
+    def local_samples(self, aggregated: Optional[bool] = None) -> Dict[str, float]:
+        samples = {}
+        for metric in list(self.metrics.values()):
+            if aggregated is not None and metric.aggregate != aggregated:
+                continue
+            for suffix, labels, value in metric.samples():
+                samples[self._field(metric.name, suffix, labels)] = value
+        return samples
+
+    def flush(self) -> None:
+        """Push this process' increments since the last flush and its current gauge values"""
+        if self.store is None:
+            return
+        with self._flush_lock:
+            increments, gauges = {}, {}
+            current = self.local_samples(aggregated=True)
+            for field, value in current.items():
+                name = json.loads(field)[0]
+                if self.metrics[name].kind == 'gauge':
+                    gauges[field] = value
+                else:
+                    delta = value - self._flushed.get(field, 0)
+                    if delta:
+                        increments[field] = delta
+            try:
+                self.store.push(increments, gauges, self.process)
+            except Exception as e:
+                # Keep the increments for the next attempt
+                self.flush_errors += 1
+                print(f"Error flushing metrics: {e}")
+                return
+            self._flushed = {field: value for field, value in current.items() if field not in gauges}
+
+    def render(self) -> str:
+        """The Prometheus text exposition (version 0.0.4) of every metric"""
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error in metrics collector: {e}")
+
+        if self.store is not None:
+            self.flush()
+            samples = self.store.read()
+        else:
+            samples = self.local_samples(aggregated=True)
+        samples.update(self.local_samples(aggregated=False))
+
+        by_metric = {}
+        for field, value in samples.items():
+            name, suffix, labels = json.loads(field)
+            by_metric.setdefault(name, []).append((suffix, labels, value))
+
+        lines = []
+        for name in sorted(by_metric):
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue  # Flushed by a process running a different version
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for suffix, labels, value in sorted(by_metric[name], key=_sample_order):
+                label_text = ','.join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                lines.append(f'{name}{suffix}{{{label_text}}} {_format_value(value)}' if label_text
+                             else f'{name}{suffix} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+def _sample_order(sample):
+    suffix, labels, _ = sample
+    # Buckets in ascending le order within each label set, then _sum and _count
+    plain = [(key, value) for key, value in labels if key != 'le']
+    bound = next((float(value.replace('+Inf', 'inf')) for key, value in labels if key == 'le'), 0.0)
+    return plain, suffix != '_bucket', suffix, bound
+
+metrics = MetricsRegistry()
+
+# HTTP
+http_requests = Counter(metrics, 'http_requests', 'HTTP requests by route and status',
+                        ['blueprint', 'route', 'method', 'status'])
+http_request_duration = Histogram(metrics, 'http_request_duration_seconds', 'HTTP request latency',
+                                  ['blueprint', 'route', 'method'])
+http_request_db_queries = Histogram(metrics, 'http_request_db_queries', 'Database queries per HTTP request',
+                                    ['blueprint', 'route'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+http_request_db_duration = Histogram(metrics, 'http_request_db_duration_seconds',
+                                     'Time spent in database queries per HTTP request', ['blueprint', 'route'])
+
+# Database
+db_query_duration = Histogram(metrics, 'db_query_duration_seconds', 'Database query latency',
+                              ['engine', 'operation'],
+                              buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+# Analysis queue and workers
+analysis_queue_depth = Gauge(metrics, 'analysis_queue_depth', 'Analyses waiting or running, by status',
+                             ['status'], aggregate=False)
+analysis_queue_oldest_age = Gauge(metrics, 'analysis_queue_oldest_age_seconds',
+                                  'Age of the oldest pending (since queued) or processing (since started) analysis',
+                                  ['status'], aggregate=False)
+analysis_workers_busy = Gauge(metrics, 'analysis_workers_busy', 'Analyses currently running')
+analysis_worker_busy_seconds = Counter(metrics, 'analysis_worker_busy_seconds',
+                                       'Time spent running analyses (rate() / workers = utilization)')
+analysis_runs = Counter(metrics, 'analysis_runs', 'Analysis runs by outcome', ['outcome'])
+analysis_stage_duration = Histogram(metrics, 'analysis_stage_duration_seconds', 'Analysis pipeline stage latency',
+                                    ['stage'], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60))
+
+# LLM
+llm_request_duration = Histogram(metrics, 'llm_request_duration_seconds', 'LLM call latency',
+                                 ['backend', 'outcome'], buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 15, 20, 30, 60))
+llm_tokens = Counter(metrics, 'llm_tokens', 'Estimated LLM tokens sent and received', ['backend', 'direction'])
+llm_errors = Counter(metrics, 'llm_errors', 'Failed LLM calls by error class', ['backend', 'error_class'])
+gemini_breaker_state = Gauge(metrics, 'gemini_breaker_state',
+                             'Gemini circuit breaker of the scraped process (0 closed, 1 half-open, 2 open)',
+                             aggregate=False)
+
+# Parsing
+resume_parse_duration = Histogram(metrics, 'resume_parse_duration_seconds', 'Resume parse time by file type',
+                                  ['file_type'])
+jd_pdf_extract_duration = Histogram(metrics, 'jd_pdf_extract_duration_seconds', 'JD PDF text extraction time')
+
+def install_request_metrics(app) -> None:
+    """Time every request and count its database queries, per blueprint and route template"""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.db_query_count = 0
+        g.db_query_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        blueprint = request.blueprint or 'app'
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_requests.inc(blueprint=blueprint, route=route, method=request.method, status=response.status_code)
+        http_request_duration.observe(time.perf_counter() - started, blueprint=blueprint, route=route,
+                                      method=request.method)
+        http_request_db_queries.observe(g.get('db_query_count', 0), blueprint=blueprint, route=route)
+        http_request_db_duration.observe(g.get('db_query_seconds', 0.0), blueprint=blueprint, route=route)
+        return response
+
+def install_query_metrics(app) -> None:
+    """Time every query on every engine (primary and replica), attributing it to the current request"""
+    from __init__ import db
+    from services.query_budget import record_statement
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_query_started'].pop()
+        elapsed = time.perf_counter() - started
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        db_query_duration.observe(elapsed, engine=conn.engine.url.get_backend_name(), operation=operation)
+        if has_request_context():
+            g.db_query_count = g.get('db_query_count', 0) + 1
+            g.db_query_seconds = g.get('db_query_seconds', 0.0) + elapsed
+            record_statement(statement, elapsed)
+
+    def handle_error(exception_context):
+        # after_cursor_execute is skipped for failed statements; drop their start time
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('metrics_query_started'):
+            connection.info['metrics_query_started'].pop()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', before_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+                event.listen(engine, 'handle_error', handle_error)
+
+def request_query_stats() -> Tuple[int, float]:
+    """(queries, seconds in queries) so far in the current request"""
+    if not has_request_context():
+        return 0, 0.0
+    return g.get('db_query_count', 0), g.get('db_query_seconds', 0.0)
+
+def collect_queue_metrics() -> None:
+    """Queue depth and age from the database (the same in every process, so not summed)"""
+    from services.health import queue_snapshot
+
+    for status, queue in queue_snapshot().items():
+        analysis_queue_depth.set(queue['count'], status=status)
+        analysis_queue_oldest_age.set(queue['oldest_age_seconds'], status=status)
+
+def collect_breaker_metrics() -> None:
+    from services.circuit_breaker import gemini_breaker
+    gemini_breaker_state.set(gemini_breaker.stats()['state_code'])
+
+metrics.add_collector(collect_queue_metrics)
+metrics.add_collector(collect_breaker_metrics)
+
+def metrics_authorized() -> bool:
+    """True unless METRICS_TOKEN is set and the request does not carry it as a bearer token"""
+    token = current_app.config.get('METRICS_TOKEN')
+    return not token or hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
@@ -0,0 +1,109 @@
+"""
+Pipeline Timings
+Per-stage wall-clock timings for one analysis run, stored on ResumeAnalysis as integer
+milliseconds (one column per stage), and p50/p95/p99 reports over them computed in SQL
+"""
+from __init__ import db
+from models import JobDescription, ResumeAnalysis, TIMING_STAGES
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, literal_column, select, union_all
+from typing import Dict, List, Optional
+import time
+
+PERCENTILES = (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99))
+
+class StageTimer:
+    """Collects how long each named stage of one analysis took"""
+
+    def __init__(self):
+        self.timings: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            # A stage entered more than once (e.g. a retry) accumulates
+            self.timings[name] = self.timings.get(name, 0) + round((time.perf_counter() - started) * 1000)
+
+    def finish(self) -> Dict[str, int]:
+        """The stage timings plus the total since the timer was created"""
+        return dict(self.timings, total=round((time.perf_counter() - self._started) * 1000))
+
+def _stage_rows(since: datetime, job_ids: Optional[List[int]] = None):
+    """(stage, job_id, ms) rows for analyses completed since `since`, one per recorded stage"""
+    table = ResumeAnalysis.__table__
+    selects = []
+    for stage in TIMING_STAGES:
+        column = table.c[f'{stage}_ms']
+        query = select(literal_column(f"'{stage}'").label('stage'), table.c.job_id, column.label('ms'))\
+            .where(column.isnot(None))\
+            .where(table.c.analysis_completed_at >= since)
+        if job_ids is not None:
+            query = query.where(table.c.job_id.in_(job_ids))
+        selects.append(query)
+    return union_all(*selects).subquery()
+
+def _percentiles(rows, by_job: bool) -> List[Dict]:
+    """Nearest-rank percentiles per stage (and per job) using window functions"""
+    partition = [rows.c.stage] + ([rows.c.job_id] if by_job else [])
+    ranked = select(
+        *partition,
+        rows.c.ms,
+        func.row_number().over(partition_by=partition, order_by=rows.c.ms).label('position'),
+        func.count().over(partition_by=partition).label('samples')
+    ).subquery()
+
+    columns = [ranked.c.stage] + ([ranked.c.job_id] if by_job else [])
+    # The p-th percentile is the smallest value whose position reaches p * samples
+    query = select(
+        *columns,
+        func.max(ranked.c.samples).label('count'),
+        *[func.min(case((ranked.c.position >= fraction * ranked.c.samples, ranked.c.ms))).label(name)
+          for name, fraction in PERCENTILES],
+        func.avg(ranked.c.ms).label('avg_ms'),
+        func.max(ranked.c.ms).label('max_ms')
+    ).group_by(*columns)
+    return [row._asdict() for row in db.session.execute(query)]
+
+def _stage_summary(row: Dict) -> Dict:
+    summary = {'count': row['count'], 'avg_ms': round(float(row['avg_ms']), 1), 'max_ms': row['max_ms']}
+    summary.update({name: row[name] for name, _ in PERCENTILES})
+    return summary
+
+def timing_report(hours: float = 24, job_id: Optional[int] = None, job_limit: int = 20) -> Dict:
+    """p50/p95/p99 per stage overall and for the busiest jobs (or one job) over the last `hours`"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+
+    if job_id is not None:
+        job_ids = [job_id]
+    else:
+        busiest = db.session.query(ResumeAnalysis.job_id)\
+            .filter(ResumeAnalysis.total_ms.isnot(None))\
+            .filter(ResumeAnalysis.analysis_completed_at >= since)\
+            .group_by(ResumeAnalysis.job_id)\
+            .order_by(func.count().desc())\
+            .limit(job_limit)
+        job_ids = [row.job_id for row in busiest]
+
+    overall = {row['stage']: _stage_summary(row)
+               for row in _percentiles(_stage_rows(since, None if job_id is None else job_ids), by_job=False)}
+
+    jobs = {}
+    if job_ids:
+        titles = dict(db.session.query(JobDescription.id, JobDescription.title).filter(JobDescription.id.in_(job_ids)))
+        for row in _percentiles(_stage_rows(since, job_ids), by_job=True):
+            job = jobs.setdefault(row['job_id'], {'job_id': row['job_id'], 'title': titles.get(row['job_id']),
+                                                  'stages': {}})
+            job['stages'][row['stage']] = _stage_summary(row)
+
+    return {
+        'window_hours': hours,
+        'since': since.isoformat(),
+        'stages': list(TIMING_STAGES),
+        'overall': overall,
+        'jobs': sorted(jobs.values(), key=lambda job: -job['stages'].get('total', {}).get('count', 0))
+    }
@@ -0,0 +1,210 @@
+"""
+Prompt Builder Service
+Builds token-budgeted analysis prompts: the job section (its structured requirement set plus a
+short summary) is built once per job version and reused for every candidate, and the resume
+fills what is left of the total
+"""
+from services.job_requirements import format_requirements, has_requirements, job_fingerprint, requirement_profile
+from services.response_cache import LRUCache
+from typing import Callable, Dict, List, Tuple
+import math
+import re
+
+# Lines that carry requirements are kept first when a section must shrink
+HIGH_VALUE_PATTERN = re.compile(
+    r'\b(require[sd]?|must|should|experience|years?|skills?|proficien\w*|knowledge|degree|bachelor|master|'
+    r'phd|certifi\w*|qualif\w*|responsib\w*|familiar\w*|expert\w*|python|java|sql|aws|cloud)\b',
+    re.IGNORECASE
+)
+# Boilerplate that rarely changes a match decision is dropped first
+LOW_VALUE_PATTERN = re.compile(
+    r'\b(about us|our company|benefits?|perks?|salary|compensation|equal opportunity|eeo|diversity|'
+    r'apply now|how to apply|privacy|disclaimer|follow us|www\.|https?://)\b',
+    re.IGNORECASE
+)
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?;])\s+|\s+[|•]\s+')
+LONG_LINE_TOKENS = 60
+TRUNCATION_MARKER = '[...]'
+
+INSTRUCTIONS = """Analyze the resume below against the job description and provide a detailed assessment.
+
+Please provide your analysis in the following JSON format:
+{
+    "relevance_score": 85,
+    "verdict": "High",
+    "missing_skills": ["Python", "Docker"],
+    "missing_certifications": ["AWS Certified"],
+    "missing_projects": ["Machine Learning Project"],
+    "improvement_suggestions": [
+        "Add more Python projects to your portfolio",
+        "Consider getting AWS certification",
+        "Include specific metrics in your experience descriptions"
+    ],
+    "strengths": [
+        "Strong educational background",
+        "Relevant work experience"
+    ],
+    "weaknesses": [
+        "Limited project portfolio",
+        "Missing some key technical skills"
+    ]
+}
+
+Scoring Guidelines:
+- 90-100: Exceptional match, highly recommended
+- 80-89: Strong match, good candidate
+- 70-79: Moderate match, acceptable with improvements
+- 60-69: Weak match, needs significant improvement
+- Below 60: Poor match, not recommended
+
+Verdict Guidelines:
+- High: 80+ score
+- Medium: 60-79 score
+- Low: Below 60 score
+
+Please ensure the response is valid JSON format only.
+"""
+
+def estimate_tokens(text: str) -> int:
+    """Offline token estimate (~4 characters or ~0.75 words per token, whichever is larger)"""
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 4 / 3))
+
+class PromptBuilder:
+    def __init__(self, max_tokens: int = 6000, job_max_tokens: int = 2000,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        self.max_tokens = max_tokens
+        self.job_max_tokens = job_max_tokens
+        self.count_tokens = token_counter
+        self._job_sections = LRUCache(max_entries=512, ttl=24 * 3600)
+        self._configured = False
+
+    def init_app(self, app) -> None:
+        # create_app may run more than once per process; keep the cached job sections
+        if self._configured:
+            return
+        self._configured = True
+        self.max_tokens = app.config.get('PROMPT_MAX_TOKENS', self.max_tokens)
+        self.job_max_tokens = app.config.get('PROMPT_JOB_MAX_TOKENS', self.job_max_tokens)
+
+    def job_section(self, job) -> str:
+        """The job's condensed description, built once per version of its text and PDF"""
+        cache_key = (job.id, job_fingerprint(job), self.job_max_tokens)
+        section = self._job_sections.get(cache_key)
+        if section is None:
+            section = self._build_job_section(job)
+            self._job_sections.set(cache_key, section)
+        return section
+
+    def build(self, job_section: str, resume_text: str) -> Tuple[str, Dict]:
+        """Assemble the prompt (static instructions, then job, then resume) and its token sizes"""
+        job_text, job_truncated = self.fit(job_section, self.job_max_tokens)
+
+        instruction_tokens = self.count_tokens(INSTRUCTIONS)
+        job_tokens = self.count_tokens(job_text)
+        resume_budget = max(self.max_tokens - instruction_tokens - job_tokens, 0)
+        resume_text, resume_truncated = self.fit(resume_text, resume_budget)
+
+        # Static text first, then the per-job part, so every candidate of a job shares the longest prefix
+        prompt = f"{INSTRUCTIONS}\nJOB DESCRIPTION:\n{job_text}\n\nRESUME:\n{resume_text}\n"
+        return prompt, {
+            'instructions': instruction_tokens,
+            'job': job_tokens,
+            'resume': self.count_tokens(resume_text),
+            'total': self.count_tokens(prompt),
+            'budget': self.max_tokens,
+            'job_truncated': job_truncated,
+            'resume_truncated': resume_truncated
+        }
+
+    def fit(self, text: str, budget: int) -> Tuple[str, bool]:
+        """Shrink text to budget tokens: drop boilerplate, keep high-value lines, then truncate"""
+        if self.count_tokens(text) <= budget:
+            return text, False
+
+        lines = self._unique_lines(text)
+        ranked = sorted(range(len(lines)), key=lambda i: (-self._line_value(lines[i]), i))
+
+        kept = set()
+        used = 0
+        for i in ranked:
+            if self._line_value(lines[i]) < 0:
+                break
+            cost = self.count_tokens(lines[i]) + 1
+            if used + cost > budget:
+                continue
+            kept.add(i)
+            used += cost
+
+        condensed = '\n'.join(lines[i] for i in sorted(kept))
+        if not condensed and lines:
+            condensed = lines[0]
+        if self.count_tokens(condensed) > budget:
+            # A single huge line: cut it at the character length matching the budget
+            condensed = condensed[:max(budget * 4 - len(TRUNCATION_MARKER), 0)] + TRUNCATION_MARKER
+        return condensed, True
+
+    def stats(self) -> Dict:
+        return {
+            'max_tokens': self.max_tokens,
+            'job_max_tokens': self.job_max_tokens,
+            'job_sections': self._job_sections.stats()
+        }
+
+    def _build_job_section(self, job) -> str:
+        from services.jd_pdf_parser import JDPDFParser
+
+        header = [f"Job Title: {job.title}"]
+        for label, value in (('Company', job.company), ('Location', job.location),
+                             ('Experience Level', job.experience_level), ('Employment Type', job.employment_type)):
+            if value:
+                header.append(f"{label}: {value}")
+
+        profile = requirement_profile(job)
+        if has_requirements(profile):
+            # The structured requirements replace the raw text; a short summary keeps the role's context
+            sections = [('Requirements', format_requirements(profile)), ('Role Summary', job.description)]
+            summary_budget = self.job_max_tokens // 4
+        else:
+            # Nothing could be extracted: fall back to the raw text, in priority order
+            sections = [('Requirements', job.requirements), ('Job Description', job.description)]
+            if job.jd_pdf_path:
+                sections.append(('Additional Information from PDF', JDPDFParser.extract_text(job.jd_pdf_path)))
+            summary_budget = self.job_max_tokens
+
+        parts = ['\n'.join(header)]
+        remaining = self.job_max_tokens - self.count_tokens(parts[0])
+        for index, (label, text) in enumerate(sections):
+            if not text or remaining <= 0:
+                continue
+            budget = remaining if index == 0 else min(remaining, summary_budget)
+            fitted, _ = self.fit(text.strip(), budget - self.count_tokens(label) - 2)
+            parts.append(f"{label}:\n{fitted}")
+            remaining -= self.count_tokens(parts[-1]) + 2
+        return '\n\n'.join(parts)
+
+    def _unique_lines(self, text: str) -> List[str]:
+        seen = set()
+        lines = []
+        for raw_line in text.splitlines():
+            raw_line = ' '.join(raw_line.split())
+            # Extracted PDF text often has whole paragraphs on one line; rank them sentence by sentence
+            pieces = SENTENCE_BREAK.split(raw_line) if self.count_tokens(raw_line) > LONG_LINE_TOKENS else [raw_line]
+            for line in pieces:
+                if line and line.lower() not in seen:
+                    seen.add(line.lower())
+                    lines.append(line)
+        return lines
+
+    def _line_value(self, line: str) -> int:
+        if LOW_VALUE_PATTERN.search(line):
+            return -1
+        value = len(HIGH_VALUE_PATTERN.findall(line))
+        if line.startswith(('-', '*', '•')) or re.match(r'^\d+[.)]', line):
+            value += 1
+        return value
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder()
@@ -0,0 +1,119 @@
+"""
+Query Budget
+Per-request SQL accounting on top of the metrics query hooks: repeated statements (N+1 patterns),
+a slow-query log with normalized SQL, X-DB-* debug headers, and a per-endpoint query budget that
+fails requests under test and logs a warning in production
+"""
+from collections import Counter as StatementCounter
+from flask import current_app, g, has_request_context, request
+from functools import wraps
+from services.metrics import Counter, metrics, request_query_stats
+from typing import Dict, List
+import logging
+import re
+
+logger = logging.getLogger('slow_query')
+
+# Slow statements kept per request for the debug header and the report
+MAX_SLOW_PER_REQUEST = 20
+
+db_slow_queries = Counter(metrics, 'db_slow_queries', 'Statements slower than SLOW_QUERY_MS', ['operation'])
+query_budget_exceeded = Counter(metrics, 'query_budget_exceeded', 'Requests over their declared query budget',
+                                ['blueprint', 'route'])
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryBudgetExceeded(AssertionError):
+    """An endpoint ran more queries than its @query_budget allows"""
+
+def normalize_sql(statement: str) -> str:
+    """The statement with literals and bind parameters as ?, IN lists collapsed, on one line"""
+    sql = _STRING.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+def record_statement(statement: str, elapsed: float) -> None:
+    """Called by the metrics query hook for every statement run inside a request"""
+    if 'db_statements' not in g:
+        g.db_statements = StatementCounter()
+        g.db_slow_queries = []
+    g.db_statements[statement] += 1
+
+    slow_ms = current_app.config.get('SLOW_QUERY_MS', 200)
+    if slow_ms is None or elapsed * 1000 < slow_ms:
+        return
+    sql = normalize_sql(statement)
+    db_slow_queries.inc(operation=sql.split(' ', 1)[0].upper() if sql else 'OTHER')
+    if len(g.db_slow_queries) < MAX_SLOW_PER_REQUEST:
+        g.db_slow_queries.append({'sql': sql, 'ms': round(elapsed * 1000, 1)})
+    logger.warning('slow query %.1fms %s %s: %s', elapsed * 1000, request.method, request.path, sql)
+
+def repeated_statements(min_count: int = 2, limit: int = 5) -> List[Dict]:
+    """The current request's most repeated statements, normalized (the usual sign of an N+1)"""
+    if not has_request_context() or 'db_statements' not in g:
+        return []
+    totals = StatementCounter()
+    for statement, count in g.db_statements.items():
+        totals[normalize_sql(statement)] += count
+    return [{'sql': sql, 'count': count} for sql, count in totals.most_common(limit) if count >= min_count]
+
+def request_query_report() -> Dict:
+    """Query count, DB time, slow statements and repeated statements for the current request"""
+    count, seconds = request_query_stats()
+    return {
+        'count': count,
+        'ms': round(seconds * 1000, 1),
+        'slow': list(g.get('db_slow_queries', [])) if has_request_context() else [],
+        'repeated': repeated_statements()
+    }
+
+def query_budget(max_queries: int):
+    """Declare the most queries a request to this endpoint may run (including auth and pagination)"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.query_budget = max_queries
+            response = f(*args, **kwargs)
+
+            count, _ = request_query_stats()
+            if count > max_queries:
+                route = request.url_rule.rule if request.url_rule else request.path
+                query_budget_exceeded.inc(blueprint=request.blueprint or 'app', route=route)
+                repeated = '; '.join(f"{item['count']}x {item['sql']}" for item in repeated_statements())
+                message = f"{request.method} {route} ran {count} queries, budget {max_queries}. Repeated: {repeated}"
+                if current_app.testing or current_app.config.get('QUERY_BUDGET_ENFORCE'):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+        return decorated_function
+    return decorator
+
+def install_query_budget(app) -> None:
+    """X-DB-* headers in debug mode, and a warning for requests repeating one statement many times"""
+
+    @app.after_request
+    def report_request_queries(response):
+        if 'db_statements' not in g:
+            return response
+
+        repeat_warn = app.config.get('QUERY_REPEAT_WARN', 20)
+        if repeat_warn and max(g.db_statements.values()) >= repeat_warn:
+            top = repeated_statements(min_count=repeat_warn, limit=1)
+            if top:
+                logger.warning('possible N+1 in %s %s: %dx %s', request.method, request.path,
+                               top[0]['count'], top[0]['sql'])
+
+        if app.debug or app.config.get('QUERY_DEBUG_HEADERS'):
+            count, seconds = request_query_stats()
+            response.headers['X-DB-Query-Count'] = str(count)
+            response.headers['X-DB-Query-Time-Ms'] = f'{seconds * 1000:.1f}'
+            response.headers['X-DB-Slow-Queries'] = str(len(g.db_slow_queries))
+            if 'query_budget' in g:
+                response.headers['X-DB-Query-Budget'] = str(g.query_budget)
+        return response
@@ -0,0 +1,180 @@
+"""
+Queue ETA
+Wait and completion estimates for queued analyses from measured throughput: exponentially weighted
+moving averages of per-analysis service time (each completed run's total) and of live worker
+concurrency (analyses processing when one is claimed). Within a (priority, job) flow analyses are
+served in queue_position order, and each flow drains at the share of the workers the scheduler
+gives it while the other flows are backlogged. Each process keeps its own averages and seeds them
+from recently completed analyses on first use.
+"""
+from __init__ import db
+from models import ResumeAnalysis
+from services.analysis_scheduler import analysis_scheduler
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+
+class EWMA:
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+        self.samples = 0
+
+    def update(self, sample: float) -> None:
+        self.value = sample if self.value is None else self.alpha * sample + (1 - self.alpha) * self.value
+        self.samples += 1
+
+class QueueETA:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.alpha = 0.2
+        self.default_service_seconds = 30.0
+        self.warm_samples = 50
+        self.service_time = EWMA(self.alpha)
+        self.concurrency = EWMA(self.alpha)
+        self._seeded = False
+
+    def init_app(self, app) -> None:
+        self.alpha = app.config.get('QUEUE_ETA_ALPHA', 0.2)
+        self.default_service_seconds = app.config.get('QUEUE_ETA_DEFAULT_SERVICE_SECONDS', 30.0)
+        self.warm_samples = app.config.get('QUEUE_ETA_WARM_SAMPLES', 50)
+        self.service_time.alpha = self.alpha
+        self.concurrency.alpha = self.alpha
+
+    def observe_service(self, seconds: float) -> None:
+        """A completed analysis took this long end to end"""
+        with self.lock:
+            self.service_time.update(seconds)
+
+    def observe_concurrency(self, processing: int) -> None:
+        """Analyses processing (including the one just claimed) across all workers"""
+        with self.lock:
+            self.concurrency.update(max(processing, 1))
+
+    def _seed(self) -> None:
+        """Fold the most recently completed analyses' run times into a fresh process' average"""
+        self._seeded = True
+        if self.service_time.samples or not self.warm_samples:
+            return
+        recent = db.session.query(ResumeAnalysis.total_ms)\
+            .filter(ResumeAnalysis.analysis_status == 'completed')\
+            .filter(ResumeAnalysis.total_ms.isnot(None))\
+            .order_by(ResumeAnalysis.analysis_completed_at.desc())\
+            .limit(self.warm_samples)\
+            .all()
+        with self.lock:
+            for (total_ms,) in reversed(recent):
+                self.service_time.update(total_ms / 1000)
+
+    def estimates(self) -> Dict:
+        """Current service time, concurrency and throughput estimates"""
+        if not self._seeded:
+            self._seed()
+        with self.lock:
+            service = self.service_time.value or self.default_service_seconds
+            concurrency = max(self.concurrency.value or 1.0, 1.0)
+            samples = self.service_time.samples
+        return {
+            'service_seconds': round(service, 3),
+            'concurrency': round(concurrency, 3),
+            'throughput_per_minute': round(concurrency / service * 60, 3),
+            'samples': samples
+        }
+
+    @staticmethod
+    def _start_seconds(ahead: float, processing: int, estimates: Dict) -> float:
+        """Seconds until a worker is free for an item with `ahead` items (all jobs) before it"""
+        # Workers busy right now can exceed the average; slots open every service / concurrency
+        concurrency = max(estimates['concurrency'], processing, 1)
+        waiting_for = ahead + processing + 1 - concurrency
+        return max(waiting_for, 0) * estimates['service_seconds'] / concurrency
+
+    @staticmethod
+    def backlog() -> Tuple[Dict[Tuple[str, int], int], int]:
+        """Pending analyses per (priority, job) and the number processing (one grouped query)"""
+        rows = db.session.query(ResumeAnalysis.analysis_status, ResumeAnalysis.priority, ResumeAnalysis.job_id,
+                                func.count(ResumeAnalysis.id))\
+            .filter(ResumeAnalysis.analysis_status.in_(('pending', 'processing')))\
+            .group_by(ResumeAnalysis.analysis_status, ResumeAnalysis.priority, ResumeAnalysis.job_id)\
+            .all()
+        pending = {(priority, job_id): count for status, priority, job_id, count in rows if status == 'pending'}
+        processing = sum(count for status, _, _, count in rows if status == 'processing')
+        return pending, processing
+
+    def pending_eta(self, ahead: int, share: float, processing: int, estimates: Dict) -> Dict:
+        """ETA for a pending analysis with `ahead` analyses before it in a flow getting `share` of the workers"""
+        # Analyses of other flows are served meanwhile in proportion to their shares
+        start = self._start_seconds(ahead / share if share else ahead, processing, estimates)
+        return {
+            'ahead': ahead,
+            'estimated_start_seconds': round(start, 3),
+            'estimated_completion_seconds': round(start + estimates['service_seconds'], 3)
+        }
+
+    def processing_eta(self, started_at: Optional[datetime], estimates: Dict) -> Dict:
+        elapsed = (datetime.utcnow() - started_at).total_seconds() if started_at else 0.0
+        return {
+            'ahead': 0,
+            'estimated_start_seconds': 0.0,
+            'estimated_completion_seconds': round(max(estimates['service_seconds'] - elapsed, 0.0), 3)
+        }
+
+    def job_eta(self, job_id: int) -> Dict:
+        """Next start and full drain estimates for one job's queue, all priority classes together"""
+        estimates = self.estimates()
+        pending, processing = self.backlog()
+        flows = [flow for flow in pending if flow[1] == job_id]
+        job_pending = sum(pending[flow] for flow in flows)
+        share = sum(analysis_scheduler.share(flow, pending) for flow in flows) or 1.0
+        first = self.pending_eta(0, share, processing, estimates)
+        last = self.pending_eta(max(job_pending - 1, 0), share, processing, estimates)
+        return dict(estimates,
+                    next_start_seconds=first['estimated_start_seconds'],
+                    drain_seconds=last['estimated_completion_seconds'] if job_pending else 0.0)
+
+    def analysis_etas(self, analyses: Iterable[ResumeAnalysis]) -> Dict[int, Dict]:
+        """ETAs for the pending/processing analyses among `analyses`, keyed by id (two queries)"""
+        pending = [analysis for analysis in analyses if analysis.analysis_status == 'pending']
+        processing = [analysis for analysis in analyses if analysis.analysis_status == 'processing']
+        if not pending and not processing:
+            return {}
+
+        estimates = self.estimates()
+        backlog, processing_count = self.backlog()
+        now = datetime.utcnow()
+        etas = {analysis.id: self.processing_eta(analysis.analysis_started_at, estimates) for analysis in processing}
+
+        if pending:
+            # Analyses ahead in the same flow, counted per row through the (status, priority, job,
+            # queue_position) index instead of numbering every pending row of the flows
+            table = ResumeAnalysis.__table__
+            earlier = table.alias('earlier')
+            ahead = select(func.count()).select_from(earlier)\
+                .where(earlier.c.analysis_status == 'pending')\
+                .where(earlier.c.priority == table.c.priority)\
+                .where(earlier.c.job_id == table.c.job_id)\
+                .where(earlier.c.queue_position <= table.c.queue_position)\
+                .where(or_(earlier.c.queue_position < table.c.queue_position, earlier.c.id < table.c.id))\
+                .scalar_subquery()
+            rows = db.session.execute(
+                select(table.c.id, table.c.priority, table.c.job_id, ahead.label('ahead'))
+                .where(table.c.id.in_([analysis.id for analysis in pending]))
+                .where(table.c.analysis_status == 'pending')
+            )
+            for row in rows:
+                share = analysis_scheduler.share((row.priority, row.job_id), backlog)
+                etas[row.id] = self.pending_eta(row.ahead, share, processing_count, estimates)
+
+        for eta in etas.values():
+            eta['estimated_completion_at'] = (now + timedelta(seconds=eta['estimated_completion_seconds'])).isoformat()
+        return etas
+
+    def annotate(self, analyses: List[ResumeAnalysis], payloads: List[Dict]) -> List[Dict]:
+        """Add 'eta' (None once an analysis is no longer queued) to serialized analyses"""
+        etas = self.analysis_etas(analyses)
+        for analysis, payload in zip(analyses, payloads):
+            payload['eta'] = etas.get(analysis.id)
+        return payloads
+
+queue_eta = QueueETA()
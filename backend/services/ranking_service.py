@@ -1,15 +1,31 @@
 from __init__ import db
-from models import ResumeAnalysis
+from models import ResumeAnalysis, JobDescription, RankingChange
+from services.response_cache import LRUCache, response_cache, job_namespace
+from services.event_bus import event_bus, job_topic
+from services.db_routing import use_primary
+from services.queue_eta import queue_eta
 from datetime import datetime
-from typing import List, Dict
+from sqlalchemy.orm import undefer
+from typing import List, Dict, Optional
+from flask import current_app
 import threading
 
+RANKING_SNAPSHOT_MAX_ENTRIES = 256
+RANKING_SNAPSHOT_TTL = 3600  # seconds; versions invalidate snapshots, the TTL only bounds memory
+QUEUE_STATUS_TTL = 5  # seconds
+
+def ranking_namespace(job_id: int) -> str:
+    return f'rankings:{job_id}'
+
 class RankingService:
     def __init__(self):
-        self._lock = threading.Lock()
+        # Re-entrant: add_to_ranking and promote_high_score_resume call update_ranking under the lock
+        self._lock = threading.RLock()
+        self._snapshots = LRUCache(max_entries=RANKING_SNAPSHOT_MAX_ENTRIES, ttl=RANKING_SNAPSHOT_TTL)
+        self._queue_status_cache = LRUCache(max_entries=1024, ttl=QUEUE_STATUS_TTL)
     
-    def add_to_queue(self, analysis_id: int, job_id: int) -> int:
-        """Add a new analysis to the queue and return queue position"""
+    def add_to_queue(self, analysis_id: int, job_id: int, priority: Optional[str] = None) -> int:
+        """Add a new analysis to the queue (optionally moving it to another scheduling class) and return queue position"""
         with self._lock:
             try:
                 # Get the last queue position for this job
@@ -26,6 +42,8 @@ class RankingService:
                     analysis.queue_position = queue_position
                     analysis.is_in_queue = True
                     analysis.analysis_status = 'pending'
+                    if priority:
+                        analysis.priority = priority
                     db.session.commit()
                 
                 return queue_position
@@ -54,18 +72,22 @@ class RankingService:
                     .order_by(ResumeAnalysis.relevance_score.desc())\
                     .all()
                 
+                changes = []
+                
+                # Analyses that still hold a rank but left the completed set (e.g. reprocessing)
+                unranked = ResumeAnalysis.query\
+                    .filter(ResumeAnalysis.job_id == job_id)\
+                    .filter(ResumeAnalysis.analysis_status != 'completed')\
+                    .filter(ResumeAnalysis.rank > 0)\
+                    .all()
+                for analysis in unranked:
+                    changes.append(self._set_rank(analysis, 0))
+                
                 # Update ranks (1-based ranking)
                 for i, analysis in enumerate(analyses):
-                    old_rank = analysis.rank
-                    new_rank = i + 1
-                    analysis.rank = new_rank
-                    
-                    # If rank changed significantly, log it
-                    if old_rank is not None and abs(old_rank - new_rank) > 0:
-                        print(f"Analysis {analysis.id} rank changed from {old_rank} to {new_rank}")
-                    elif old_rank is None:
-                        print(f"Analysis {analysis.id} assigned new rank: {new_rank}")
+                    changes.append(self._set_rank(analysis, i + 1))
                 
+                self._record_changes(job_id, changes)
                 db.session.commit()
                 return analyses
             except Exception as e:
@@ -100,8 +122,10 @@ class RankingService:
                 if current_top and best_analysis.relevance_score > current_top.relevance_score:
                     # Swap ranks
                     old_top_rank = current_top.rank
-                    current_top.rank = best_analysis.rank
-                    best_analysis.rank = old_top_rank
+                    self._record_changes(job_id, [
+                        self._set_rank(current_top, best_analysis.rank),
+                        self._set_rank(best_analysis, old_top_rank)
+                    ])
                     
                     db.session.commit()
                     
@@ -126,21 +150,116 @@ class RankingService:
                 .all()
             
             # Assign new ranks
-            for i, analysis in enumerate(analyses):
-                analysis.rank = i + 1
+            self._record_changes(job_id, [self._set_rank(analysis, i + 1) for i, analysis in enumerate(analyses)])
             
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             raise Exception(f"Error re-ranking: {str(e)}")
     
+    def _set_rank(self, analysis: ResumeAnalysis, new_rank: int) -> Optional[RankingChange]:
+        """Assign a rank and describe the change for the ranking log (0 means unranked)"""
+        old_rank = analysis.rank or 0
+        if old_rank == new_rank:
+            return None
+        
+        analysis.rank = new_rank
+        if old_rank == 0:
+            change_type = 'inserted'
+        elif new_rank == 0:
+            change_type = 'removed'
+        else:
+            change_type = 'moved'
+        
+        return RankingChange(
+            job_id=analysis.job_id,
+            analysis_id=analysis.id,
+            change_type=change_type,
+            old_rank=old_rank or None,
+            new_rank=new_rank or None,
+            relevance_score=analysis.relevance_score
+        )
+    
+    def _record_changes(self, job_id: int, changes: List[Optional[RankingChange]], connection=None) -> None:
+        """Store a batch of rank changes under the job's next ranking version"""
+        changes = [change for change in changes if change is not None]
+        if not changes:
+            return
+        
+        # The row lock taken by this UPDATE serializes batches per job across processes,
+        # so versions become visible in increasing order
+        jobs = JobDescription.__table__
+        connection = connection or db.session.connection()
+        connection.execute(
+            jobs.update()
+            .where(jobs.c.id == job_id)
+            .values(ranking_version=jobs.c.ranking_version + 1)
+        )
+        version = connection.execute(
+            db.select(jobs.c.ranking_version).where(jobs.c.id == job_id)
+        ).scalar()
+        
+        for change in changes:
+            change.version = version
+            db.session.add(change)
+    
+    def get_ranking_changes(self, job_id: int, since: int) -> Optional[Dict]:
+        """Net ranking changes for a job after version `since`, or None if the job does not exist"""
+        current_version = db.session.query(JobDescription.ranking_version)\
+            .filter(JobDescription.id == job_id)\
+            .scalar()
+        
+        if current_version is None:
+            return None
+        
+        # A client ahead of the server (e.g. after a database reset) must refetch the full list
+        if since > current_version:
+            return {'version': current_version, 'since': since, 'reset': True,
+                    'inserted': [], 'moved': [], 'removed': []}
+        
+        changes = RankingChange.query\
+            .filter(RankingChange.job_id == job_id)\
+            .filter(RankingChange.version > since)\
+            .order_by(RankingChange.version.asc(), RankingChange.id.asc())\
+            .all()
+        
+        # Collapse each analysis' changes into its net effect since the client's version
+        net_changes = {}
+        for change in changes:
+            entry = net_changes.setdefault(change.analysis_id, {
+                'first_type': change.change_type,
+                'old_rank': change.old_rank
+            })
+            entry['last_type'] = change.change_type
+            entry['rank'] = change.new_rank
+            entry['relevance_score'] = change.relevance_score
+        
+        inserted, moved, removed = [], [], []
+        for analysis_id, entry in net_changes.items():
+            was_ranked = entry['first_type'] != 'inserted'
+            is_ranked = entry['last_type'] != 'removed'
+            
+            if is_ranked and not was_ranked:
+                inserted.append({'analysis_id': analysis_id, 'rank': entry['rank'],
+                                 'relevance_score': entry['relevance_score']})
+            elif was_ranked and not is_ranked:
+                removed.append(analysis_id)
+            elif is_ranked and entry['rank'] != entry['old_rank']:
+                moved.append({'analysis_id': analysis_id, 'rank': entry['rank'], 'old_rank': entry['old_rank']})
+        
+        return {
+            'version': current_version,
+            'since': since,
+            'reset': False,
+            'inserted': sorted(inserted, key=lambda item: item['rank']),
+            'moved': sorted(moved, key=lambda item: item['rank']),
+            'removed': removed
+        }
+    
     def get_job_rankings(self, job_id: int, limit: int = None) -> List[Dict]:
-        """Get current rankings for a job"""
+        """Get current rankings for a job (read-only: stored ranks are kept by the analysis pipeline)"""
         try:
-            # First, ensure all analyses have proper ranks
-            self.update_ranking(job_id, None)
-            
-            # Get analyses ordered by relevance score (descending) for proper ranking
+            # Ranks follow from the score order, so a missing snapshot never writes in a GET
             query = ResumeAnalysis.query\
                 .filter(ResumeAnalysis.job_id == job_id)\
                 .filter(ResumeAnalysis.analysis_status == 'completed')\
@@ -164,6 +283,38 @@ class RankingService:
         except Exception as e:
             raise Exception(f"Error getting rankings: {str(e)}")
     
+    def get_rankings_snapshot(self, job_id: int, limit: int = None) -> Optional[str]:
+        """Serialized {"job", "rankings"} payload, rebuilt only when the job's ranking version changes"""
+        ranking_version = response_cache.versions.get(ranking_namespace(job_id))[0]
+        job_version = response_cache.versions.get(job_namespace(job_id))[0]
+        cache_key = (job_id, ranking_version, job_version, limit)
+        
+        snapshot = self._snapshots.get(cache_key)
+        if snapshot is None:
+            # Built from the primary: a lagging replica would be cached under the new version
+            with use_primary():
+                job = JobDescription.query.options(undefer(JobDescription.application_count)).get(job_id)
+                if not job:
+                    return None
+                
+                rankings = self.get_job_rankings(job_id, limit)
+                snapshot = current_app.json.dumps({
+                    'job': job.to_dict(),
+                    'rankings': rankings,
+                    'ranking_version': job.ranking_version
+                })
+            self._snapshots.set(cache_key, snapshot)
+        
+        return snapshot
+    
+    def bump_ranking_version(self, job_id: int) -> None:
+        """Invalidate cached ranking snapshots for a job and notify its leaderboard viewers"""
+        version = response_cache.versions.bump(ranking_namespace(job_id))
+        event_bus.publish([job_topic(job_id)], 'ranking_updated', {'job_id': job_id, 'snapshot_version': version})
+    
+    def get_snapshot_stats(self) -> Dict:
+        return self._snapshots.stats()
+    
     def _get_rank_explanation(self, analysis: ResumeAnalysis, rank: int) -> str:
         """Generate explanation for why this candidate has this rank"""
         score = analysis.relevance_score
@@ -245,16 +396,28 @@ class RankingService:
                 .filter(ResumeAnalysis.analysis_status == 'completed')\
                 .count()
             
+            # Measured service time and concurrency; workers are shared with other jobs' queues
+            eta = queue_eta.job_eta(job_id)
+            
             return {
                 'total_in_queue': total_in_queue,
                 'pending': pending_analyses,
                 'processing': processing_analyses,
                 'completed': completed_analyses,
-                'estimated_wait_time': pending_analyses * 2  # Rough estimate in minutes
+                'estimated_wait_time': round(eta['drain_seconds'] / 60, 1),  # Minutes until this queue drains
+                'eta': eta
             }
         except Exception as e:
             raise Exception(f"Error getting queue status: {str(e)}")
     
+    def get_cached_queue_status(self, job_id: int) -> Dict:
+        """Queue status reused for a few seconds so leaderboard polling stays cheap"""
+        queue_status = self._queue_status_cache.get(job_id)
+        if queue_status is None:
+            queue_status = self.get_queue_status(job_id)
+            self._queue_status_cache.set(job_id, queue_status)
+        return queue_status
+    
     def remove_from_queue(self, analysis_id: int):
         """Remove an analysis from the queue"""
         with self._lock:
@@ -269,14 +432,12 @@ class RankingService:
                 raise Exception(f"Error removing from queue: {str(e)}")
     
     def get_next_in_queue(self, job_id: int) -> ResumeAnalysis:
-        """Get the next analysis to process from the queue"""
+        """Get the next analysis to process from the job's queue (interactive before bulk work, by the scheduler)"""
+        from services.analysis_scheduler import analysis_scheduler
+        
         try:
-            next_analysis = ResumeAnalysis.query\
-                .filter(ResumeAnalysis.job_id == job_id)\
-                .filter(ResumeAnalysis.is_in_queue == True)\
-                .filter(ResumeAnalysis.analysis_status == 'pending')\
-                .order_by(ResumeAnalysis.queue_position.asc())\
-                .first()
+            analysis_id = analysis_scheduler.pick(job_id=job_id)
+            next_analysis = ResumeAnalysis.query.get(analysis_id) if analysis_id else None
             
             if next_analysis:
                 # Mark as processing
@@ -291,3 +452,58 @@ class RankingService:
 
 # Global ranking service instance
 ranking_service = RankingService()
+
+def _affects_ranking(analysis: ResumeAnalysis) -> bool:
+    """True when a flushed change moves an analysis into, out of or within the completed set"""
+    state = db.inspect(analysis)
+    status_history = state.attrs.analysis_status.history
+    if status_history.has_changes():
+        return 'completed' in list(status_history.added) + list(status_history.deleted)
+    return analysis.analysis_status == 'completed' and state.attrs.relevance_score.history.has_changes()
+
+def _log_deleted_rankings(session, flush_context, instances):
+    """Record removals for ranked analyses deleted outright (e.g. with their resume)"""
+    deleted = [instance for instance in session.deleted
+               if isinstance(instance, ResumeAnalysis) and instance.rank]
+    
+    by_job = {}
+    for analysis in deleted:
+        by_job.setdefault(analysis.job_id, []).append(RankingChange(
+            job_id=analysis.job_id,
+            analysis_id=analysis.id,
+            change_type='removed',
+            old_rank=analysis.rank,
+            relevance_score=analysis.relevance_score
+        ))
+    
+    # Use the session's connection directly; ORM queries here would trigger a nested flush
+    for job_id, changes in by_job.items():
+        ranking_service._record_changes(job_id, changes, connection=session.connection())
+
+def _collect_ranking_changes(session, flush_context):
+    changed = session.info.setdefault('ranking_jobs', set())
+    for instance in session.deleted:
+        if isinstance(instance, ResumeAnalysis):
+            changed.add(instance.job_id)
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, ResumeAnalysis) and _affects_ranking(instance):
+            changed.add(instance.job_id)
+
+def _bump_changed_rankings(session):
+    for job_id in session.info.pop('ranking_jobs', ()):
+        ranking_service.bump_ranking_version(job_id)
+
+def _discard_ranking_changes(session):
+    session.info.pop('ranking_jobs', None)
+
+def register_ranking_hooks(session) -> None:
+    """Bump a job's ranking version after commits that complete, reprocess or delete its analyses"""
+    from sqlalchemy import event
+    
+    if event.contains(session, 'after_flush', _collect_ranking_changes):
+        return
+    
+    event.listen(session, 'before_flush', _log_deleted_rankings)
+    event.listen(session, 'after_flush', _collect_ranking_changes)
+    event.listen(session, 'after_commit', _bump_changed_rankings)
+    event.listen(session, 'after_rollback', _discard_ranking_changes)
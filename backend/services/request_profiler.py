@@ -0,0 +1,267 @@
+"""
+Request Profiler
+Opt-in profiling of single requests: an admin sends the X-Profile header (cprofile or sampling),
+or PROFILE_SAMPLE_RATE picks a share of all requests. Each capture is stored in PROFILE_DIR as an
+artifact (.prof for cProfile/pstats, .collapsed stacks for the sampler) plus a JSON summary, keeping
+the newest PROFILE_RETENTION captures. Requests that are not profiled pay one header lookup.
+"""
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from typing import Dict, List, Optional
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+
+MODES = ('cprofile', 'sampling')
+ARTIFACT_EXTENSIONS = {'cprofile': '.prof', 'sampling': '.collapsed'}
+PROFILE_ID_PATTERN = re.compile(r'^[0-9A-Za-z-]+$')
+TOP_FUNCTIONS = 25
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread every interval"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def disable(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        """Collapsed stacks, one 'frame;frame;frame count' line each (flamegraph.pl / speedscope)"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def top(self) -> List[Dict]:
+        inclusive, own = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        interval_ms = self.interval * 1000
+        return [{'function': frame, 'samples': count, 'self_samples': own[frame],
+                 'cumulative_ms': round(count * interval_ms, 1), 'self_ms': round(own[frame] * interval_ms, 1)}
+                for frame, count in inclusive.most_common(TOP_FUNCTIONS)]
+
+def _cprofile_top(profiler: cProfile.Profile) -> List[Dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [{'function': f'{name} ({filename}:{line})', 'calls': calls,
+             'cumulative_ms': round(cumulative * 1000, 2), 'self_ms': round(own * 1000, 2)}
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+
+class RequestProfiler:
+    def __init__(self):
+        self.environ_key = 'HTTP_X_PROFILE'  # The X-Profile request header
+        self.default_mode = 'cprofile'
+        self.sample_rate = 0.0
+        self.sample_interval = 0.005
+        self.directory = 'profiles'
+        self.retention = 200
+        self.lock = threading.Lock()
+        self.stats = {'captured': 0, 'failed': 0, 'pruned': 0}
+        self._configured = False
+
+    def init_app(self, app) -> None:
+        if 'request_profiler' not in app.extensions:
+            app.extensions['request_profiler'] = self
+            install_request_profiling(app)
+
+        if self._configured:
+            return
+        self._configured = True
+
+        self.default_mode = app.config.get('PROFILE_MODE', 'cprofile')
+        if self.default_mode not in MODES:
+            raise ValueError(f"Unsupported PROFILE_MODE: {self.default_mode}")
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.sample_interval = app.config.get('PROFILE_SAMPLE_INTERVAL_MS', 5) / 1000
+        self.directory = app.config.get('PROFILE_DIR', 'profiles')
+        self.retention = app.config.get('PROFILE_RETENTION', 200)
+
+    def start(self, mode: str, trigger: str, user_id: Optional[int]) -> None:
+        """Start profiling the current request"""
+        if mode == 'sampling':
+            profiler = SamplingProfiler(self.sample_interval)
+        else:
+            profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # Another profiler is already active on this thread
+        g.request_profile = {'profiler': profiler, 'mode': mode, 'trigger': trigger, 'user_id': user_id,
+                             'started': time.perf_counter(), 'created_at': datetime.utcnow()}
+
+    def finish(self, status: int) -> Optional[str]:
+        """Stop the current request's profiler (if any) and store the capture; returns its id"""
+        from services.metrics import request_query_stats
+
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return None
+        profiler = profile['profiler']
+        profiler.disable()
+        duration = time.perf_counter() - profile['started']
+        queries, query_seconds = request_query_stats()
+
+        profile_id = f"{profile['created_at']:%Y%m%dT%H%M%S%f}-{secrets.token_hex(3)}"
+        artifact = profile_id + ARTIFACT_EXTENSIONS[profile['mode']]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if profile['mode'] == 'sampling':
+                profiler.dump(os.path.join(self.directory, artifact))
+                top = profiler.top()
+            else:
+                profiler.dump_stats(os.path.join(self.directory, artifact))
+                top = _cprofile_top(profiler)
+            summary = {
+                'id': profile_id,
+                'mode': profile['mode'],
+                'trigger': profile['trigger'],
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': status,
+                'duration_ms': round(duration * 1000, 1),
+                'db_queries': queries,
+                'db_ms': round(query_seconds * 1000, 1),
+                'user_id': profile['user_id'],
+                'pid': os.getpid(),
+                'created_at': profile['created_at'].isoformat(),
+                'artifact': artifact,
+                'artifact_bytes': os.path.getsize(os.path.join(self.directory, artifact)),
+                'top': top
+            }
+            with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+                json.dump(summary, f)
+        except Exception as e:
+            with self.lock:
+                self.stats['failed'] += 1
+            print(f"Error storing request profile: {e}")
+            return None
+
+        with self.lock:
+            self.stats['captured'] += 1
+        self.prune()
+        return profile_id
+
+    def prune(self) -> None:
+        """Delete all but the newest `retention` captures (ids sort by capture time)"""
+        ids = self._ids()
+        for profile_id in ids[:max(len(ids) - max(self.retention, 1), 0)]:
+            for extension in ('.json',) + tuple(ARTIFACT_EXTENSIONS.values()):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass  # No artifact of this kind, or pruned by another worker
+            with self.lock:
+                self.stats['pruned'] += 1
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(filename[:-len('.json')] for filename in os.listdir(self.directory)
+                      if filename.endswith('.json'))
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        """Summaries of the newest captures (without their top functions)"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            summary = self.get(profile_id)
+            if summary is None:
+                continue
+            summary.pop('top', None)
+            profiles.append(summary)
+            if len(profiles) >= limit:
+                break
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f'{profile_id}.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def artifact_path(self, profile_id: str) -> Optional[str]:
+        summary = self.get(profile_id)
+        if summary is None:
+            return None
+        path = os.path.abspath(os.path.join(self.directory, summary['artifact']))
+        return path if os.path.exists(path) else None
+
+request_profiler = RequestProfiler()
+
+def _admin_user_id() -> Optional[int]:
+    """The requesting user's id if they are an admin"""
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    from models import User
+
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        return None
+    user = User.query.get(int(user_id)) if user_id else None
+    return user.id if user and user.is_admin else None
+
+def install_request_profiling(app) -> None:
+    """Start a profiler for requests that ask for one (admins only) or are sampled"""
+
+    @app.before_request
+    def start_request_profile():
+        # Straight from the WSGI environ: this runs on every request
+        requested = request.environ.get(request_profiler.environ_key)
+        if requested:
+            user_id = _admin_user_id()
+            if user_id is not None:
+                mode = requested.lower() if requested.lower() in MODES else request_profiler.default_mode
+                request_profiler.start(mode, 'header', user_id)
+        elif request_profiler.sample_rate and random.random() < request_profiler.sample_rate:
+            request_profiler.start(request_profiler.default_mode, 'sample', None)
+
+    @app.after_request
+    def finish_request_profile(response):
+        if 'request_profile' in g:
+            profile_id = request_profiler.finish(response.status_code)
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def abandon_request_profile(exc):
+        # after_request is skipped when the view raised; still keep what was captured
+        if 'request_profile' in g:
+            request_profiler.finish(500)
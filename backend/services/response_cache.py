@@ -0,0 +1,250 @@
+"""
+Response Cache Service
+Version-keyed caching of serialized JSON payloads with ETag/Last-Modified support
+"""
+from flask import Response, current_app, request
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+import hashlib
+import threading
+import time
+
+class MemoryVersionStore:
+    """Per-process version counters (coherent for a single worker only)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        # Counters restart with the process, so ETags carry the store's start time too
+        self.epoch = f'{time.time_ns():x}'
+
+    def get(self, namespace: str) -> Tuple[int, float]:
+        with self._lock:
+            return self._versions.get(namespace, (0, 0.0))
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            version = self._versions.get(namespace, (0, 0.0))[0] + 1
+            self._versions[namespace] = (version, time.time())
+            return version
+
+class RedisVersionStore:
+    """Version counters shared through Redis so every worker sees the same versions"""
+
+    def __init__(self, url: str, prefix: str = 'resume_analyzer:cache'):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("The redis package is required for CACHE_BACKEND=redis")
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._client.setnx(f'{prefix}:epoch', f'{time.time_ns():x}')
+        self.epoch = self._client.get(f'{prefix}:epoch').decode('utf-8')
+
+    def get(self, namespace: str) -> Tuple[int, float]:
+        version, modified_at = self._client.mget(
+            f'{self._prefix}:version:{namespace}',
+            f'{self._prefix}:modified:{namespace}'
+        )
+        return int(version or 0), float(modified_at or 0.0)
+
+    def bump(self, namespace: str) -> int:
+        pipeline = self._client.pipeline()
+        pipeline.incr(f'{self._prefix}:version:{namespace}')
+        pipeline.set(f'{self._prefix}:modified:{namespace}', time.time())
+        return int(pipeline.execute()[0])
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def create_version_store(app):
+    """Build the version store selected by CACHE_BACKEND"""
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    if backend == 'redis':
+        return RedisVersionStore(app.config['CACHE_REDIS_URL'])
+    if backend == 'memory':
+        return MemoryVersionStore()
+    raise ValueError(f"Unsupported CACHE_BACKEND: {backend}")
+
+class ResponseCache:
+    """Serve JSON payloads keyed by a namespace version, answering conditional GETs with 304"""
+
+    def __init__(self):
+        self.versions = MemoryVersionStore()
+        self.payloads = LRUCache()
+        self.coalesce_seconds = 10.0
+        self._lock = threading.Lock()
+        self._last_bumped = {}  # Namespace -> monotonic time of its last coalesced bump
+        self._trailing = set()  # Namespaces with a trailing bump scheduled
+        self._configured = False
+
+    def init_app(self, app) -> None:
+        # create_app may run more than once per process; keep the live counters
+        if self._configured:
+            return
+        self._configured = True
+        self.versions = create_version_store(app)
+        self.payloads = LRUCache(
+            max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024),
+            ttl=app.config.get('RESPONSE_CACHE_TTL', 300)
+        )
+        self.coalesce_seconds = app.config.get('RESPONSE_CACHE_COALESCE_SECONDS', 10.0)
+
+    def bump(self, *namespaces: str) -> None:
+        """Invalidate every cached payload and ETag under the given namespaces"""
+        for namespace in namespaces:
+            self.versions.bump(namespace)
+
+    def bump_coalesced(self, namespace: str) -> None:
+        """Bump at most once per coalesce_seconds; changes inside the window share one trailing bump"""
+        with self._lock:
+            if namespace in self._trailing:
+                return
+            wait = self._last_bumped.get(namespace, float('-inf')) + self.coalesce_seconds - time.monotonic()
+            if wait > 0:
+                self._trailing.add(namespace)
+                timer = threading.Timer(wait, self._trailing_bump, args=(namespace,))
+                timer.daemon = True
+                timer.start()
+                return
+            self._last_bumped[namespace] = time.monotonic()
+        self.versions.bump(namespace)
+
+    def _trailing_bump(self, namespace: str) -> None:
+        with self._lock:
+            self._trailing.discard(namespace)
+            self._last_bumped[namespace] = time.monotonic()
+        try:
+            self.versions.bump(namespace)
+        except Exception as e:
+            print(f"Error bumping cache namespace {namespace}: {e}")
+
+    def respond(self, namespace: str, build_payload: Callable[[], Optional[Dict]], variant: str = '') -> Optional[Response]:
+        """Return a cached or freshly built JSON response, or None if build_payload found nothing"""
+        version, modified_at = self.versions.get(namespace)
+        variant_digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]
+        etag = f'{namespace}-{self.versions.epoch}.{version}-{variant_digest}'
+        last_modified = datetime.fromtimestamp(int(modified_at), tz=timezone.utc) if modified_at else None
+
+        if request.if_none_match.contains(etag) or (
+            not request.if_none_match and last_modified and request.if_modified_since
+            and last_modified <= request.if_modified_since
+        ):
+            return self._finalize(Response(status=304), etag, last_modified)
+
+        cache_key = (namespace, version, variant)
+        body = self.payloads.get(cache_key)
+        if body is None:
+            # Cached under the current version, so the payload must not lag behind the primary
+            from services.db_routing import use_primary
+            with use_primary():
+                payload = build_payload()
+            if payload is None:
+                return None
+            body = current_app.json.dumps(payload)
+            self.payloads.set(cache_key, body)
+
+        return self._finalize(Response(body, status=200, mimetype='application/json'), etag, last_modified)
+
+    def _finalize(self, response: Response, etag: str, last_modified: Optional[datetime]) -> Response:
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        # Authenticated payloads: browsers may store them but must revalidate every time
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+def request_variant() -> str:
+    """Canonical form of the query string, used to key list responses"""
+    return '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+
+# Global response cache instance
+response_cache = ResponseCache()
+
+JOBS_NAMESPACE = 'jobs'
+
+def job_namespace(job_id: int) -> str:
+    return f'job:{job_id}'
+
+def invalidate_job(job_id: Optional[int] = None) -> None:
+    """Invalidate the job listing and, if given, one job's detail payload"""
+    namespaces = [JOBS_NAMESPACE]
+    if job_id is not None:
+        namespaces.append(job_namespace(job_id))
+    response_cache.bump(*namespaces)
+
+def invalidate_application_count(job_id: int) -> None:
+    """A job's application_count changed: its detail payload now, the listing at most once per
+    RESPONSE_CACHE_COALESCE_SECONDS, so an application spike does not change the listing ETag on every analysis"""
+    response_cache.bump(job_namespace(job_id))
+    response_cache.bump_coalesced(JOBS_NAMESPACE)
+
+def _collect_changed_jobs(session, flush_context):
+    from models import ResumeAnalysis
+
+    changed = session.info.setdefault('response_cache_jobs', set())
+    for instance in list(session.new) + list(session.deleted):
+        if isinstance(instance, ResumeAnalysis):
+            changed.add(instance.job_id)
+
+def _invalidate_changed_jobs(session):
+    for job_id in session.info.pop('response_cache_jobs', ()):
+        invalidate_application_count(job_id)
+
+def _discard_changed_jobs(session):
+    session.info.pop('response_cache_jobs', None)
+
+def register_invalidation_hooks(session) -> None:
+    """Invalidate job payloads after commits that add or remove analyses (application_count)"""
+    from sqlalchemy import event
+
+    if event.contains(session, 'after_flush', _collect_changed_jobs):
+        return
+
+    event.listen(session, 'after_flush', _collect_changed_jobs)
+    event.listen(session, 'after_commit', _invalidate_changed_jobs)
+    event.listen(session, 'after_rollback', _discard_changed_jobs)
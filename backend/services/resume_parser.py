@@ -1,8 +1,7 @@
-import fitz  # PyMuPDF
-import docx
 import os
 import re
 from typing import Dict, List, Optional
+from services.metrics import resume_parse_duration
 
 class ResumeParser:
     def __init__(self):
@@ -26,6 +25,8 @@ class ResumeParser:
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
         try:
+            import fitz  # PyMuPDF, imported on first use to keep startup fast
+            
             doc = fitz.open(file_path)
             text = ""
             
@@ -40,6 +41,8 @@ class ResumeParser:
     def extract_text_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
         try:
+            import docx  # Imported on first use to keep startup fast
+            
             doc = docx.Document(file_path)
             text = ""
             
@@ -167,21 +170,22 @@ class ResumeParser:
     def parse_resume(self, file_path: str, file_type: str) -> Dict:
         """Main parsing function"""
         try:
-            # Extract raw text
-            raw_text = self.extract_text(file_path, file_type)
-            cleaned_text = self.clean_text(raw_text)
-            
-            # Extract structured information
-            parsed_data = {
-                'raw_text': raw_text,
-                'cleaned_text': cleaned_text,
-                'skills': self.extract_skills(cleaned_text),
-                'education': self.extract_education(cleaned_text),
-                'experience': self.extract_experience(cleaned_text),
-                'projects': self.extract_projects(cleaned_text),
-                'word_count': len(cleaned_text.split()),
-                'char_count': len(cleaned_text)
-            }
+            with resume_parse_duration.time(file_type=file_type.lower()):
+                # Extract raw text
+                raw_text = self.extract_text(file_path, file_type)
+                cleaned_text = self.clean_text(raw_text)
+                
+                # Extract structured information
+                parsed_data = {
+                    'raw_text': raw_text,
+                    'cleaned_text': cleaned_text,
+                    'skills': self.extract_skills(cleaned_text),
+                    'education': self.extract_education(cleaned_text),
+                    'experience': self.extract_experience(cleaned_text),
+                    'projects': self.extract_projects(cleaned_text),
+                    'word_count': len(cleaned_text.split()),
+                    'char_count': len(cleaned_text)
+                }
             
             return parsed_data
             
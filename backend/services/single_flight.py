@@ -0,0 +1,56 @@
+"""
+Single-Flight Service
+Collapses concurrent calls with the same key into one execution whose result every caller shares
+"""
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+import threading
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn unless a call for key is already in flight; returns (result, coalesced)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # Re-raises the leader's exception, so followers fail the same way
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self.failures += 1
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'failures': self.failures,
+                'coalesced_ratio': round(self.coalesced / calls, 4) if calls else 0.0
+            }
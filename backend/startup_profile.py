@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Startup profiler for the web role
+Boots the app in a fresh interpreter under -X importtime and reports import time per
+module, create_app phases and time to the first request.
+
+Usage: python app.py --profile-startup   (or python startup_profile.py)
+"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TARGET_FIRST_REQUEST_MS = 300
+
+# Runs in the child interpreter; prints phase timings as JSON on the last stdout line
+BOOT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import __init__ as backend
+imported = time.perf_counter()
+app = backend.create_app()
+created = time.perf_counter()
+response = app.test_client().get('/api/admin/health')
+first_request = time.perf_counter()
+print(json.dumps({
+    'import_app_package_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first_request - created) * 1000,
+    'time_to_first_request_ms': (first_request - start) * 1000,
+    'health_status': response.status_code
+}))
+"""
+
+def parse_importtime(stderr: str):
+    """Turn -X importtime lines into (module, self_us, cumulative_us, depth) tuples"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+def profile_startup(top: int = 15):
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Boot failed:\n{result.stderr[-2000:]}")
+
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+
+    # Attribute each module's own import time to its top-level package
+    packages = {}
+    for name, self_us, _, _ in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+    return {
+        'phases_ms': {key: round(value, 1) if isinstance(value, float) else value
+                      for key, value in phases.items()},
+        'target_ms': TARGET_FIRST_REQUEST_MS,
+        'within_target': phases['time_to_first_request_ms'] <= TARGET_FIRST_REQUEST_MS,
+        'modules_imported': len(modules),
+        'slowest_packages_ms': [
+            {'package': package, 'import_ms': round(self_us / 1000, 1)}
+            for package, self_us in slowest[:top]
+        ]
+    }
+
+def main():
+    report = profile_startup()
+    print(json.dumps(report, indent=2))
+    if not report['within_target']:
+        print(f"⚠️  Time to first request exceeds {TARGET_FIRST_REQUEST_MS} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Local read replica for SQLite - copies the primary database file into DATABASE_REPLICA_URL
+so read/write routing can be tried without Postgres. With --interval the copy repeats,
+which behaves like a replica lagging by up to that many seconds.
+
+Example:
+    DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URL=sqlite:///replica.db \\
+        python sync_local_replica.py --interval 2
+"""
+
+import argparse
+import sqlite3
+import time
+from __init__ import create_app, db
+from services.db_routing import REPLICA_BIND
+
+def sync_replica(primary_path, replica_path):
+    """Copy the primary into the replica with SQLite's online backup API"""
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--interval', type=float, default=0, help='Seconds between copies (0 = copy once)')
+    args = arg_parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        replica = db.engines.get(REPLICA_BIND)
+        if replica is None or replica.dialect.name != 'sqlite' or db.engine.dialect.name != 'sqlite':
+            print("❌ Set DATABASE_URL and DATABASE_REPLICA_URL to two sqlite:/// files")
+            return
+        primary_path = db.engine.url.database
+        replica_path = replica.url.database
+
+    while True:
+        sync_replica(primary_path, replica_path)
+        print(f"✅ Copied {primary_path} -> {replica_path}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
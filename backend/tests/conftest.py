@@ -0,0 +1,25 @@
+"""
+Shared fixtures. Run from backend/:  python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture(scope='session')
+def create_test_app():
+    """create_app() on a given database URL, once per test module"""
+    def create(database_url):
+        os.environ['DATABASE_URL'] = database_url
+        os.environ.pop('DATABASE_REPLICA_URL', None)
+        os.environ.pop('AUTO_MIGRATE', None)
+        from __init__ import create_app
+        from config import config
+
+        # Config reads the environment when it is first imported, so later modules patch the class too
+        config[os.getenv('FLASK_ENV', 'development')].SQLALCHEMY_DATABASE_URI = database_url
+        return create_app()
+    return create
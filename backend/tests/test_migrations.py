@@ -0,0 +1,104 @@
+"""
+Upgrade test: a database with the original (baseline) schema must migrate to the current models
+with run_migrations(), as the Render/Railway start commands do before app.py.
+
+Run from backend/:  python -m pytest -q tests
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+# The schema create_all built before any migration existed
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(256), is_admin BOOLEAN, created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE job_descriptions (
+    id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, company VARCHAR(200), description TEXT NOT NULL,
+    requirements TEXT, location VARCHAR(100), experience_level VARCHAR(50), employment_type VARCHAR(50),
+    jd_pdf_path VARCHAR(255), created_at DATETIME, created_by INTEGER NOT NULL, is_active BOOLEAN,
+    PRIMARY KEY (id), FOREIGN KEY(created_by) REFERENCES users (id)
+);
+CREATE TABLE resumes (
+    id INTEGER NOT NULL, filename VARCHAR(255) NOT NULL, original_filename VARCHAR(255) NOT NULL,
+    file_path VARCHAR(500) NOT NULL, file_type VARCHAR(50) NOT NULL, extracted_text TEXT, parsed_data TEXT,
+    uploaded_at DATETIME, user_id INTEGER NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE TABLE resume_analyses (
+    id INTEGER NOT NULL, resume_id INTEGER NOT NULL, job_id INTEGER NOT NULL, relevance_score FLOAT,
+    verdict VARCHAR(20), missing_skills TEXT, missing_certifications TEXT, missing_projects TEXT,
+    improvement_suggestions TEXT, rank INTEGER, is_in_queue BOOLEAN, queue_position INTEGER,
+    analysis_status VARCHAR(20), analysis_started_at DATETIME, analysis_completed_at DATETIME,
+    analysis_notes TEXT, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(resume_id) REFERENCES resumes (id), FOREIGN KEY(job_id) REFERENCES job_descriptions (id)
+);
+CREATE INDEX idx_resume_analysis_queue ON resume_analyses (job_id, queue_position);
+CREATE INDEX idx_resume_analysis_job_rank ON resume_analyses (job_id, rank);
+CREATE TABLE applications (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, job_id INTEGER NOT NULL, resume_id INTEGER NOT NULL,
+    application_status VARCHAR(20), applied_at DATETIME, notes TEXT,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(job_id) REFERENCES job_descriptions (id),
+    FOREIGN KEY(resume_id) REFERENCES resumes (id)
+);
+CREATE INDEX idx_applications_user_job ON applications (user_id, job_id);
+
+INSERT INTO users (id, username, email, is_admin) VALUES (1, 'admin', 'admin@example.com', 1);
+INSERT INTO job_descriptions (id, title, description, requirements, created_by, is_active)
+    VALUES (1, 'Backend Developer', 'Python developer', 'python, sql', 1, 1);
+INSERT INTO resumes (id, filename, original_filename, file_path, file_type, extracted_text, parsed_data, user_id)
+    VALUES (1, 'a.pdf', 'a.pdf', 'uploads/a.pdf', 'PDF', 'Python and SQL', '{"skills": ["python"]}', 1),
+           (2, 'b.pdf', 'b.pdf', 'uploads/b.pdf', 'PDF', 'Java', '{"skills": ["java"]}', 1);
+-- Resume 1 was analyzed twice for job 1 (a failed retry after a completed run)
+INSERT INTO resume_analyses (id, resume_id, job_id, relevance_score, analysis_status, rank, is_in_queue)
+    VALUES (1, 1, 1, 82.0, 'completed', 2, 0),
+           (2, 2, 1, 40.0, 'completed', 1, 0),
+           (3, 1, 1, 0.0, 'failed', 0, 1);
+INSERT INTO applications (id, user_id, job_id, resume_id, application_status) VALUES (1, 1, 1, 1, 'pending');
+"""
+
+@pytest.fixture(scope='module')
+def app(create_test_app):
+    directory = tempfile.mkdtemp(prefix='migrations_')
+    path = os.path.join(directory, 'baseline.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    return create_test_app(f'sqlite:///{path}')
+
+def test_baseline_database_upgrades_to_current_models(app):
+    from __init__ import db
+    from db_migrations import MIGRATIONS, run_migrations
+    from models import HOT_PATH_INDEXES
+    from sqlalchemy import inspect
+
+    with app.app_context():
+        assert run_migrations() == [migration_id for migration_id, _ in MIGRATIONS]
+
+        inspector = inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            assert set(table.columns.keys()) <= columns, table.name
+        for index in HOT_PATH_INDEXES:
+            assert index.name in {existing['name'] for existing in inspector.get_indexes(index.table.name)}
+
+        # The completed duplicate survives and the job is re-ranked by score
+        rows = db.session.execute(db.text(
+            'SELECT id, analysis_status, rank, priority FROM resume_analyses ORDER BY id'
+        )).all()
+        assert [tuple(row) for row in rows] == [(1, 'completed', 1, 'interactive'), (2, 'completed', 2, 'interactive')]
+
+        # The current models read the migrated rows
+        from models import Resume, ResumeAnalysis
+        assert db.session.get(Resume, 1).text == 'Python and SQL'
+        assert ResumeAnalysis.query.count() == 2
+
+def test_migrations_are_recorded_once(app):
+    from db_migrations import run_migrations
+
+    with app.app_context():
+        assert run_migrations() == []
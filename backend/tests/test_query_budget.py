@@ -0,0 +1,111 @@
+"""
+Query budgets: every endpoint with a @query_budget must stay within it on a database holding more
+rows than the budget, so an N+1 (a lazy load per listed row) fails here. With app.testing on, an
+over-budget request raises QueryBudgetExceeded instead of logging a warning.
+"""
+import os
+import tempfile
+
+import pytest
+
+JOBS = 4
+APPLICATIONS = 12
+
+@pytest.fixture(scope='module')
+def app(create_test_app):
+    directory = tempfile.mkdtemp(prefix='query_budget_')
+    app = create_test_app(f"sqlite:///{os.path.join(directory, 'budget.db')}")
+    app.testing = True
+
+    from __init__ import db
+    from models import Application, JobDescription, Resume, ResumeAnalysis, User
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', is_admin=True)
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.flush()
+
+        jobs = [JobDescription(title=f'Job {i}', description='Python developer', requirements='python',
+                               created_by=admin.id) for i in range(JOBS)]
+        db.session.add_all(jobs)
+        db.session.flush()
+
+        for i in range(APPLICATIONS):
+            resume = Resume(filename=f'resume{i}.pdf', original_filename=f'resume{i}.pdf',
+                            file_path=f'uploads/resume{i}.pdf', file_type='PDF', user_id=admin.id)
+            resume.set_parsed_data({'skills': ['python'], 'cleaned_text': f'Python developer {i}'})
+            db.session.add(resume)
+            db.session.flush()
+
+            job = jobs[i % JOBS]
+            db.session.add(ResumeAnalysis(resume_id=resume.id, job_id=job.id, analysis_status='completed',
+                                          relevance_score=50.0 + i, verdict='Medium', is_in_queue=False))
+            db.session.add(Application(user_id=admin.id, job_id=job.id, resume_id=resume.id))
+        db.session.commit()
+    return app
+
+@pytest.fixture(scope='module')
+def client(app):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return client
+
+@pytest.mark.parametrize('url', [
+    '/api/jobs/',
+    '/api/jobs/1',
+    '/api/applications/',
+    '/api/applications/1',
+    '/api/resumes/',
+    '/api/resumes/analyses',
+    '/api/admin/dashboard',
+    '/api/admin/analyses',
+    '/api/admin/debug/system-status',
+])
+def test_endpoint_stays_within_its_query_budget(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+def test_nested_jobs_carry_their_application_counts(client):
+    applications = client.get('/api/applications/?per_page=20').get_json()['applications']
+    assert len(applications) == APPLICATIONS
+    assert {application['job']['application_count'] for application in applications} == {APPLICATIONS // JOBS}
+
+@pytest.mark.parametrize('url', [
+    '/api/jobs/2',
+    '/api/applications/2',
+    '/api/admin/debug/system-status',
+    '/api/admin/jobs/2/rankings',
+])
+def test_job_payloads_do_not_lazy_load_application_count(app, client, url):
+    from __init__ import db
+    from sqlalchemy import event
+
+    column_loads = []
+    def record(orm_execute_state):
+        if orm_execute_state.is_column_load:
+            column_loads.append(str(orm_execute_state.statement))
+
+    event.listen(db.session, 'do_orm_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.session, 'do_orm_execute', record)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert column_loads == []
+
+def test_over_budget_request_fails_under_test(app):
+    from models import User
+    from services.query_budget import QueryBudgetExceeded, query_budget
+
+    @query_budget(1)
+    def view():
+        User.query.count()
+        User.query.count()
+        return 'ok'
+
+    with app.test_request_context('/'):
+        with pytest.raises(QueryBudgetExceeded):
+            view()
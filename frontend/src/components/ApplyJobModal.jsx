@@ -43,6 +43,12 @@ export default function ApplyJobModal({ isOpen, onClose, job }) {
       toast.success('Application submitted successfully!')
       onClose()
     } catch (error) {
+      // 503 while the analysis queue is busy: the application was still recorded and queued
+      if (error.response?.status === 503 && error.response.data?.application) {
+        toast.success('Application submitted; its analysis is queued')
+        onClose()
+        return
+      }
       toast.error(error.response?.data?.error || 'Failed to apply for job')
     } finally {
       setApplying(false)
@@ -76,6 +76,12 @@ export default function MyResumes() {
       fetchAnalyses()
       return response.data
     } catch (error) {
+      // 503 while the analysis queue is busy: the analysis was still queued
+      if (error.response?.status === 503 && error.response.data?.analysis_id) {
+        toast.success('Analysis queued')
+        fetchAnalyses()
+        return error.response.data
+      }
       toast.error(error.response?.data?.error || 'Failed to start analysis')
       console.error('Analysis error:', error)
     }